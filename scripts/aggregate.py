@@ -1,47 +1,50 @@
 """
 Weekly data aggregation pipeline.
 Computes salary benchmarks and market snapshots from active job listings.
-Run: python scripts/aggregate.py
+Run: python scripts/aggregate.py [--full-benchmarks] [--snapshots-in-sql]
+     python scripts/aggregate.py --check-benchmarks
+     Add --report PATH for a JSON run report (stage timings, Supabase calls) and --profile PATH for cProfile stats.
+     --sink postgres writes snapshots over a direct connection (SUPABASE_DB_URL) with COPY; benchmarks
+     always go through the write_salary_benchmarks RPC.
 Cron: Every Sunday at midnight UTC via GitHub Actions.
 """
 
+import argparse
+import heapq
 import os
-import re
-import statistics
-from datetime import date
+import sys
+from datetime import date, datetime, timedelta, timezone
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client
+
+# Shared pipeline helpers live alongside the scraper
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraper"))
+
+import accumulators  # noqa: E402
+from accumulators import EXPERIENCE_LEVELS, group_key  # noqa: E402
+from categories import CategoryRegistry  # noqa: E402
+from db import chunked, iter_rows  # noqa: E402
+from instrument import instrument_client, profiled, report, stage  # noqa: E402
+from sinks import create_sink  # noqa: E402
 
 load_dotenv(".env.local")
 
-SUPABASE_URL = os.environ["NEXT_PUBLIC_SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# Normalized role titles mapped from common title patterns
-ROLE_NORMALIZATIONS = {
-    "software engineer": [r"software engineer", r"software developer", r"swe\b"],
-    "frontend engineer": [r"frontend", r"front-end", r"front end", r"react developer", r"react engineer"],
-    "backend engineer": [r"backend", r"back-end", r"back end"],
-    "full stack engineer": [r"full.?stack", r"fullstack"],
-    "devops engineer": [r"devops", r"dev ops", r"site reliability", r"sre\b", r"platform engineer"],
-    "data scientist": [r"data scientist"],
-    "data engineer": [r"data engineer"],
-    "data analyst": [r"data analyst", r"business analyst", r"bi analyst"],
-    "machine learning engineer": [r"machine learning", r"ml engineer", r"ai engineer"],
-    "product manager": [r"product manager", r"product owner"],
-    "product designer": [r"product designer"],
-    "ux designer": [r"ux designer", r"ux researcher", r"user experience"],
-    "ui designer": [r"ui designer", r"visual designer"],
-    "marketing manager": [r"marketing manager", r"growth manager", r"head of marketing"],
-    "content writer": [r"content writer", r"copywriter", r"technical writer"],
-    "customer success": [r"customer success", r"customer support", r"account manager"],
-    "engineering manager": [r"engineering manager", r"eng manager", r"tech lead"],
-    "cloud engineer": [r"cloud engineer", r"aws engineer", r"gcp engineer", r"azure engineer"],
-    "qa engineer": [r"qa engineer", r"quality assurance", r"test engineer", r"sdet"],
-    "security engineer": [r"security engineer", r"infosec", r"cybersecurity"],
-}
+# Set by connect(); the functions below all use this client, and this sink for bulk writes
+supabase = None
+sink = None
+
+
+def connect(client=None, sink_kind: str = "postgrest"):
+    """Use `client` (e.g. fakedb.FakeSupabase in benchmarks) or create one from the environment.
+
+    Either way every request is timed and counted by table and verb for the run report.
+    """
+    global supabase, sink
+    if client is None:
+        client = create_client(os.environ["NEXT_PUBLIC_SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+    supabase = instrument_client(client)
+    sink = create_sink(sink_kind, supabase)
+    return supabase
 
 TOP_TECH_SKILLS = [
     "React", "Python", "TypeScript", "JavaScript", "Node.js", "AWS", "Docker",
@@ -51,127 +54,328 @@ TOP_TECH_SKILLS = [
 ]
 
 
-def normalize_title(title: str) -> str | None:
-    """Map a job title to a normalized role name."""
-    title_lower = title.lower()
-    for normalized, patterns in ROLE_NORMALIZATIONS.items():
-        for pattern in patterns:
-            if re.search(pattern, title_lower):
-                return normalized
-    return None
+# Role keyword -> benchmark category; first match wins, default "engineering"
+ROLE_CATEGORY_KEYWORDS = {
+    "data": ["data", "machine learning", "ml", "ai"],
+    "design": ["designer", "ux", "ui"],
+    "product": ["product manager", "product owner"],
+    "marketing": ["marketing"],
+    "writing": ["writer", "content"],
+    "support": ["customer"],
+}
+
+
+BENCHMARK_WATERMARK = "salary_benchmarks"
+WATERMARK_OVERLAP = timedelta(minutes=10)
+BENCHMARK_FIELDS = [
+    "role_category", "normalized_title", "experience_level", "sample_size",
+    "p25_salary", "p50_salary", "p75_salary", "avg_salary", "min_salary", "max_salary",
+    "top_companies", "top_tech",
+]
+
+
+def role_category(normalized_title: str) -> str:
+    """Benchmark category for a normalized role title."""
+    for cat, kws in ROLE_CATEGORY_KEYWORDS.items():
+        if any(kw in normalized_title for kw in kws):
+            return cat
+    return "engineering"
 
 
-def percentile(values: list[int], p: int) -> int:
-    """Calculate percentile from a sorted list."""
-    if not values:
-        return 0
-    sorted_vals = sorted(values)
-    k = (len(sorted_vals) - 1) * p / 100
-    f = int(k)
-    c = f + 1
-    if c >= len(sorted_vals):
-        return sorted_vals[f]
-    return int(sorted_vals[f] + (k - f) * (sorted_vals[c] - sorted_vals[f]))
+def iter_salaried_jobs(
+    columns: str = "id, title, normalized_title, experience_level, salary_min, salary_max, company_id, tech_stack",
+    apply_filters=None,
+):
+    """Stream active jobs that have both salary bounds, page by page."""
+    def filters(q):
+        q = q.eq("is_active", True).not_.is_("salary_min", "null").not_.is_("salary_max", "null")
+        return apply_filters(q) if apply_filters else q
 
+    return iter_rows(supabase, "jobs", columns, filters)
 
-def compute_salary_benchmarks():
-    """Aggregate salary data by normalized role title and experience level."""
-    print("Computing salary benchmarks...")
 
-    # Fetch all active jobs with salary data
-    result = supabase.table("jobs").select(
-        "title, experience_level, salary_min, salary_max, company_id, tech_stack"
-    ).eq("is_active", True).not_.is_("salary_min", "null").not_.is_("salary_max", "null").execute()
+def fetch_company_names(company_ids: set[str]) -> dict[str, str]:
+    """Look up company names for many ids in a few batched queries."""
+    names: dict[str, str] = {}
+    for chunk in chunked(sorted(company_ids), 100):
+        result = supabase.table("companies").select("id, name").in_("id", chunk).execute()
+        names.update({c["id"]: c["name"] for c in result.data or []})
+    return names
 
-    if not result.data:
-        print("  No jobs with salary data found")
-        return
 
-    # Group by normalized title + experience level
-    groups: dict[tuple[str, str], list[dict]] = {}
-    for job in result.data:
-        normalized = normalize_title(job["title"])
-        if not normalized:
-            continue
-        exp = job.get("experience_level") or "mid"
-        key = (normalized, exp)
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(job)
-
-    # Get category mapping for each normalized title
-    title_to_category = {}
-    categories_result = supabase.table("categories").select("id, slug").execute()
-    cat_map = {c["id"]: c["slug"] for c in categories_result.data}
-
-    # Clear old benchmarks
-    supabase.table("salary_benchmarks").delete().gte("id", "00000000-0000-0000-0000-000000000000").execute()
+def build_benchmark_rows(groups: dict[tuple[str, str], dict]) -> list[dict]:
+    """salary_benchmarks rows for every group summary with enough data points."""
+    # Need at least 3 data points
+    eligible = {key: group for key, group in groups.items() if group["size"] >= 3}
+    company_names = fetch_company_names({cid for g in eligible.values() for cid in g["top_company_ids"]})
 
+    updated_at = datetime.now(timezone.utc).isoformat()
     benchmarks = []
-    for (title, exp), jobs in groups.items():
-        if len(jobs) < 3:
-            continue  # Need at least 3 data points
-
-        # Calculate midpoint salaries
-        midpoints = [int((j["salary_min"] + j["salary_max"]) / 2) for j in jobs]
-
-        # Get top companies
-        company_ids = [j["company_id"] for j in jobs if j.get("company_id")]
-        company_freq: dict[str, int] = {}
-        for cid in company_ids:
-            company_freq[cid] = company_freq.get(cid, 0) + 1
-        top_company_ids = sorted(company_freq, key=company_freq.get, reverse=True)[:5]
-
-        top_companies = []
-        if top_company_ids:
-            comp_result = supabase.table("companies").select("name").in_("id", top_company_ids).execute()
-            top_companies = [c["name"] for c in comp_result.data]
-
-        # Get top tech
-        all_tech: dict[str, int] = {}
-        for j in jobs:
-            for t in (j.get("tech_stack") or []):
-                all_tech[t] = all_tech.get(t, 0) + 1
-        top_tech = sorted(all_tech, key=all_tech.get, reverse=True)[:5]
-
-        # Determine category
-        role_category = "engineering"
-        cat_keywords = {
-            "data": ["data", "machine learning", "ml", "ai"],
-            "design": ["designer", "ux", "ui"],
-            "product": ["product manager", "product owner"],
-            "marketing": ["marketing"],
-            "writing": ["writer", "content"],
-            "support": ["customer"],
-        }
-        for cat, kws in cat_keywords.items():
-            if any(kw in title for kw in kws):
-                role_category = cat
-                break
-
+    for (title, exp), group in eligible.items():
         benchmarks.append({
-            "role_category": role_category,
+            "role_category": role_category(title),
             "normalized_title": title,
             "experience_level": exp,
-            "sample_size": len(jobs),
-            "p25_salary": percentile(midpoints, 25),
-            "p50_salary": percentile(midpoints, 50),
-            "p75_salary": percentile(midpoints, 75),
-            "avg_salary": int(statistics.mean(midpoints)),
-            "min_salary": min(midpoints),
-            "max_salary": max(midpoints),
-            "top_companies": top_companies,
-            "top_tech": top_tech,
+            "sample_size": group["size"],
+            "p25_salary": group["p25"],
+            "p50_salary": group["p50"],
+            "p75_salary": group["p75"],
+            "avg_salary": group["mean"],
+            "min_salary": group["min"],
+            "max_salary": group["max"],
+            "top_companies": [company_names[cid] for cid in group["top_company_ids"] if cid in company_names],
+            "top_tech": group["top_tech"],
+            "updated_at": updated_at,
         })
-
-    if benchmarks:
-        supabase.table("salary_benchmarks").insert(benchmarks).execute()
-        print(f"  Inserted {len(benchmarks)} salary benchmarks")
+    return benchmarks
+
+
+def backfill_normalized_titles(backfill: dict[str, list[str]]):
+    """Store normalized titles for jobs scraped before they were computed at ingest."""
+    for normalized, ids in backfill.items():
+        for chunk in chunked(ids, 100):
+            supabase.table("jobs").update({"normalized_title": normalized}).in_("id", chunk).execute()
+
+
+def latest_job_update() -> str | None:
+    result = supabase.table("jobs").select("updated_at").order("updated_at", desc=True).limit(1).execute()
+    return result.data[0]["updated_at"] if result.data else None
+
+
+def read_watermark(name: str) -> str | None:
+    result = supabase.table("aggregation_watermarks").select("watermark").eq("name", name).execute()
+    return result.data[0]["watermark"] if result.data else None
+
+
+def write_watermark(name: str, watermark: str | None):
+    if watermark:
+        supabase.table("aggregation_watermarks").upsert({"name": name, "watermark": watermark}, on_conflict="name").execute()
+
+
+def read_departures() -> tuple[set[tuple[str, str]], list[int]]:
+    """Groups that jobs left by changing title/experience or being deleted, plus the log row ids."""
+    rows = list(iter_rows(supabase, "salary_benchmark_departures", "id, title, normalized_title, experience_level"))
+    return {key for row in rows if (key := group_key(row))}, [row["id"] for row in rows]
+
+
+def touched_group_keys(watermark: str) -> tuple[set[tuple[str, str]], dict[str, list[str]]]:
+    """Groups whose membership may have changed since `watermark`.
+
+    Also returns the ids of changed jobs that still lack a stored normalized_title,
+    by normalized title, so they can be backfilled before their groups are re-read.
+    """
+    # Re-read a little before the watermark so transactions that committed late aren't missed
+    since = (datetime.fromisoformat(watermark) - WATERMARK_OVERLAP).isoformat()
+    changed = iter_rows(
+        supabase,
+        "jobs",
+        "id, title, normalized_title, experience_level",
+        lambda q: q.gt("updated_at", since),
+    )
+    keys: set[tuple[str, str]] = set()
+    backfill: dict[str, list[str]] = {}
+    for job in changed:
+        key = group_key(job)
+        if key:
+            keys.add(key)
+            if not job.get("normalized_title"):
+                backfill.setdefault(key[0], []).append(job["id"])
+    return keys, backfill
+
+
+def recompute_groups(keys: set[tuple[str, str]], unnormalized_ids: list[str] = ()) -> dict[tuple[str, str], dict]:
+    """Rebuild only the given groups from their current members.
+
+    Members are found by stored normalized_title, so rows scraped before it existed must
+    either be backfilled first (the first full rebuild and `incremental_benchmarks` do)
+    or passed in `unnormalized_ids` to be read by id. Sources are merged in id order, as a
+    full scan reads them, so ties among top companies and tech break the same way.
+    """
+    titles = sorted({title for title, _ in keys})
+    sources = [
+        iter_salaried_jobs(apply_filters=lambda q, chunk=chunk: q.in_("normalized_title", chunk))
+        for chunk in chunked(titles, 50)
+    ] + [
+        iter_salaried_jobs(apply_filters=lambda q, chunk=chunk: q.in_("id", chunk))
+        for chunk in chunked(list(unnormalized_ids), 100)
+    ]
+    groups, _ = accumulators.group_salary_jobs(heapq.merge(*sources, key=lambda job: job["id"]), keys)
+    return groups
+
+
+def existing_benchmark_keys() -> set[tuple[str, str]]:
+    rows = iter_rows(supabase, "salary_benchmarks", "id, normalized_title, experience_level")
+    return {(r["normalized_title"], r["experience_level"]) for r in rows}
+
+
+def write_benchmarks(benchmarks: list[dict], stale_keys: set[tuple[str, str]]):
+    """Upsert benchmark rows in place and drop groups that no longer have enough data.
+
+    Both happen in one transaction (the write_salary_benchmarks RPC), so readers never
+    see an empty table, and a run that dies midway can't leave stale groups published.
+    """
+    with stage("write_benchmarks"):
+        result = supabase.rpc("write_salary_benchmarks", {
+            "p_rows": benchmarks,
+            "p_stale": [{"normalized_title": title, "experience_level": exp} for title, exp in stale_keys],
+        }).execute()
+    written = result.data[0] if result.data else {"upserted": 0, "removed": 0}
+    report.count("benchmarks_upserted", written["upserted"])
+    report.count("benchmarks_removed", written["removed"])
+    print(f"  Upserted {written['upserted']} salary benchmarks, removed {written['removed']}")
+
+
+def full_benchmarks() -> tuple[list[dict], dict[str, list[str]]] | None:
+    """Every benchmark row from all salaried jobs, plus ids needing a normalized_title backfill."""
+    backfill: dict[str, list[str]] = {}
+    groups, seen = accumulators.group_salary_jobs(iter_salaried_jobs(), backfill=backfill)
+    if not seen:
+        return None
+    print(f"  Grouped {seen} salaried jobs into {len(groups)} groups")
+    return build_benchmark_rows(groups), backfill
+
+
+def incremental_benchmarks(
+    watermark: str,
+    departed: set[tuple[str, str]],
+    backfill: bool = True,
+) -> tuple[list[dict], set[tuple[str, str]]]:
+    """Benchmark rows for the groups touched since `watermark`, and the set of touched groups.
+
+    With `backfill=False` changed jobs lacking a normalized_title are read by id instead
+    of being stored first, so nothing is written.
+    """
+    keys, unnormalized = touched_group_keys(watermark)
+    keys |= departed
+    print(f"  {len(keys)} groups touched since {watermark}")
+    if backfill:
+        backfill_normalized_titles(unnormalized)
+        unnormalized = {}
+    ids = [job_id for ids in unnormalized.values() for job_id in ids]
+    return (build_benchmark_rows(recompute_groups(keys, ids)) if keys else []), keys
+
+
+def benchmark_key(row: dict) -> tuple[str, str]:
+    return (row["normalized_title"], row["experience_level"])
+
+
+def compute_salary_benchmarks(full: bool = False):
+    """Aggregate salary data by normalized role title and experience level.
+
+    Incremental by default: only groups touched since the last run's `jobs.updated_at`
+    watermark are recomputed. The first run, or `full=True`, rebuilds every group.
+    """
+    print("Computing salary benchmarks...")
+    # Read before scanning so jobs updated mid-run are picked up again next time
+    high_water = latest_job_update()
+    watermark = None if full else read_watermark(BENCHMARK_WATERMARK)
+    departed, departure_ids = read_departures()
+
+    if watermark is None:
+        result = full_benchmarks()
+        if result is None:
+            print("  No jobs with salary data found")
+            return
+        benchmarks, backfill = result
+        write_benchmarks(benchmarks, existing_benchmark_keys() - {benchmark_key(b) for b in benchmarks})
+        backfill_normalized_titles(backfill)
     else:
-        print("  No benchmarks to insert (not enough data)")
+        benchmarks, keys = incremental_benchmarks(watermark, departed)
+        write_benchmarks(benchmarks, keys - {benchmark_key(b) for b in benchmarks})
+
+    for chunk in chunked(departure_ids, 100):
+        supabase.table("salary_benchmark_departures").delete().in_("id", chunk).execute()
+    write_watermark(BENCHMARK_WATERMARK, high_water)
+
+
+def check_incremental_benchmarks() -> bool:
+    """Compare the stored benchmarks plus an incremental refresh against a full rebuild.
+
+    Read-only: leaves salary_benchmarks, jobs, the watermark and the departure log untouched.
+    """
+    print("Checking incremental salary benchmarks against a full rebuild...")
+    watermark = read_watermark(BENCHMARK_WATERMARK)
+    if watermark is None:
+        print("  No watermark yet; run the aggregation once first")
+        return False
+
+    compared = [f for f in BENCHMARK_FIELDS if f not in ("normalized_title", "experience_level")]
+    stored = {
+        benchmark_key(row): row
+        for row in iter_rows(supabase, "salary_benchmarks", "id, " + ", ".join(BENCHMARK_FIELDS))
+    }
+    departed, _ = read_departures()
+    refreshed, keys = incremental_benchmarks(watermark, departed, backfill=False)
+    incremental = {key: row for key, row in stored.items() if key not in keys}
+    incremental.update({benchmark_key(row): row for row in refreshed})
+
+    result = full_benchmarks()
+    rebuilt = {benchmark_key(row): row for row in (result[0] if result else [])}
+
+    mismatched = [
+        key for key in incremental.keys() | rebuilt.keys()
+        if key not in incremental or key not in rebuilt
+        or any(incremental[key][f] != rebuilt[key][f] for f in compared)
+    ]
+    for key in sorted(mismatched)[:10]:
+        print(f"  Mismatch for {key}: incremental={incremental.get(key)} full={rebuilt.get(key)}")
+    print(f"  {len(rebuilt)} groups, {len(keys)} refreshed incrementally, equivalent={not mismatched}")
+    return not mismatched
+
+
+def stream_market_stats(categories: CategoryRegistry) -> tuple[dict, dict, dict]:
+    """Stream active jobs once, updating category, tech-skill and experience slices together.
+
+    Returns stats dicts keyed by category slug, tech skill and experience level.
+    """
+    jobs = iter_rows(
+        supabase,
+        "jobs",
+        "id, category_id, experience_level, tech_stack, salary_min, salary_max",
+        lambda q: q.eq("is_active", True),
+    )
+    by_category_id, by_tech, by_experience = accumulators.accumulate_market(
+        jobs, [category_id for _, category_id in categories.items()], TOP_TECH_SKILLS
+    )
+    return (
+        {slug: by_category_id[category_id] for slug, category_id in categories.items()},
+        by_tech,
+        by_experience,
+    )
+
+
+def sql_market_stats() -> tuple[dict, dict, dict]:
+    """Same slices as `stream_market_stats`, grouped in Postgres so only aggregates cross the wire."""
+    result = supabase.rpc("market_snapshot_stats", {"tech_skills": TOP_TECH_SKILLS}).execute()
+    slices: dict[str, dict] = {"category": {}, "tech": {}, "experience": {}}
+    for row in result.data or []:
+        slices[row["dimension"]][row["value"]] = {
+            "job_count": row["job_count"],
+            "avg_salary_min": row["avg_salary_min"],
+            "avg_salary_max": row["avg_salary_max"],
+            "median_salary": row["median_salary"],
+        }
+    return slices["category"], slices["tech"], slices["experience"]
+
+
+def build_snapshot_rows(today: str, categories: CategoryRegistry, by_category: dict, by_tech: dict, by_experience: dict) -> list[dict]:
+    """market_snapshots rows: every category, tech skills with 3+ jobs, every experience level."""
+    empty = accumulators.SnapshotGroup().stats()
+    base = {"snapshot_date": today, "category_slug": None, "tech_skill": None, "experience_level": None}
+
+    snapshots = []
+    for slug in categories.slugs():
+        snapshots.append({**base, "category_slug": slug, **by_category.get(slug, empty)})
+    for tech in TOP_TECH_SKILLS:
+        stats = by_tech.get(tech, empty)
+        if stats["job_count"] >= 3:
+            snapshots.append({**base, "tech_skill": tech, **stats})
+    for level in EXPERIENCE_LEVELS:
+        snapshots.append({**base, "experience_level": level, **by_experience.get(level, empty)})
+    return snapshots
 
 
-def compute_market_snapshots():
+def compute_market_snapshots(use_sql: bool = False):
     """Create weekly snapshots of job market data."""
     print("Computing market snapshots...")
     today = date.today().isoformat()
@@ -182,89 +386,59 @@ def compute_market_snapshots():
         print(f"  Snapshot for {today} already exists, skipping")
         return
 
-    snapshots = []
-
-    # By category
-    categories = supabase.table("categories").select("slug").execute()
-    for cat in categories.data:
-        slug = cat["slug"]
-        jobs = supabase.table("jobs").select(
-            "salary_min, salary_max"
-        ).eq("is_active", True).eq(
-            "category_id",
-            supabase.table("categories").select("id").eq("slug", slug).execute().data[0]["id"]
-        ).execute()
-
-        salaries = [
-            int((j["salary_min"] + j["salary_max"]) / 2)
-            for j in jobs.data
-            if j.get("salary_min") and j.get("salary_max")
-        ]
-
-        snapshots.append({
-            "snapshot_date": today,
-            "category_slug": slug,
-            "tech_skill": None,
-            "experience_level": None,
-            "job_count": len(jobs.data),
-            "avg_salary_min": int(statistics.mean([j["salary_min"] for j in jobs.data if j.get("salary_min")])) if any(j.get("salary_min") for j in jobs.data) else None,
-            "avg_salary_max": int(statistics.mean([j["salary_max"] for j in jobs.data if j.get("salary_max")])) if any(j.get("salary_max") for j in jobs.data) else None,
-            "median_salary": int(statistics.median(salaries)) if salaries else None,
-        })
-
-    # By top tech skills
-    for tech in TOP_TECH_SKILLS:
-        jobs = supabase.table("jobs").select(
-            "salary_min, salary_max"
-        ).eq("is_active", True).contains("tech_stack", [tech]).execute()
-
-        salaries = [
-            int((j["salary_min"] + j["salary_max"]) / 2)
-            for j in jobs.data
-            if j.get("salary_min") and j.get("salary_max")
-        ]
-
-        if len(jobs.data) >= 3:
-            snapshots.append({
-                "snapshot_date": today,
-                "category_slug": None,
-                "tech_skill": tech,
-                "experience_level": None,
-                "job_count": len(jobs.data),
-                "avg_salary_min": int(statistics.mean([j["salary_min"] for j in jobs.data if j.get("salary_min")])) if any(j.get("salary_min") for j in jobs.data) else None,
-                "avg_salary_max": int(statistics.mean([j["salary_max"] for j in jobs.data if j.get("salary_max")])) if any(j.get("salary_max") for j in jobs.data) else None,
-                "median_salary": int(statistics.median(salaries)) if salaries else None,
-            })
-
-    # By experience level
-    for exp in ["junior", "mid", "senior", "lead", "executive"]:
-        jobs = supabase.table("jobs").select(
-            "salary_min, salary_max"
-        ).eq("is_active", True).eq("experience_level", exp).execute()
-
-        salaries = [
-            int((j["salary_min"] + j["salary_max"]) / 2)
-            for j in jobs.data
-            if j.get("salary_min") and j.get("salary_max")
-        ]
-
-        snapshots.append({
-            "snapshot_date": today,
-            "category_slug": None,
-            "tech_skill": None,
-            "experience_level": exp,
-            "job_count": len(jobs.data),
-            "avg_salary_min": int(statistics.mean([j["salary_min"] for j in jobs.data if j.get("salary_min")])) if any(j.get("salary_min") for j in jobs.data) else None,
-            "avg_salary_max": int(statistics.mean([j["salary_max"] for j in jobs.data if j.get("salary_max")])) if any(j.get("salary_max") for j in jobs.data) else None,
-            "median_salary": int(statistics.median(salaries)) if salaries else None,
-        })
+    categories = CategoryRegistry(supabase).load()
+    with stage("market_stats"):
+        by_category, by_tech, by_experience = sql_market_stats() if use_sql else stream_market_stats(categories)
+    snapshots = build_snapshot_rows(today, categories, by_category, by_tech, by_experience)
 
     if snapshots:
-        supabase.table("market_snapshots").insert(snapshots).execute()
+        with stage("write_snapshots"):
+            sink.insert("market_snapshots", snapshots, returning=False)
+        report.count("snapshots_inserted", len(snapshots))
         print(f"  Inserted {len(snapshots)} snapshots for {today}")
 
 
 if __name__ == "__main__":
-    compute_salary_benchmarks()
-    compute_market_snapshots()
-    print("Aggregation complete!")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--snapshots-in-sql",
+        action="store_true",
+        help="Group market snapshots in Postgres (market_snapshot_stats RPC) instead of streaming jobs",
+    )
+    parser.add_argument(
+        "--full-benchmarks",
+        action="store_true",
+        help="Rebuild every salary benchmark group instead of only those touched since the last run",
+    )
+    parser.add_argument(
+        "--check-benchmarks",
+        action="store_true",
+        help="Verify that an incremental benchmark refresh matches a full rebuild, then exit",
+    )
+    parser.add_argument(
+        "--sink",
+        choices=["postgrest", "postgres"],
+        default="postgrest",
+        help="Write snapshots through PostgREST, or with COPY over a direct connection (SUPABASE_DB_URL)",
+    )
+    parser.add_argument("--report", help="Write a JSON run report (stage timings, Supabase calls, counters) to this path")
+    parser.add_argument("--profile", help="Write cProfile stats for the whole run to this path")
+    args = parser.parse_args()
+    connect(sink_kind=args.sink)
+    report.meta.update({"script": "aggregate"})
+    ok = True
+    try:
+        with profiled(args.profile):
+            if args.check_benchmarks:
+                ok = check_incremental_benchmarks()
+            else:
+                with stage("salary_benchmarks"):
+                    compute_salary_benchmarks(full=args.full_benchmarks)
+                with stage("market_snapshots"):
+                    compute_market_snapshots(use_sql=args.snapshots_in_sql)
+                print("Aggregation complete!")
+    finally:
+        sink.close()
+        if args.report:
+            report.write(args.report)
+    sys.exit(0 if ok else 1)
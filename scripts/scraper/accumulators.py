@@ -0,0 +1,158 @@
+"""
+Row-wise accumulators for the aggregation pipeline (scripts/aggregate.py).
+Jobs are folded in one at a time as they stream from Supabase, so memory
+holds only per-group salaries and counters, never the job rows.
+"""
+
+from collections import Counter
+
+from quantiles import exact_percentile
+from titles import normalize_title
+
+EXPERIENCE_LEVELS = ["junior", "mid", "senior", "lead", "executive"]
+
+
+def group_key(job: dict) -> tuple[str, str] | None:
+    """(normalized title, experience level) benchmark group for a job, or None if the title doesn't normalize."""
+    # Stored at ingest; rows scraped before the column existed are normalized here
+    normalized = job.get("normalized_title") or normalize_title(job.get("title"))
+    if not normalized:
+        return None
+    return (normalized, job.get("experience_level") or "mid")
+
+
+class BenchmarkGroup:
+    """Running aggregates for one (normalized title, experience level) group.
+
+    Only salary midpoints and frequency counters are kept, never the job rows.
+    """
+
+    def __init__(self):
+        self.salaries: list[int] = []
+        self.companies: Counter = Counter()
+        self.tech: Counter = Counter()
+
+    def add(self, job: dict):
+        self.salaries.append(int((job["salary_min"] + job["salary_max"]) / 2))
+        if job.get("company_id"):
+            self.companies[job["company_id"]] += 1
+        for t in job.get("tech_stack") or []:
+            self.tech[t] += 1
+
+    def merge(self, other: "BenchmarkGroup") -> "BenchmarkGroup":
+        """Combine groups accumulated from separate pages or batches; returns self."""
+        self.salaries.extend(other.salaries)
+        self.companies.update(other.companies)
+        self.tech.update(other.tech)
+        return self
+
+    @property
+    def size(self) -> int:
+        return len(self.salaries)
+
+    def top_company_ids(self) -> list[str]:
+        return [cid for cid, _ in self.companies.most_common(5)]
+
+    def top_tech(self) -> list[str]:
+        return [t for t, _ in self.tech.most_common(5)]
+
+    def summary(self) -> dict:
+        """Salary stats and top-5 lists in the shape `build_benchmark_rows` consumes."""
+        ordered = sorted(self.salaries)
+        return {
+            "size": len(ordered),
+            "p25": exact_percentile(ordered, 25),
+            "p50": exact_percentile(ordered, 50),
+            "p75": exact_percentile(ordered, 75),
+            "mean": sum(ordered) // len(ordered),
+            "min": ordered[0],
+            "max": ordered[-1],
+            "top_company_ids": self.top_company_ids(),
+            "top_tech": self.top_tech(),
+        }
+
+
+def group_salary_jobs(
+    jobs,
+    keys: set[tuple[str, str]] | None = None,
+    backfill: dict[str, list[str]] | None = None,
+) -> tuple[dict[tuple[str, str], dict], int]:
+    """Fold jobs into per-(normalized title, experience) group summaries; returns (summaries, rows seen).
+
+    `keys` limits grouping to those groups. Ids of jobs normalized here rather than at
+    ingest are collected into `backfill` by normalized title.
+    """
+    groups: dict[tuple[str, str], BenchmarkGroup] = {}
+    seen = 0
+    for job in jobs:
+        seen += 1
+        key = group_key(job)
+        if not key or (keys is not None and key not in keys):
+            continue
+        if backfill is not None and not job.get("normalized_title"):
+            backfill.setdefault(key[0], []).append(job["id"])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = BenchmarkGroup()
+        group.add(job)
+    return {key: group.summary() for key, group in groups.items()}, seen
+
+
+class SnapshotGroup:
+    """Running job count and salary aggregates for one market snapshot slice."""
+
+    def __init__(self):
+        self.job_count = 0
+        self.min_total = 0
+        self.min_count = 0
+        self.max_total = 0
+        self.max_count = 0
+        self.midpoints: list[int] = []
+
+    def add(self, job: dict):
+        self.job_count += 1
+        low, high = job.get("salary_min"), job.get("salary_max")
+        if low:
+            self.min_total += low
+            self.min_count += 1
+        if high:
+            self.max_total += high
+            self.max_count += 1
+        if low and high:
+            self.midpoints.append(int((low + high) / 2))
+
+    def stats(self) -> dict:
+        return {
+            "job_count": self.job_count,
+            "avg_salary_min": int(self.min_total // self.min_count) if self.min_count else None,
+            "avg_salary_max": int(self.max_total // self.max_count) if self.max_count else None,
+            "median_salary": exact_percentile(sorted(self.midpoints), 50) if self.midpoints else None,
+        }
+
+
+def accumulate_market(jobs, category_ids: list[str], tech_skills: list[str]) -> tuple[dict, dict, dict]:
+    """Fold active jobs into category, tech-skill and experience slices in one pass.
+
+    Returns stats dicts keyed by category id, tech skill and experience level.
+    """
+    by_category = {category_id: SnapshotGroup() for category_id in category_ids}
+    by_tech = {tech: SnapshotGroup() for tech in tech_skills}
+    by_experience = {level: SnapshotGroup() for level in EXPERIENCE_LEVELS}
+
+    for job in jobs:
+        group = by_category.get(job.get("category_id"))
+        if group:
+            group.add(job)
+        for tech in set(job.get("tech_stack") or []):
+            group = by_tech.get(tech)
+            if group:
+                group.add(job)
+        group = by_experience.get(job.get("experience_level"))
+        if group:
+            group.add(job)
+
+    return (
+        {category_id: group.stats() for category_id, group in by_category.items()},
+        {tech: group.stats() for tech, group in by_tech.items()},
+        {level: group.stats() for level, group in by_experience.items()},
+    )
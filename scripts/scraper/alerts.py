@@ -0,0 +1,123 @@
+"""
+Job-alert matching for newly inserted jobs.
+Active `job_alerts` are compiled into an inverted index from keyword tokens
+and categories to alerts, and each new job is matched against it in one pass
+over its own tokens, so cost grows with new jobs plus matches rather than
+jobs x alerts. Matches are recorded in `job_alert_matches`.
+"""
+
+import re
+from datetime import datetime, timezone
+
+from db import chunked, iter_rows
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[+#]+|\.[a-z0-9]+)*")
+# Keyword phrases are comma-separated; a phrase matches when all its words appear
+PHRASE_SEPARATORS = re.compile(r"[,;|\n]+")
+
+# Only the start of long descriptions is scanned, like the keyword extractors
+DESCRIPTION_CHARS = 5000
+
+WRITE_CHUNK_SIZE = 500
+
+
+def tokenize(text: str | None) -> set[str]:
+    return set(TOKEN_PATTERN.findall(text.lower())) if text else set()
+
+
+def parse_keywords(keywords: str | None) -> list[frozenset[str]]:
+    """Keyword phrases as token sets; empty phrases are dropped."""
+    if not keywords:
+        return []
+    return [tokens for phrase in PHRASE_SEPARATORS.split(keywords) if (tokens := frozenset(tokenize(phrase)))]
+
+
+def job_tokens(job: dict) -> set[str]:
+    tokens = tokenize(job.get("title"))
+    tokens |= tokenize((job.get("description_plain") or "")[:DESCRIPTION_CHARS])
+    for tech in job.get("tech_stack") or []:
+        tokens |= tokenize(tech)
+    return tokens
+
+
+class AlertIndex:
+    """Inverted index over active alerts.
+
+    Each keyword phrase is posted under its least common token (across all
+    phrases), so a job only checks phrases whose rarest word it contains.
+    Alerts without keywords are indexed by category; alerts with neither
+    keywords nor a category are skipped rather than matched to every job.
+    """
+
+    def __init__(self, alerts: list[dict]):
+        alerts = [a for a in alerts if a.get("category_slug") or parse_keywords(a.get("keywords"))]
+        phrases = [(alert, tokens) for alert in alerts for tokens in parse_keywords(alert.get("keywords"))]
+        frequency: dict[str, int] = {}
+        for _, tokens in phrases:
+            for token in tokens:
+                frequency[token] = frequency.get(token, 0) + 1
+
+        # token -> [(alert id, alert category or None, phrase tokens)]
+        self.postings: dict[str, list[tuple[str, str | None, frozenset[str]]]] = {}
+        for alert, tokens in phrases:
+            anchor = min(tokens, key=lambda t: (frequency[t], t))
+            self.postings.setdefault(anchor, []).append((alert["id"], alert.get("category_slug"), tokens))
+
+        # category slug -> ids of alerts without keywords
+        self.by_category: dict[str, list[str]] = {}
+        for alert in alerts:
+            if not parse_keywords(alert.get("keywords")):
+                self.by_category.setdefault(alert.get("category_slug"), []).append(alert["id"])
+        self.size = len(alerts)
+
+    def match(self, job: dict, category: str | None) -> set[str]:
+        """Ids of alerts matching a job in `category`."""
+        matched = set(self.by_category.get(category, ()) if category else ())
+        tokens = job_tokens(job)
+        for token in tokens & self.postings.keys():
+            for alert_id, alert_category, phrase in self.postings[token]:
+                if (alert_category is None or alert_category == category) and phrase <= tokens:
+                    matched.add(alert_id)
+        return matched
+
+
+def match_alerts(index: AlertIndex, jobs: list[dict], category_slugs: dict[str, str]) -> dict[str, list[str]]:
+    """Per-alert digests: alert id -> ids of matching jobs, in job order."""
+    digests: dict[str, list[str]] = {}
+    for job in jobs:
+        for alert_id in index.match(job, category_slugs.get(job.get("category_id"))):
+            digests.setdefault(alert_id, []).append(job["id"])
+    return digests
+
+
+def load_alerts(client) -> list[dict]:
+    return list(iter_rows(
+        client,
+        "job_alerts",
+        "id, category_slug, keywords, frequency",
+        lambda q: q.eq("is_active", True),
+    ))
+
+
+def write_digests(client, digests: dict[str, list[str]]) -> int:
+    """Record matches in bulk; re-matching the same job to an alert is a no-op."""
+    matched_at = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {"alert_id": alert_id, "job_id": job_id, "matched_at": matched_at}
+        for alert_id, job_ids in digests.items()
+        for job_id in job_ids
+    ]
+    for chunk in chunked(rows, WRITE_CHUNK_SIZE):
+        client.table("job_alert_matches").upsert(chunk, on_conflict="alert_id,job_id", ignore_duplicates=True).execute()
+    return len(rows)
+
+
+def match_new_jobs(client, jobs: list[dict], category_slugs: dict[str, str]) -> tuple[int, int]:
+    """Match jobs inserted this run against every active alert; returns (alerts matched, matches written)."""
+    if not jobs:
+        return 0, 0
+    alerts = load_alerts(client)
+    if not alerts:
+        return 0, 0
+    digests = match_alerts(AlertIndex(alerts), jobs, category_slugs)
+    return len(digests), write_digests(client, digests)
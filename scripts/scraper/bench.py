@@ -0,0 +1,1109 @@
+"""
+Offline benchmarks for the scraper and aggregation hot paths.
+Each subcommand checks the optimized path against the reference implementation
+on synthetic data before timing it, and exits non-zero on any mismatch.
+Run: python scripts/scraper/bench.py {transform,keywords,titles,pipeline,incremental,alerts,neardup,windows,schedule,queue} [--rows N]
+     python scripts/scraper/bench.py sinks --dsn postgresql://...   (a scratch database: it creates and drops tables)
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+import accumulators
+import watermarks
+
+from db import chunked
+from engine import SITE_RATE_LIMITS
+from scheduler import DEFAULT_RESULTS_WANTED, QueryScheduler
+from sinks import PostgresSink
+from workqueue import SqliteQueue, SupabaseQueue
+
+from alerts import AlertIndex, job_tokens, match_alerts, parse_keywords
+from neardup import NearDupIndex, match_key, shingles, signature
+
+from transform import (
+    ASYNC_KEYWORDS, CATEGORY_MAP, CATEGORY_PRIORITY, EXPERIENCE_MAP, TECH_KEYWORDS, VISA_KEYWORDS,
+    classify_category, extract_signals, extract_tech_stack, make_fingerprint, transform_frame, transform_row,
+)
+from titles import ROLE_NORMALIZATIONS, _normalize_lower, normalize_title, normalize_title_reference
+
+TITLES = [
+    "Senior Software Engineer", "Jr. Frontend Developer", "Data Scientist II", "Product Manager, Growth",
+    "Staff Backend Engineer (Go)", "UX Designer", "Customer Success Manager", "Technical Writer",
+    "DevOps / SRE Lead", "Machine Learning Engineer", "Head of Marketing", "Math Tutor",
+    "Full-Stack Developer – React/Node", "QA Engineer", "VP Engineering", "Content Strategist",
+]
+COMPANIES = ["Acme Inc.", "Globex", "Initech LLC", "Umbrella Corp", "Hooli", "Stark Industries", "Wayne Enterprises", "nan"]
+SITES = ["indeed", "linkedin", "glassdoor", "google", "zip_recruiter"]
+SNIPPETS = [
+    "<p>We use <b>React</b>, TypeScript and Node.js on AWS.</p>", "Python, Django, PostgreSQL and Redis.",
+    "Go services on Kubernetes with Terraform.", "Java and JavaScript experience required.",
+    "Modern JavaScript, HTML and a good eye for detail.", "Ship features on GitHub Actions and Tailwind CSS.",
+    "Async-first team, flexible hours, any timezone.", "Visa sponsorship available for the right candidate.",
+    "Good communication skills and a growth mindset.", "Entry level role, senior mentorship.",
+    "<ul><li>Figma</li><li>Sketch</li></ul>", "Kafka, Spark, Snowflake and BigQuery pipelines.",
+]
+FILLER = [
+    "You will work closely with a small, friendly team.", "We value ownership, curiosity and clear writing.",
+    "Benefits include health insurance and a home office stipend.", "Our customers rely on us every day.",
+    "You have shipped production software and enjoy mentoring others.", "We are a good place to grow your career.",
+]
+INTERVALS = ["yearly", "hourly", "monthly", None, "weekly"]
+
+
+def synthetic_jobs_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """A JobSpy-shaped DataFrame with realistic gaps, HTML and salary intervals."""
+    rng = random.Random(seed)
+    today = date(2026, 1, 15)
+    records = []
+    for i in range(rows):
+        interval = rng.choice(INTERVALS)
+        base = {"hourly": 60, "monthly": 8000}.get(interval, 120000)
+        low = rng.choice([None, float("nan"), 0, base * rng.uniform(0.5, 1.2)])
+        records.append({
+            "id": rng.choice([f"{rng.choice(SITES)}-{i}", None, float("nan")]),
+            "site": rng.choice(SITES),
+            "title": rng.choice(TITLES + [None, ""]),
+            "company": rng.choice(COMPANIES + [None]),
+            "description": " ".join(
+                rng.sample(SNIPPETS, rng.randint(0, 5)) + [rng.choice(FILLER) for _ in range(rng.randint(0, 60))]
+            ),
+            "min_amount": low,
+            "max_amount": rng.choice([None, float("nan"), base * rng.uniform(1.0, 1.6)]),
+            "interval": interval,
+            "date_posted": rng.choice([today - timedelta(days=rng.randint(0, 14)), None, float("nan")]),
+            "job_url": rng.choice([f"https://example.com/jobs/{i}", None]),
+            "job_url_direct": rng.choice([f"https://careers.example.com/{i}", None, ""]),
+            "company_logo": rng.choice(["https://logo.example.com/x.png", None]),
+            "company_url": rng.choice(["https://www.acme.com", None]),
+            "company_description": rng.choice(["We build things.", None]),
+            "company_num_employees": rng.choice(["11-50", "1,001-5,000", None]),
+        })
+    return pd.DataFrame(records)
+
+
+def timed(fn, *args, repeat: int = 3):
+    """Best-of-`repeat` wall time and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_transform(args) -> bool:
+    jobs_df = synthetic_jobs_frame(args.rows)
+    now = "2026-01-15T00:00:00"
+
+    def per_row(df):
+        return [r for r in (transform_row(row, now) for _, row in df.iterrows()) if r is not None]
+
+    def columnar(df):
+        return transform_frame(df, now).to_dict("records")
+
+    row_time, expected = timed(per_row, jobs_df)
+    frame_time, actual = timed(columnar, jobs_df)
+
+    ok = expected == actual
+    if not ok:
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            diff = {k: (e[k], a.get(k)) for k in e if e[k] != a.get(k)}
+            if diff:
+                print(f"  Mismatch at record {i}: {diff}")
+                break
+        else:
+            print(f"  Record count differs: {len(expected)} per-row vs {len(actual)} column-wise")
+
+    wrong = [
+        (title, expected, found)
+        for title in CATEGORY_CASES
+        if (found := classify_category(title)) != (expected := legacy_category(title))
+    ]
+    for title, expected, found in wrong:
+        print(f"  Category mismatch {title!r}: substring scan {expected!r}, matcher {found!r}")
+
+    print(f"transform: {args.rows} rows -> {len(actual)} records, equivalent={ok}, "
+          f"{len(CATEGORY_CASES) - len(wrong)}/{len(CATEGORY_CASES)} category cases match the substring scan")
+    print(f"  per-row iterrows: {row_time:.3f}s ({args.rows / row_time:,.0f} rows/s)")
+    print(f"  transform_frame:  {frame_time:.3f}s ({args.rows / frame_time:,.0f} rows/s), {row_time / frame_time:.1f}x")
+    return ok and not wrong
+
+
+# Titles the whole-word category matcher must classify like the old substring scan,
+# including "-ing" and "-ment" forms the substring scan caught inside longer words
+CATEGORY_CASES = TITLES + [
+    "Data Engineering Manager", "Analytics Engineering Lead", "ML Engineering Manager", "Head of AI Engineering",
+    "Product Management Lead", "Program Management Director", "Account Management Specialist",
+    "Brand Management Lead", "Editorial Lead", "Online Tutoring Coordinator", "Senior Data Engineers",
+]
+
+
+def legacy_category(title: str) -> str:
+    """The pre-matcher category scan: first CATEGORY_PRIORITY category with a keyword substring in the title."""
+    title_lower = title.lower()
+    return next(
+        (category for category in CATEGORY_PRIORITY if any(k in title_lower for k in CATEGORY_MAP[category])), "engineering"
+    )
+
+
+def legacy_signals(title: str, description: str, description_plain: str) -> dict:
+    """The pre-matcher substring scans: one `in` check per keyword on lowercased text."""
+    text_lower = description.lower()
+    combined = f"{title} {description_plain[:500]}".lower()
+    return {
+        "tech_stack": [t for t in TECH_KEYWORDS if t.lower() in text_lower][:10],
+        "visa_sponsorship": any(k in text_lower for k in VISA_KEYWORDS),
+        "is_async_friendly": any(k in text_lower for k in ASYNC_KEYWORDS),
+        "experience_level": next(
+            (level for level, kws in EXPERIENCE_MAP.items() if any(k in combined for k in kws)), "mid"
+        ),
+    }
+
+
+# Prose that opens with a tech name that is also an everyday word, and real mentions of it
+TECH_CASES = [
+    ("Go above and beyond for our customers.", set()),
+    ("We love what we do. Go above and beyond!", set()),
+    ("Express interest by emailing us. We use Python.", {"Python"}),
+    ("Spark joy in your team and ship often.", set()),
+    ("Sketch out ideas with design before building.", set()),
+    ("Let's go to the offsite, a good time.", set()),
+    ("Our backend is written in Go.", {"Go"}),
+    ("Go, Rust and Python services.", {"Go", "Rust", "Python"}),
+    ("Go services on Kubernetes with Terraform.", {"Go", "Kubernetes", "Terraform"}),
+    ("Go/Golang experience required.", {"Go"}),
+    ("Requirements:\nGo\nKafka", {"Go", "Kafka"}),
+    ("Golang microservices on AWS.", {"Go", "AWS"}),
+    ("Built with Node.js and Express.", {"Node.js", "Express"}),
+    ("Spark, Kafka and Snowflake pipelines.", {"Spark", "Kafka", "Snowflake"}),
+    ("Designs live in Figma and Sketch.", {"Figma", "Sketch"}),
+    ("A REST API. Rest assured, we have benefits.", {"REST"}),
+]
+
+
+def bench_keywords(args) -> bool:
+    jobs_df = synthetic_jobs_frame(args.rows)
+    jobs = [(t, d) for t, d in zip(jobs_df["title"], jobs_df["description"]) if isinstance(t, str) and t]
+
+    def legacy(items):
+        return [legacy_signals(t, d, d) for t, d in items]
+
+    def compiled(items):
+        return [extract_signals(t, d) for t, d in items]
+
+    legacy_time, before = timed(legacy, jobs)
+    compiled_time, after = timed(compiled, jobs)
+
+    def tagged(results, tech):
+        return sum(tech in r["tech_stack"] for r in results)
+
+    wrong = [(text, expected, found) for text, expected in TECH_CASES if (found := set(extract_tech_stack(text))) != expected]
+    for text, expected, found in wrong:
+        print(f"  Mismatch {text!r}: expected {sorted(expected)}, tagged {sorted(found)}")
+
+    print(f"keywords: {len(jobs)} jobs, {len(TECH_CASES) - len(wrong)}/{len(TECH_CASES)} tech-context cases right")
+    print(f"  substring scans:  {legacy_time / len(jobs) * 1e6:.1f} us/job")
+    print(f"  compiled matcher: {compiled_time / len(jobs) * 1e6:.1f} us/job, {legacy_time / compiled_time:.1f}x")
+    for tech in ("Go", "Java", "Git", "CSS"):
+        print(f"  jobs tagged {tech!r}: {tagged(before, tech)} -> {tagged(after, tech)}")
+    return not wrong
+
+
+def bench_titles(args) -> bool:
+    rng = random.Random(7)
+    extra = ["Sr. SWE", "Front End / Backend Developer", "Site Reliability Engineer", "Full Stack Eng", "Backend Tech Lead"]
+    titles = [rng.choice(TITLES + extra) + rng.choice(["", "", " II", " (Remote)"]) for _ in range(args.rows)]
+
+    def reference(items):
+        return [normalize_title_reference(t) for t in items]
+
+    def compiled(items):
+        _normalize_lower.cache_clear()
+        return [normalize_title(t) for t in items]
+
+    reference_time, expected = timed(reference, titles)
+    compiled_time, actual = timed(compiled, titles)
+
+    ok = expected == actual
+    if not ok:
+        i = next(i for i, (e, a) in enumerate(zip(expected, actual)) if e != a)
+        print(f"  Mismatch for {titles[i]!r}: {expected[i]!r} vs {actual[i]!r}")
+
+    print(f"titles: {len(titles)} titles ({len(set(titles))} distinct), equivalent={ok}")
+    print(f"  re.search loop:       {reference_time / len(titles) * 1e6:.2f} us/title")
+    print(f"  compiled + lru_cache: {compiled_time / len(titles) * 1e6:.2f} us/title, {reference_time / compiled_time:.1f}x")
+    return ok
+
+
+def synthetic_db_jobs(rows: int, seed: int = 3) -> list[dict]:
+    """Active `jobs` rows as aggregate.py streams them, with skewed group sizes and missing fields."""
+    rng = random.Random(seed)
+    roles = list(ROLE_NORMALIZATIONS)
+    levels = accumulators.EXPERIENCE_LEVELS + [None]
+    companies = [f"company-{i}" for i in range(2000)] + [None]
+    categories = [f"category-{i}" for i in range(12)] + [None]
+    tech = [t for t in TECH_KEYWORDS]
+    jobs = []
+    for i in range(rows):
+        low = rng.choice([None, 0, int(rng.lognormvariate(11.6, 0.35))])
+        high = rng.choice([None, int(low * rng.uniform(1.05, 1.6)) if low else int(rng.lognormvariate(11.9, 0.35))])
+        role = roles[min(int(rng.expovariate(0.25)), len(roles) - 1)]
+        jobs.append({
+            "id": f"{i:08d}",
+            "title": rng.choice(TITLES),
+            "normalized_title": role if rng.random() < 0.9 else None,
+            "experience_level": rng.choice(levels),
+            "category_id": rng.choice(categories),
+            "company_id": companies[min(int(rng.expovariate(0.01)), len(companies) - 1)],
+            "tech_stack": rng.sample(tech, rng.randint(0, 6)),
+            "salary_min": low,
+            "salary_max": high,
+        })
+    return jobs
+
+
+def synthetic_unit_frames(queries: list[str], sites: list[str], rows: int, seed: int = 7) -> dict[tuple[str, str], pd.DataFrame]:
+    """Per-(query, site) JobSpy frames. Each query has `rows` distinct postings and every
+    site lists a random 60% of them, so boards overlap the way syndicated listings do."""
+    rng = random.Random(seed)
+    today = date.today()
+    frames = {}
+    for q, query in enumerate(queries):
+        base = synthetic_jobs_frame(rows, seed=seed + q)
+        base["title"] = [f"{t} {q}-{i}" if isinstance(t, str) and t else t for i, t in enumerate(base["title"])]
+        base["company"] = [f"{c} {q}-{i % 40}" if isinstance(c, str) else c for i, c in enumerate(base["company"])]
+        base["date_posted"] = [today - timedelta(days=rng.randint(0, 14)) for _ in range(rows)]
+        for site in sites:
+            picked = sorted(rng.sample(range(rows), int(rows * 0.6)))
+            df = base.iloc[picked].copy()
+            df["site"] = site
+            df["id"] = [f"{site}-{q}-{i}" for i in picked]
+            frames[(query, site)] = df.reset_index(drop=True)
+    return frames
+
+
+def measured(fn, db) -> dict:
+    """Run `fn` quietly under tracemalloc; wall seconds, peak traced bytes and round trips."""
+    requests = db.requests
+    tracemalloc.start()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak": peak, "requests": db.requests - requests}
+
+
+def bench_pipeline(args) -> bool:
+    # Both scripts connect to Supabase only when told to, so the fake backend can be injected
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import aggregate
+    import scrape
+    from cache import ScrapeCache
+    from fakedb import FakeSupabase
+
+    queries = scrape.SEARCH_QUERIES[:args.queries]
+    frames = synthetic_unit_frames(queries, scrape.SCRAPE_SITES, args.rows)
+    found = sum(len(df) for df in frames.values())
+    expected = len({fp for df in frames.values() for fp in transform_frame(df)["fingerprint"]})
+
+    db = FakeSupabase()
+    db.seed("categories", [{"slug": slug, "name": slug.title(), "job_count": 0} for slug in CATEGORY_PRIORITY])
+    db.seed("job_alerts", [{**alert, "is_active": True, "frequency": "daily"} for alert in synthetic_alerts(args.alerts)])
+    scrape.connect(db)
+    aggregate.connect(db)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Replay mode loads every unit from the cache: no network and no throttling
+        cache = ScrapeCache(scrape.SCRAPE_PARAMS, directory=directory, replay=True)
+        for (query, site), df in frames.items():
+            cache.put(query, [site], df)
+        results["scrape"] = measured(lambda: scrape.scrape_and_load(workers=2, cache=cache, run_id="bench-1"), db)
+        inserted = len(db.tables["jobs"])
+        results["scrape (rerun)"] = measured(lambda: scrape.scrape_and_load(workers=2, cache=cache, run_id="bench-2"), db)
+        reinserted = len(db.tables["jobs"]) - inserted
+        alert_matches = len(db.tables.get("job_alert_matches", []))
+
+    now = datetime.now().astimezone().isoformat()
+    db.seed("jobs", [
+        {**job, "slug": f"seed-{job['id']}", "source": "manual", "source_id": job["id"], "is_active": True, "date_posted": now}
+        for job in synthetic_db_jobs(args.db_jobs)
+    ])
+    active = sum(1 for job in db.tables["jobs"] if job.get("is_active"))
+    results["benchmarks (full)"] = measured(lambda: aggregate.compute_salary_benchmarks(full=True), db)
+    benchmarks = len(db.tables["salary_benchmarks"])
+    results["benchmarks (incremental)"] = measured(aggregate.compute_salary_benchmarks, db)
+    results["snapshots"] = measured(aggregate.compute_market_snapshots, db)
+    snapshots = len(db.tables["market_snapshots"])
+
+    ok = inserted == expected and reinserted == 0 and alert_matches > 0 and benchmarks > 0 and snapshots > 0
+    print(f"pipeline: {len(frames)} (query, site) units, {found} scraped rows, {expected} distinct postings; "
+          f"inserted {inserted}, rerun inserted {reinserted}, {alert_matches} alert matches, {benchmarks} benchmarks, {snapshots} snapshots, ok={ok}")
+    print(f"  {'stage':<26}{'seconds':>9}{'jobs/s':>11}{'round trips':>13}{'per job':>9}{'peak MiB':>10}")
+    for name, r in results.items():
+        jobs = found if name.startswith("scrape") else active
+        print(f"  {name:<26}{r['seconds']:>9.2f}{jobs / r['seconds']:>11,.0f}{r['requests']:>13}"
+              f"{r['requests'] / jobs:>9.3f}{r['peak'] / 2**20:>10.1f}")
+    print("  (timed under tracemalloc; jobs/s counts scraped rows for scrape stages and active jobs for aggregation)")
+    return ok
+
+
+def mutate_jobs(db, changes: int, seed: int = 5) -> dict[str, int]:
+    """Change salaries, titles and levels of random jobs, deactivate and delete some, and post new ones."""
+    rng = random.Random(seed)
+    ids = [job["id"] for job in db.tables["jobs"]]
+    picked = rng.sample(ids, changes * 5)
+    salaries, titles, levels, deactivated, deleted = (picked[i * changes:(i + 1) * changes] for i in range(5))
+    for job_id in salaries:
+        low = int(rng.lognormvariate(11.6, 0.35))
+        db.table("jobs").update({"salary_min": low, "salary_max": int(low * rng.uniform(1.05, 1.6))}).eq("id", job_id).execute()
+    for job_id in titles:
+        # Retitled at ingest before normalized titles are computed, as older scraper versions did
+        db.table("jobs").update({"title": rng.choice(TITLES), "normalized_title": None}).eq("id", job_id).execute()
+    for job_id in levels:
+        db.table("jobs").update({"experience_level": rng.choice(accumulators.EXPERIENCE_LEVELS)}).eq("id", job_id).execute()
+    for chunk in chunked(deactivated, 100):
+        db.table("jobs").update({"is_active": False}).in_("id", chunk).execute()
+    for chunk in chunked(deleted, 100):
+        db.table("jobs").delete().in_("id", chunk).execute()
+    new = synthetic_db_jobs(changes, seed=seed + 1)
+    db.table("jobs").insert([
+        {**job, "id": f"new-{job['id']}", "slug": f"new-{job['id']}", "source": "manual", "source_id": f"new-{job['id']}", "is_active": True}
+        for job in new
+    ]).execute()
+    return {"salaries": len(salaries), "titles": len(titles), "levels": len(levels),
+            "deactivated": len(deactivated), "deleted": len(deleted), "posted": len(new)}
+
+
+def bench_incremental(args) -> bool:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import aggregate
+    from fakedb import FakeSupabase
+
+    compared = [f for f in aggregate.BENCHMARK_FIELDS if f not in ("normalized_title", "experience_level")]
+    # Seeded before the full run's watermark, so only the mutations count as touched
+    earlier = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    db = FakeSupabase()
+    db.seed("jobs", [
+        {**job, "slug": f"seed-{job['id']}", "source": "manual", "source_id": job["id"], "is_active": True,
+         "created_at": earlier, "updated_at": earlier}
+        for job in synthetic_db_jobs(args.rows)
+    ])
+    aggregate.connect(db)
+    full = measured(lambda: aggregate.compute_salary_benchmarks(full=True), db)
+    changed = mutate_jobs(db, args.changes)
+
+    before = json.dumps({name: db.tables.get(name) for name in ("jobs", "salary_benchmarks", "salary_benchmark_departures")}, sort_keys=True)
+    with redirect_stdout(io.StringIO()):
+        checked = aggregate.check_incremental_benchmarks()
+    untouched = json.dumps({name: db.tables.get(name) for name in ("jobs", "salary_benchmarks", "salary_benchmark_departures")}, sort_keys=True) == before
+
+    incremental = measured(aggregate.compute_salary_benchmarks, db)
+    stored = {aggregate.benchmark_key(row): row for row in db.tables["salary_benchmarks"]}
+    with redirect_stdout(io.StringIO()):
+        rebuilt = {aggregate.benchmark_key(row): row for row in aggregate.full_benchmarks()[0]}
+    problems = [
+        f"{key}: {'missing from incremental' if key not in stored else 'extra in incremental' if key not in rebuilt else 'differs'}"
+        for key in sorted(stored.keys() | rebuilt.keys())
+        if key not in stored or key not in rebuilt or any(stored[key][f] != rebuilt[key][f] for f in compared)
+    ]
+    for problem in problems[:10]:
+        print(f"  Mismatch {problem}")
+    print(f"incremental: {args.rows} jobs, {len(rebuilt)} groups; "
+          f"{', '.join(f'{n} {k}' for k, n in changed.items())}; "
+          f"check passed={checked}, check wrote nothing={untouched}, equivalent to full rebuild={not problems}")
+    print(f"  full: {full['seconds']:.2f}s, {full['requests']} round trips   "
+          f"incremental: {incremental['seconds']:.2f}s, {incremental['requests']} round trips")
+    return checked and untouched and not problems
+
+
+def synthetic_alerts(count: int, seed: int = 11) -> list[dict]:
+    """Alerts with 1-3 keyword phrases drawn from tech and title words (5% with none), a third scoped to a category."""
+    rng = random.Random(seed)
+    words = sorted({w for text in TECH_KEYWORDS + TITLES for w in text.lower().split() if w.isalpha()})
+    alerts = []
+    for i in range(count):
+        n_phrases = 0 if rng.random() < 0.05 else rng.randint(1, 3)
+        phrases = [" ".join(rng.sample(words, rng.choice((1, 2, 2)))) for _ in range(n_phrases)]
+        alerts.append({
+            "id": f"alert-{i}",
+            "category_slug": rng.choice(CATEGORY_PRIORITY) if rng.random() < 0.33 else None,
+            "keywords": ", ".join(phrases) or None,
+        })
+    return alerts
+
+
+def naive_match(alerts: list[dict], jobs: list[dict], category_slugs: dict[str, str]) -> dict[str, list[str]]:
+    """Every alert against every job; alerts with no keywords and no category match nothing."""
+    compiled = [(a["id"], a.get("category_slug"), parse_keywords(a.get("keywords"))) for a in alerts]
+    digests: dict[str, list[str]] = {}
+    for job in jobs:
+        tokens = job_tokens(job)
+        category = category_slugs.get(job.get("category_id"))
+        for alert_id, alert_category, phrases in compiled:
+            if alert_category is not None and alert_category != category or not (phrases or alert_category):
+                continue
+            if not phrases or any(p <= tokens for p in phrases):
+                digests.setdefault(alert_id, []).append(job["id"])
+    return digests
+
+
+def bench_alerts(args) -> bool:
+    jobs_df = synthetic_jobs_frame(args.rows)
+    rng = random.Random(5)
+    category_slugs = {f"cat-{slug}": slug for slug in CATEGORY_PRIORITY}
+    jobs = [
+        {"id": f"job-{i}", "title": t, "description_plain": d, "tech_stack": [], "category_id": rng.choice(list(category_slugs))}
+        for i, (t, d) in enumerate(zip(jobs_df["title"], jobs_df["description"]))
+        if isinstance(t, str) and t
+    ]
+    alerts = synthetic_alerts(args.alerts)
+
+    naive_time, expected = timed(naive_match, alerts, jobs, category_slugs, repeat=1)
+    build_time, index = timed(AlertIndex, alerts)
+    index_time, actual = timed(match_alerts, index, jobs, category_slugs)
+
+    unscoped = {a["id"] for a in alerts if not a.get("category_slug") and not parse_keywords(a.get("keywords"))}
+    ok = expected == actual and not unscoped & actual.keys()
+    if not ok:
+        differing = [a for a in expected.keys() | actual.keys() if expected.get(a) != actual.get(a)]
+        print(f"  {len(differing)} alerts differ, e.g. {differing[0]}")
+    matches = sum(len(ids) for ids in actual.values())
+    print(f"alerts: {len(alerts)} alerts ({len(unscoped)} without keywords or category, skipped) x {len(jobs)} jobs -> "
+          f"{matches} matches for {len(actual)} alerts, equivalent={ok}")
+    print(f"  per-alert scan:  {naive_time:.3f}s ({len(jobs) / naive_time:,.0f} jobs/s)")
+    print(f"  inverted index:  {index_time:.3f}s ({len(jobs) / index_time:,.0f} jobs/s), {naive_time / index_time:.1f}x"
+          f" (+{build_time * 1000:.0f}ms to build)")
+    return ok
+
+
+ROLES = ["Software Engineer", "Backend Engineer", "Data Scientist", "Product Manager", "UX Designer", "DevOps Engineer",
+         "Customer Success Manager", "Technical Writer", "Marketing Manager", "QA Engineer"]
+LEVELS = ["", "Senior", "Junior", "Staff", "Lead"]
+
+
+def near_dup_corpus(postings: int, seed: int = 13) -> list[tuple[int, str, str, str]]:
+    """Labeled (cluster, title, company, description) postings, shuffled.
+
+    Each cluster is one posting syndicated 1-4 times with the rewording boards
+    apply. Company sizes are Zipf-like and postings at the same company share
+    boilerplate, often a title and some of their body (the same role posted for
+    several teams), so distinct clusters make hard negatives.
+    """
+    rng = random.Random(seed)
+    vocab = [f"{rng.choice('bcdfgklmnprst')}{rng.choice('aeiou')}{rng.choice('bcdfgklmnprst')}{i}" for i in range(3000)]
+    sentences = [" ".join(rng.choices(vocab, k=rng.randint(8, 16))) + "." for _ in range(2000)]
+    companies = [f"{rng.choice(vocab).title()} {rng.choice(['Labs', 'Systems', 'Health', 'Works', ''])}".strip() for _ in range(postings // 8)]
+    weights = [1 / (rank + 1) for rank in range(len(companies))]
+    boilerplate = {c: " ".join(rng.sample(FILLER, 3) + rng.sample(sentences, 2)) for c in companies}
+    # (company, title) -> sentences of that role's posting template
+    templates: dict[tuple[str, str], list[str]] = {}
+
+    def reword_title(title: str) -> str:
+        title = title.replace("Senior", rng.choice(["Sr.", "Senior", "SR"])).replace("Junior", rng.choice(["Jr.", "Junior"]))
+        return title + rng.choice(["", "", " - Remote", " (Remote, US)", " | Hybrid"])
+
+    def reword_company(company: str) -> str:
+        return company + rng.choice(["", "", " Inc.", ", LLC", " Corp"])
+
+    def reword_description(text: str) -> str:
+        words = text.split()
+        cut = int(len(words) * rng.uniform(0.7, 1.0))
+        tail = rng.choice(["", "", " Apply on our careers site.", " Equal opportunity employer."])
+        return " ".join(words[:cut]) + tail
+
+    corpus = []
+    for cluster in range(postings // 2):
+        company = rng.choices(companies, weights)[0]
+        title = f"{rng.choice(LEVELS)} {rng.choice(ROLES)}".strip()
+        template = templates.setdefault((company, title), rng.sample(sentences, 6))
+        # Half of a team variant's body is the role template, half its own
+        body = " ".join(rng.sample(template, 3) + rng.sample(sentences, 3))
+        description = f"{boilerplate[company]} {body}" if rng.random() < 0.5 else f"{body} {boilerplate[company]}"
+        corpus.append((cluster, title, company, description))
+        for _ in range(rng.choice([0, 1, 1, 2, 3])):
+            corpus.append((cluster, reword_title(title), reword_company(company), reword_description(description)))
+    rng.shuffle(corpus)
+    return corpus
+
+
+def dedup_decisions(corpus, is_duplicate) -> dict:
+    """Stream the corpus through a detector; precision and recall of its duplicate calls."""
+    seen = set()
+    tp = fp = fn = 0
+    for cluster, title, company, description in corpus:
+        predicted = is_duplicate(title, company, description)
+        actual = cluster in seen
+        seen.add(cluster)
+        tp += predicted and actual
+        fp += predicted and not actual
+        fn += actual and not predicted
+    return {"precision": tp / max(tp + fp, 1), "recall": tp / max(tp + fn, 1), "false_positives": fp}
+
+
+def bench_neardup(args) -> bool:
+    from fakedb import FakeSupabase
+
+    corpus = near_dup_corpus(args.rows)
+    duplicates = len(corpus) - len({c for c, *_ in corpus})
+
+    fingerprints = set()
+
+    def exact(title, company, description):
+        fingerprint = make_fingerprint(title, company)
+        found = fingerprint in fingerprints
+        fingerprints.add(fingerprint)
+        return found
+
+    index = NearDupIndex(None)
+
+    def lsh(title, company, description):
+        key, sig = match_key(title, company), signature(shingles(title, company, description))
+        if index.find(sig, key):
+            return True
+        index.add(title, sig, key)
+        return False
+
+    by_key: dict[tuple[str, str], list] = {}
+
+    def same_company(title, company, description):
+        key, sig = match_key(title, company), signature(shingles(title, company, description))
+        if any((other == sig).mean() >= index.threshold for other in by_key.get(key, ())):
+            return True
+        by_key.setdefault(key, []).append(sig)
+        return False
+
+    exact_time, exact_stats = timed(dedup_decisions, corpus, exact, repeat=1)
+    lsh_time, lsh_stats = timed(dedup_decisions, corpus, lsh, repeat=1)
+    scan_time, scan_stats = timed(dedup_decisions, corpus, same_company, repeat=1)
+
+    # Signatures stored by one run are found by the next one's preloaded index
+    db = FakeSupabase()
+    first = NearDupIndex(db)
+    jobs = [{"id": f"job-{i}", "slug": f"slug-{i}"} for i in range(len(corpus))]
+    sigs = [signature(shingles(t, c, d)) for _, t, c, d in corpus]
+    for job, (_, title, company, _), sig in zip(jobs, corpus, sigs):
+        first.add(job["slug"], sig, match_key(title, company))
+    first.save(jobs)
+    with redirect_stdout(io.StringIO()):
+        second = NearDupIndex(db).load()
+    persisted = len(second) == len(corpus) and all(
+        second.find(sig, match_key(title, company)) for (_, title, company, _), sig in zip(corpus, sigs)
+    )
+
+    ok = lsh_stats["precision"] >= 0.98 and lsh_stats["recall"] >= 0.95 and persisted
+    print(f"neardup: {len(corpus)} postings, {duplicates} syndicated duplicates, persisted round trip ok={persisted}")
+    print(f"  {'detector':<22}{'precision':>10}{'recall':>8}{'false +':>9}{'postings/s':>12}")
+    for name, seconds, stats in (
+        ("exact fingerprint", exact_time, exact_stats),
+        ("minhash + lsh", lsh_time, lsh_stats),
+        ("minhash, same-key scan", scan_time, scan_stats),
+    ):
+        print(f"  {name:<22}{stats['precision']:>10.3f}{stats['recall']:>8.3f}{stats['false_positives']:>9}"
+              f"{len(corpus) / seconds:>12,.0f}")
+    print(f"  lsh candidates checked: {index.candidates / len(corpus):.2f} per posting")
+    return ok
+
+
+# SCRAPE_PARAMS["results_wanted"] in scrape.py, which needs JobSpy to import
+SCRAPE_RESULTS_WANTED = 80
+
+
+class SimulatedBoard:
+    """Postings for one (query, site) unit, as a job board's date-filtered search sees them.
+
+    Postings arrive at `rate` per hour. Most are searchable within a few hours
+    of their posted date, but some are indexed a day or two late, behind newer
+    ones. A search returns the newest `limit` postings searchable at `now` that
+    were posted within `hours_old`.
+    """
+
+    def __init__(self, rate: float, hours: float, rng: np.random.Generator):
+        self.posted = np.sort(rng.uniform(-watermarks.FULL_WINDOW_HOURS, hours, rng.poisson(rate * (hours + watermarks.FULL_WINDOW_HOURS))))
+        late = rng.random(len(self.posted)) < 0.1
+        self.indexed = self.posted + np.where(late, rng.uniform(6, 48, len(self.posted)), rng.uniform(0, 3, len(self.posted)))
+
+    def search(self, now: float, hours_old: int, limit: int) -> np.ndarray:
+        visible = np.flatnonzero((self.indexed <= now) & (self.posted >= now - hours_old))
+        return visible[np.argsort(-self.posted[visible], kind="stable")[:limit]]
+
+
+def simulate_windows(boards: dict, run_hours: list[float], mode: str) -> dict:
+    """Scrape every board at each run time; rows fetched and postings captured."""
+    from fakedb import FakeSupabase
+
+    db = FakeSupabase()
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    limit = SCRAPE_RESULTS_WANTED
+    captured = {unit: set() for unit in boards}
+    fetched = new = 0
+    for now in run_hours:
+        with redirect_stdout(io.StringIO()):
+            marks = watermarks.ScrapeWatermarks(db, started_at=start + timedelta(hours=now)).load()
+        for (query, site), board in boards.items():
+            hours_old = watermarks.FULL_WINDOW_HOURS if mode == "fixed" else marks.hours_old(query, [site])
+            rows = board.search(now, hours_old, limit)
+            fetched += len(rows)
+            new += len(set(rows.tolist()) - captured[(query, site)])
+            captured[(query, site)].update(rows.tolist())
+            marks.advance(query, [site])
+        marks.commit()
+    return {"fetched": fetched, "new": new, "captured": captured}
+
+
+def bench_windows(args) -> bool:
+    rng = np.random.default_rng(17)
+    hours = args.days * 24
+    # Mostly quiet queries, a few busy ones
+    boards = {(f"query {i}", site): SimulatedBoard(rng.choice([0.05, 0.1, 0.3, 1.0, 3.0]), hours, rng)
+              for i in range(args.units // len(SITES[:4])) for site in SITES[:4]}
+    # Every 6 hours, give or take cron jitter
+    run_hours = [run * 6 + rng.uniform(0, 0.5) for run in range(hours // 6)]
+
+    # Reachable: searchable at some run while still inside the full 14-day window
+    reachable = 0
+    for board in boards.values():
+        runs = np.array(run_hours)
+        ok = (board.indexed[:, None] <= runs) & (board.posted[:, None] >= runs - watermarks.FULL_WINDOW_HOURS)
+        reachable += int(ok.any(axis=1).sum())
+
+    results = {"fixed 14-day window": simulate_windows(boards, run_hours, "fixed")}
+    results["watermark + weekly sweep"] = simulate_windows(boards, run_hours, "watermark")
+    interval = watermarks.FULL_SWEEP_INTERVAL_HOURS
+    watermarks.FULL_SWEEP_INTERVAL_HOURS = 10 ** 6
+    try:
+        results["watermark, no sweeps"] = simulate_windows(boards, run_hours, "watermark")
+    finally:
+        watermarks.FULL_SWEEP_INTERVAL_HOURS = interval
+
+    baseline = results["fixed 14-day window"]
+
+    def captured(r):
+        return sum(len(c) for c in r["captured"].values())
+
+    print(f"windows: {len(boards)} (query, site) units, {len(run_hours)} runs over {args.days} days, "
+          f"{reachable} reachable postings, results_wanted={SCRAPE_RESULTS_WANTED}")
+    print(f"  {'mode':<28}{'rows fetched':>13}{'vs fixed':>10}{'new':>8}{'dupes':>8}{'captured':>10}")
+    for name, r in results.items():
+        print(f"  {name:<28}{r['fetched']:>13,}{r['fetched'] / baseline['fetched']:>9.0%}{r['new']:>8,}"
+              f"{1 - r['new'] / max(r['fetched'], 1):>8.0%}{captured(r) / reachable:>10.1%}")
+    # Late-indexed postings older than the margin are only caught by sweeps, so allow a small loss
+    watermark = results["watermark + weekly sweep"]
+    return watermark["fetched"] < 0.5 * baseline["fetched"] and captured(watermark) >= 0.98 * captured(baseline)
+
+
+class SimulatedQueries:
+    """Overlapping search queries over shared posting pools.
+
+    Each query searches one pool (queries like "remote developer" and "remote
+    software developer" share one) and each board lists a random share of a
+    pool's postings, so later queries on a pool mostly return cross-query
+    dupes. Fetch latency grows with the page size.
+    """
+
+    def __init__(self, queries: int, sites: list[str], rng: np.random.Generator):
+        pools = max(1, queries // 4)
+        self.pool_rate = rng.choice([1, 3, 10, 30, 60], size=pools)
+        self.pool_of = {f"query {i}": int(rng.integers(pools)) for i in range(queries)}
+        self.recall = {(q, s): rng.uniform(0.2, 0.9) for q in self.pool_of for s in sites}
+        self.sites = sites
+        self.rng = rng
+        self.next_id = 0
+        self.pools: list[list[int]] = [[] for _ in range(pools)]
+
+    def post(self):
+        """One cron interval of new postings, appended newest-last to each pool."""
+        for pool, rate in enumerate(self.pool_rate):
+            n = int(self.rng.poisson(rate))
+            self.pools[pool].extend(range(self.next_id, self.next_id + n))
+            self.next_id += n
+
+    def search(self, query: str, site: str, since: int, wanted: int) -> tuple[list[int], float]:
+        """Postings with id >= since visible to this (query, site), newest first, and the fetch latency."""
+        pool = self.pools[self.pool_of[query]]
+        # Deterministic per (posting, site): each board lists the same postings to every query
+        salt = self.sites.index(site) * 7919
+        fresh = [p for p in reversed(pool) if p >= since and (p * 2654435761 + salt) % 1000 < self.recall[(query, site)] * 1000]
+        rows = fresh[:wanted]
+        return rows, 2.0 + 0.05 * len(rows)
+
+
+def simulate_schedule(sim: SimulatedQueries, runs: int, budget: float, workers: int, scheduled: bool, seed: int) -> dict:
+    """Run `runs` budgeted scrapes; new jobs found and simulated scrape seconds.
+
+    Elapsed time is the pool's total latency over `workers`, or the slowest
+    site's rate-limited fetches, whichever is longer.
+    """
+    from fakedb import FakeSupabase
+
+    db = FakeSupabase()
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    units = [(q, s) for q in sim.pool_of for s in sim.sites]
+    seen: set[int] = set()
+    since = 0
+    new = fetched = 0
+    elapsed = 0.0
+    sim.rng = np.random.default_rng(seed)
+    sim.next_id, sim.pools = 0, [[] for _ in sim.pools]
+    for run in range(runs):
+        sim.post()
+        scheduler = QueryScheduler(db, now=start + timedelta(hours=6 * run))
+        with redirect_stdout(io.StringIO()):
+            scheduler.load()
+            order = scheduler.plan(units, budget, workers) if scheduled else units
+        latency = 0.0
+        by_site: dict[str, int] = {}
+        for query, site in order:
+            # The static list runs in order until the budget is spent (the CI timeout)
+            if not scheduled and max(latency / workers, (by_site.get(site, 0) + 1) / SITE_RATE_LIMITS[site]) > budget:
+                continue
+            wanted = scheduler.wanted(query, site) if scheduled else DEFAULT_RESULTS_WANTED
+            rows, seconds = sim.search(query, site, since, wanted)
+            latency += seconds
+            by_site[site] = by_site.get(site, 0) + 1
+            fresh = [r for r in rows if r not in seen]
+            seen.update(fresh)
+            fetched += len(rows)
+            new += len(fresh)
+            scheduler.record_fetch(query, site, seconds)
+            scheduler.record_load(query, site, {"found": len(rows), "queued": len(fresh), "cross_dupes": len(rows) - len(fresh)})
+        scheduler.commit()
+        elapsed += max([latency / workers] + [n / SITE_RATE_LIMITS[s] for s, n in by_site.items()])
+        since = sim.next_id
+    return {"new": new, "fetched": fetched, "seconds": elapsed, "posted": sim.next_id}
+
+
+def bench_schedule(args) -> bool:
+    sites = SITES[:4]
+    sim = SimulatedQueries(args.queries, sites, np.random.default_rng(23))
+    budget = args.budget_minutes * 60
+    results = {
+        "static list, 80 per page": simulate_schedule(sim, args.runs, budget, args.workers, scheduled=False, seed=5),
+        "yield scheduler": simulate_schedule(sim, args.runs, budget, args.workers, scheduled=True, seed=5),
+    }
+    print(f"schedule: {args.queries} queries x {len(sites)} sites over {len(sim.pools)} posting pools, {args.runs} runs, "
+          f"{args.budget_minutes:g}-minute budget on {args.workers} workers, {results['yield scheduler']['posted']} postings")
+    print(f"  {'mode':<26}{'new jobs':>10}{'fetched':>10}{'new share':>11}{'minutes':>9}{'new/min':>9}")
+    for name, r in results.items():
+        minutes = r["seconds"] / 60
+        print(f"  {name:<26}{r['new']:>10,}{r['fetched']:>10,}{r['new'] / max(r['fetched'], 1):>11.0%}"
+              f"{minutes:>9.1f}{r['new'] / minutes:>9.1f}")
+    static, scheduled = results.values()
+    return scheduled["new"] / scheduled["seconds"] > static["new"] / static["seconds"]
+
+
+def drain_queue(work: SqliteQueue, claims: list, slow_seconds: float, batch: int):
+    """Claim and complete units until none are pending, leased or expired. The first batch
+    is held for `slow_seconds`, longer than the lease, so only the heartbeat keeps it."""
+    slow = True
+    with work.heartbeating(interval=work.lease_seconds / 4):
+        while True:
+            units = work.claim(batch)
+            if not units:
+                status = work.status()
+                if not (status["pending"] or status["leased"] or status["expired"]):
+                    return
+                time.sleep(work.lease_seconds / 4)
+                continue
+            claims.extend(units)
+            if slow:
+                time.sleep(slow_seconds)
+                slow = False
+            for query, site in units:
+                work.complete(query, [site], {"found": 1, "queued": 1})
+            work.commit()
+
+
+def bench_queue(args) -> bool:
+    from fakedb import FakeSupabase
+
+    units = [(f"query-{i // 4}", SITES[i % 4]) for i in range(args.units)]
+    lease = args.lease_seconds
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "queue.db")
+        workers = [SqliteQueue(path, "bench", f"worker-{i}", lease_seconds=lease) for i in range(args.workers)]
+        # Every worker enqueues the whole run; only the first insert of each unit counts
+        for work in workers:
+            work.enqueue(units)
+        enqueued = workers[0].status()["pending"]
+
+        # A worker that finishes one unit of its batch, then dies holding the rest
+        dead = SqliteQueue(path, "bench", "dead-worker", lease_seconds=lease)
+        stranded = dead.claim(args.batch)
+        dead.complete(stranded[0][0], [stranded[0][1]], {"found": 1, "queued": 1})
+        dead.commit()
+
+        claims: list[tuple[str, str]] = []
+        threads = [
+            threading.Thread(target=drain_queue, args=(work, claims, lease * 1.5, args.batch)) for work in workers
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+        # The dead worker's late completion must not overwrite the live worker's
+        dead.complete(stranded[1][0], [stranded[1][1]], {"found": 100, "queued": 100})
+        dead.commit()
+        status = workers[0].status()
+        duplicates = {unit: n for unit, n in Counter(claims).items() if n > 1}
+        reclaimed = len(set(stranded[1:]) & set(claims))
+        drained = (
+            enqueued == len(units) and not duplicates and len(claims) == len(units) - 1
+            and reclaimed == len(stranded) - 1
+            and status["done"] == len(units) and status["totals"]["found"] == len(units)
+        )
+
+        # Units that keep failing or keep losing their lease are failed after max_attempts claims
+        work = SqliteQueue(path, "bench-failing", "worker", lease_seconds=lease / 4, max_attempts=2)
+        work.enqueue([("flaky", "indeed"), ("abandoned", "indeed")])
+        for _ in range(2):
+            for query, site in work.claim(2):
+                if query == "flaky":
+                    work.fail(query, site, RuntimeError("HTTP 429"))
+            # Forget the other lease, as a worker that crashed would
+            work.held.clear()
+            time.sleep(lease / 2)
+        leftover = work.claim(2)
+        failing = work.status()
+        failed = not leftover and failing["failed"] == 2
+
+    # SupabaseQueue.status pages past PostgREST's 1000-row responses
+    db = FakeSupabase()
+    db.seed("scrape_queue", [
+        {"run_id": "bench", "query": f"query-{i}", "site": "indeed", "status": "done", "attempts": 1,
+         "found": 1, "queued": 1, "skipped": 0, "cross_dupes": 0, "errors": 0}
+        for i in range(args.supabase_units)
+    ])
+    supabase_status = SupabaseQueue(db, "bench", "worker").status()
+    paged = supabase_status["done"] == args.supabase_units and supabase_status["totals"]["found"] == args.supabase_units
+
+    for unit, n in list(duplicates.items())[:10]:
+        print(f"  Claimed {n} times: {unit}")
+    print(f"queue: {len(units)} units on {args.workers} SQLite workers, {lease:g}s lease; "
+          f"{status['done']} done, {len(duplicates)} claimed twice, {reclaimed}/{len(stranded) - 1} stranded units reclaimed, "
+          f"found total {status['totals']['found']}, drained={drained}")
+    print(f"  {len(claims) / seconds:,.0f} units/s claimed and completed ({seconds:.2f}s incl. lease waits)")
+    print(f"  failing units: {failing['failed']} failed after 2 attempts, {failing['pending']} pending, ok={failed}")
+    print(f"  SupabaseQueue.status over {args.supabase_units} units: {supabase_status['done']} done, paged={paged}")
+    return drained and failed and paged
+
+
+# A `jobs` look-alike: same columns, defaults, generated search vector and conflict
+# key, minus the foreign keys and enum types of the real schema
+SINK_TABLE = """
+CREATE TABLE "{name}" (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  title TEXT NOT NULL,
+  slug TEXT NOT NULL UNIQUE,
+  company_id UUID NOT NULL,
+  description TEXT NOT NULL,
+  description_plain TEXT,
+  category_id UUID,
+  job_type TEXT NOT NULL DEFAULT 'full_time',
+  experience_level TEXT,
+  salary_min INTEGER,
+  salary_max INTEGER,
+  salary_currency TEXT DEFAULT 'USD',
+  is_async_friendly BOOLEAN DEFAULT FALSE,
+  visa_sponsorship BOOLEAN DEFAULT FALSE,
+  tech_stack TEXT[] DEFAULT '{{}}',
+  source TEXT NOT NULL DEFAULT 'manual',
+  source_url TEXT,
+  source_id TEXT,
+  apply_url TEXT,
+  is_active BOOLEAN DEFAULT TRUE,
+  date_posted TIMESTAMPTZ DEFAULT NOW(),
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  normalized_title TEXT,
+  fingerprint TEXT,
+  fts TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description_plain, '')), 'B')
+  ) STORED,
+  UNIQUE (source, source_id)
+)
+"""
+SINK_COLUMNS = [
+    "title", "slug", "description", "description_plain", "experience_level", "salary_min", "salary_max",
+    "is_async_friendly", "visa_sponsorship", "tech_stack", "source", "source_url", "source_id", "apply_url",
+    "date_posted", "normalized_title", "fingerprint",
+]
+
+
+def sink_rows(queries: int, rows: int) -> list[dict]:
+    """Job rows as JobWriter upserts them, from synthetic per-unit result sets."""
+    frames = synthetic_unit_frames([f"query {q}" for q in range(queries)], SITES, rows)
+    companies: dict[str, str] = {}
+    jobs = []
+    for df in frames.values():
+        for record in transform_frame(df).to_dict("records"):
+            job = {k: record[k] for k in SINK_COLUMNS}
+            job["slug"] = f"{record['slug']}-{record['source_id']}"
+            job["company_id"] = companies.setdefault(record["company"], str(uuid.uuid4()))
+            job["is_active"] = True
+            jobs.append(job)
+    return jobs
+
+
+def row_insert(conn, table: str, rows: list[dict]) -> list[dict]:
+    """One INSERT ... ON CONFLICT DO NOTHING per chunk, rows passed as a JSON parameter
+    and inserted rows returned as JSON."""
+    cols = ", ".join(f'"{c}"' for c in rows[0])
+    with conn.cursor() as cur:
+        cur.execute(
+            f'WITH inserted AS ('
+            f'INSERT INTO "{table}" ({cols}) SELECT {cols} FROM json_populate_recordset(NULL::"{table}", %s::json) '
+            f'ON CONFLICT (source, source_id) DO NOTHING RETURNING *) '
+            f'SELECT coalesce(json_agg(inserted), \'[]\')::text FROM inserted',
+            [json.dumps(rows)],
+        )
+        result = json.loads(cur.fetchone()[0])
+    conn.commit()
+    return result
+
+
+def bench_sinks(args) -> bool:
+    import psycopg
+
+    jobs = sink_rows(args.queries, args.rows)
+    tables = {"insert": "bench_sink_insert", "copy": "bench_sink_copy"}
+    conn = psycopg.connect(args.dsn)
+    sink = PostgresSink(args.dsn)
+    try:
+        with conn.cursor() as cur:
+            for name in tables.values():
+                cur.execute(f'DROP TABLE IF EXISTS "{name}"')
+                cur.execute(SINK_TABLE.format(name=name))
+        conn.commit()
+
+        def load(write):
+            return sum(len(write(chunk)) for chunk in chunked(jobs, args.chunk_size))
+
+        results = {}
+        for label, run in (("row INSERT", "insert"), ("COPY + merge", "copy")):
+            if run == "insert":
+                def write(chunk):
+                    return row_insert(conn, tables["insert"], chunk)
+            else:
+                def write(chunk):
+                    return sink.upsert(tables["copy"], chunk, on_conflict="source,source_id", ignore_duplicates=True)
+            results[label] = {}
+            for phase in ("insert", "rerun"):
+                start = time.perf_counter()
+                inserted = load(write)
+                results[label][phase] = (time.perf_counter() - start, inserted)
+
+        # Both paths must leave the same rows behind
+        compared = ", ".join(c for c in SINK_COLUMNS + ["company_id", "is_active"])
+        contents = []
+        with conn.cursor() as cur:
+            for name in tables.values():
+                cur.execute(f'SELECT {compared}, fts::text FROM "{name}" ORDER BY source, source_id')
+                contents.append(cur.fetchall())
+            for name in tables.values():
+                cur.execute(f'DROP TABLE "{name}"')
+        conn.commit()
+    finally:
+        sink.close()
+        conn.close()
+
+    counts = {(r["insert"][1], r["rerun"][1]) for r in results.values()}
+    ok = contents[0] == contents[1] and len(counts) == 1 and len(contents[0]) > 0
+    print(f"sinks: {len(jobs)} job rows in chunks of {args.chunk_size}, {len(contents[0])} stored, "
+          f"inserted/rerun {sorted(counts)}, identical tables={contents[0] == contents[1]}, ok={ok}")
+    print(f"  {'path':<22}{'insert s':>10}{'rows/s':>10}{'rerun s':>10}{'rows/s':>10}")
+    for label, r in results.items():
+        (insert_s, _), (rerun_s, _) = r["insert"], r["rerun"]
+        print(f"  {label:<22}{insert_s:>10.2f}{len(jobs) / insert_s:>10,.0f}{rerun_s:>10.2f}{len(jobs) / rerun_s:>10,.0f}")
+    print("  (same database and chunking for both; neither goes through PostgREST)")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("transform", help="Per-row vs column-wise JobSpy transform")
+    p.add_argument("--rows", type=int, default=10000)
+    p.set_defaults(run=bench_transform)
+
+    p = sub.add_parser("keywords", help="Substring scans vs compiled keyword matcher")
+    p.add_argument("--rows", type=int, default=10000)
+    p.set_defaults(run=bench_keywords)
+
+    p = sub.add_parser("titles", help="Per-pattern re.search vs compiled, cached title normalizer")
+    p.add_argument("--rows", type=int, default=100000)
+    p.set_defaults(run=bench_titles)
+
+    p = sub.add_parser("pipeline", help="scrape_and_load and aggregation end to end against the in-memory fake Supabase")
+    p.add_argument("--queries", type=int, default=20, help="Search queries to synthesize results for")
+    p.add_argument("--rows", type=int, default=100, help="Distinct postings per query")
+    p.add_argument("--db-jobs", type=int, default=50000, help="Extra active jobs seeded before aggregation")
+    p.add_argument("--alerts", type=int, default=500, help="Active job alerts to match new jobs against")
+    p.set_defaults(run=bench_pipeline)
+
+    p = sub.add_parser("incremental", help="Incremental salary benchmarks vs a full rebuild after mutating jobs in the fake Supabase")
+    p.add_argument("--rows", type=int, default=20000, help="Jobs to seed")
+    p.add_argument("--changes", type=int, default=200, help="Jobs per kind of change (salary, title, level, deactivated, deleted, posted)")
+    p.set_defaults(run=bench_incremental)
+
+    p = sub.add_parser("alerts", help="Per-alert scan vs inverted-index job-alert matching")
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--alerts", type=int, default=5000)
+    p.set_defaults(run=bench_alerts)
+
+    p = sub.add_parser("neardup", help="Exact fingerprints vs MinHash/LSH near-duplicate detection on a labeled corpus")
+    p.add_argument("--rows", type=int, default=10000, help="Twice the number of distinct postings to synthesize")
+    p.set_defaults(run=bench_neardup)
+
+    p = sub.add_parser("windows", help="Fixed 14-day search window vs per-unit watermarks on a simulated job board")
+    p.add_argument("--units", type=int, default=200, help="(query, site) units to simulate")
+    p.add_argument("--days", type=int, default=28)
+    p.set_defaults(run=bench_windows)
+
+    p = sub.add_parser("schedule", help="Static query list vs yield-aware scheduler under a time budget")
+    p.add_argument("--queries", type=int, default=120)
+    p.add_argument("--runs", type=int, default=40)
+    p.add_argument("--budget-minutes", type=float, default=10)
+    p.add_argument("--workers", type=int, default=4)
+    p.set_defaults(run=bench_schedule)
+
+    p = sub.add_parser("queue", help="Lease, expiry and completion through SqliteQueue workers; SupabaseQueue status paging")
+    p.add_argument("--units", type=int, default=400, help="(query, site) units to enqueue")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--batch", type=int, default=5, help="Units claimed per call")
+    p.add_argument("--lease-seconds", type=float, default=1.0)
+    p.add_argument("--supabase-units", type=int, default=2500, help="Done units seeded for SupabaseQueue.status")
+    p.set_defaults(run=bench_queue)
+
+    p = sub.add_parser("sinks", help="Row INSERT ... ON CONFLICT vs COPY + merge into a scratch Postgres")
+    p.add_argument("--dsn", required=True, help="Scratch database to write to; it creates and drops bench_sink_* tables")
+    p.add_argument("--queries", type=int, default=40, help="Search queries to synthesize results for")
+    p.add_argument("--rows", type=int, default=100, help="Distinct postings per query")
+    p.add_argument("--chunk-size", type=int, default=500, help="Rows per upsert, as JobWriter's --chunk-size")
+    p.set_defaults(run=bench_sinks)
+
+    args = parser.parse_args()
+    sys.exit(0 if args.run(args) else 1)
@@ -0,0 +1,110 @@
+"""
+On-disk cache of JobSpy result sets.
+Each (query, sites, effective search params) fetch is stored as one Parquet file, so an
+aborted run can be rerun without re-scraping and `--replay` can drive the
+whole transform/load pipeline from cached frames with no network access.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobspy")
+# Shorter than the 6-hour cron interval, so scheduled runs always scrape fresh results
+DEFAULT_TTL_HOURS = 4
+
+
+class ScrapeCache:
+    """Parquet-backed cache keyed on (query, sites, params), with a TTL on file age.
+
+    `params` are the search params shared by every fetch; each call can pass
+    the unit's own overrides (its watermark window and page size), so a
+    narrow incremental fetch is never replayed for a wider one. In replay mode
+    entries never expire and misses are never fetched.
+    """
+
+    def __init__(self, params: dict, directory: str = DEFAULT_CACHE_DIR, ttl_hours: float = DEFAULT_TTL_HOURS, replay: bool = False):
+        self.params = params
+        self.directory = directory
+        self.ttl_seconds = ttl_hours * 3600
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, query: str, sites: list[str], params: dict | None = None) -> str:
+        key = json.dumps({"query": query, "sites": sorted(sites), **self.params, **(params or {})}, sort_keys=True, default=str)
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".parquet")
+
+    def has(self, query: str, sites: list[str], params: dict | None = None) -> bool:
+        """Whether a usable entry exists (any age in replay mode, within the TTL otherwise)."""
+        try:
+            age = time.time() - os.path.getmtime(self.path(query, sites, params))
+        except OSError:
+            return False
+        return self.replay or age <= self.ttl_seconds
+
+    def fetched_at(self, query: str, sites: list[str], params: dict | None = None) -> datetime | None:
+        """When the entry's results were fetched (its file time), or None if there is none."""
+        try:
+            return datetime.fromtimestamp(os.path.getmtime(self.path(query, sites, params)), timezone.utc)
+        except OSError:
+            return None
+
+    def get(self, query: str, sites: list[str], params: dict | None = None) -> pd.DataFrame | None:
+        if not self.has(query, sites, params):
+            self.misses += 1
+            return None
+        try:
+            jobs_df = pd.read_parquet(self.path(query, sites, params))
+        except Exception as e:
+            print(f"  Ignoring unreadable cache entry for '{query}': {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return jobs_df
+
+    def put(self, query: str, sites: list[str], jobs_df: pd.DataFrame | None, params: dict | None = None):
+        """Store a result set; empty results are cached too so reruns skip them."""
+        jobs_df = jobs_df if jobs_df is not None else pd.DataFrame()
+        path = self.path(query, sites, params)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            to_parquet_frame(jobs_df).to_parquet(tmp, index=False)
+            # Atomic rename: concurrent workers and aborted runs never leave a torn file
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"  Could not cache results for '{query}': {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def fetch(self, fetch_jobs, query: str, sites: list[str], params: dict | None = None) -> pd.DataFrame | None:
+        """Cached `fetch_jobs(query, sites)`, which must search with `params`; in replay mode a miss returns None without fetching."""
+        jobs_df = self.get(query, sites, params)
+        if jobs_df is not None or self.replay:
+            return jobs_df
+        jobs_df = fetch_jobs(query, sites)
+        self.put(query, sites, jobs_df, params)
+        return jobs_df
+
+
+def to_parquet_frame(jobs_df: pd.DataFrame) -> pd.DataFrame:
+    """Make JobSpy's loosely typed object columns storable as Parquet.
+
+    Columns that mix value types (e.g. ids that are sometimes NaN, dates next to
+    strings) are stored as strings with nulls preserved; `transform_frame` reads
+    them through `safe_str_series`, so the loaded records are unchanged.
+    """
+    out = jobs_df.copy()
+    for column in out.columns:
+        col = out[column]
+        if col.dtype != object:
+            continue
+        types = {type(v) for v in col if v is not None and not (isinstance(v, float) and pd.isna(v))}
+        if len(types) > 1:
+            out[column] = col.map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v)) else str(v))
+    return out
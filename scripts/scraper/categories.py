@@ -0,0 +1,33 @@
+"""
+Category registry shared by the scraper and aggregation scripts.
+Loads `categories` once and serves slug <-> id lookups from memory.
+"""
+
+
+class CategoryRegistry:
+    """In-memory slug -> id map for `categories`, refreshed only on unknown slugs."""
+
+    def __init__(self, client):
+        self.client = client
+        self.ids: dict[str, str] = {}
+        # Slugs that were still unknown after a refresh, so we don't refetch for them
+        self._missing: set[str] = set()
+
+    def load(self) -> "CategoryRegistry":
+        result = self.client.table("categories").select("id, slug").execute()
+        self.ids = {c["slug"]: c["id"] for c in result.data or []}
+        return self
+
+    def id_for(self, slug: str) -> str | None:
+        if slug not in self.ids and slug not in self._missing:
+            self.load()
+            if slug not in self.ids:
+                self._missing.add(slug)
+        return self.ids.get(slug)
+
+    def slugs(self) -> list[str]:
+        return list(self.ids)
+
+    def items(self) -> list[tuple[str, str]]:
+        """(slug, id) pairs in load order."""
+        return list(self.ids.items())
@@ -0,0 +1,68 @@
+"""
+Run checkpoints for the scraper.
+Completed (query, site) units and their counters are recorded in
+`scrape_checkpoints`, so a retried batch can `--resume` and skip finished work.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+# Checkpoints older than this are pruned when a run starts
+RETENTION_DAYS = 7
+
+
+def default_run_id(batch: int | None = None) -> str:
+    """Stable across re-runs of the same GitHub Actions run; one per day when run by hand.
+
+    Without a batch the id is shared by every batch of the run (queue mode).
+    """
+    run = os.environ.get("GITHUB_RUN_ID")
+    prefix = f"gh-{run}" if run else date.today().isoformat()
+    return f"{prefix}-batch{batch}" if batch is not None else prefix
+
+
+def unit_site(sites: list[str]) -> str:
+    """Checkpoint `site` value for a fetch that covered these sites together."""
+    return ",".join(sorted(sites))
+
+
+class Checkpoint:
+    """Completed units for one run id.
+
+    Units are marked complete once loaded, but only persisted after the writer
+    has flushed their jobs, so a killed run never records work it didn't save.
+    """
+
+    def __init__(self, client, run_id: str):
+        self.client = client
+        self.run_id = run_id
+        self.done: set[tuple[str, str]] = set()
+        self.pending: list[dict] = []
+
+    def load(self) -> "Checkpoint":
+        cutoff = (datetime.now() - timedelta(days=RETENTION_DAYS)).isoformat()
+        self.client.table("scrape_checkpoints").delete().lt("completed_at", cutoff).execute()
+        result = self.client.table("scrape_checkpoints").select("query, site").eq("run_id", self.run_id).execute()
+        self.done = {(row["query"], row["site"]) for row in result.data or []}
+        return self
+
+    def is_done(self, query: str, sites: list[str]) -> bool:
+        if (query, unit_site(sites)) in self.done:
+            return True
+        return all((query, site) in self.done for site in sites)
+
+    def complete(self, query: str, sites: list[str], counts: dict):
+        self.pending.append({"run_id": self.run_id, "query": query, "site": unit_site(sites), **counts})
+
+    def commit(self):
+        """Persist units marked complete so far; call after their jobs are written."""
+        if not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        try:
+            self.client.table("scrape_checkpoints").upsert(rows, on_conflict="run_id,query,site").execute()
+        except Exception as e:
+            # Best effort: a lost checkpoint only means the unit is redone on resume
+            print(f"  Could not save {len(rows)} checkpoints: {e}")
+            return
+        self.done.update((row["query"], row["site"]) for row in rows)
@@ -0,0 +1,170 @@
+"""
+Company resolution for the scraper.
+Keeps a per-run slug -> id cache warmed from `companies`, buffers new companies
+for bulk creation and coalesces profile updates so each company is written once.
+"""
+
+import re
+
+from db import chunked, iter_rows, write_bisect
+from sinks import PostgrestSink
+
+COMPANY_CHUNK_SIZE = 500
+
+# Keep in_() filters well under URL length limits
+LOOKUP_CHUNK_SIZE = 100
+
+JOB_BOARD_DOMAINS = {"indeed.com", "linkedin.com", "glassdoor.com", "ziprecruiter.com", "google.com"}
+
+
+def is_job_board_domain(domain: str) -> bool:
+    """Check if a domain belongs to a job board rather than a company."""
+    if domain in JOB_BOARD_DOMAINS:
+        return True
+    for jb in JOB_BOARD_DOMAINS:
+        if domain.endswith(f".{jb}"):
+            return True
+    return False
+
+
+def derive_logo_url(website: str, name: str) -> str | None:
+    """Derive a company logo URL from website domain using Clearbit Logo CDN."""
+    domain = ""
+    if website:
+        domain = re.sub(r"^https?://", "", website).split("/")[0].strip().lower()
+        domain = re.sub(r"^www\.", "", domain)
+
+    # Skip job board domains
+    if domain and not is_job_board_domain(domain):
+        return f"https://logo.clearbit.com/{domain}"
+
+    # Guess from company name (only for short clean names)
+    clean_name = re.sub(r"[^\w]", "", name.lower())
+    if clean_name and 3 <= len(clean_name) <= 20 and " " not in name.strip():
+        return f"https://logo.clearbit.com/{clean_name}.com"
+
+    return None
+
+
+class CompanyResolver:
+    """Resolve company slugs to ids with bulk creates and deferred updates."""
+
+    def __init__(self, client, chunk_size: int = COMPANY_CHUNK_SIZE, sink=None):
+        self.client = client
+        self.sink = sink or PostgrestSink(client)
+        self.chunk_size = chunk_size
+        self.ids: dict[str, str] = {}
+        # Existing rows we may need to preserve on update
+        self.known: dict[str, dict] = {}
+        # slug -> row awaiting creation
+        self.pending_new: dict[str, dict] = {}
+        # slug -> merged column updates for existing companies
+        self.pending_updates: dict[str, dict] = {}
+        self.created = 0
+        self.updated = 0
+        self.errors = 0
+
+    def load(self) -> "CompanyResolver":
+        """Warm the slug -> id cache from `companies` in paged reads."""
+        for row in iter_rows(self.client, "companies", "id, name, slug, logo_url"):
+            self.ids[row["slug"]] = row["id"]
+            self.known[row["slug"]] = row
+        print(f"Company cache loaded: {len(self.ids)} companies")
+        return self
+
+    def resolve(self, slug: str, name: str, logo_url: str = "", website: str = "", description: str = "", size: str = "") -> str:
+        """Register a company sighting and return its slug.
+
+        Ids of new companies only exist after `flush_new()`; use `id_for()` then.
+        """
+        # Auto-derive logo if not provided
+        if not logo_url:
+            logo_url = derive_logo_url(website, name) or ""
+        description = description[:1000] if description else ""
+
+        if slug in self.known:
+            updates = self.pending_updates.setdefault(slug, {})
+            if logo_url and not self.known[slug].get("logo_url") and "logo_url" not in updates:
+                updates["logo_url"] = logo_url
+            if website:
+                updates["website"] = website
+            if description:
+                updates["description"] = description
+            if size:
+                updates["size"] = size
+            return slug
+
+        pending = self.pending_new.get(slug)
+        if pending is None:
+            self.pending_new[slug] = {
+                "name": name,
+                "slug": slug,
+                "logo_url": logo_url or None,
+                "website": website or None,
+                "description": description or None,
+                "size": size or None,
+                "remote_policy": "Remote",
+            }
+        else:
+            # Later sightings fill in fields the first one lacked
+            for key, value in (("logo_url", logo_url), ("website", website), ("description", description), ("size", size)):
+                if value and not pending.get(key):
+                    pending[key] = value
+        return slug
+
+    def id_for(self, slug: str) -> str | None:
+        return self.ids.get(slug)
+
+    def flush_new(self):
+        """Create buffered companies in bulk upserts keyed on slug."""
+        if not self.pending_new:
+            return
+        rows = list(self.pending_new.values())
+        self.pending_new = {}
+        for chunk in chunked(rows, self.chunk_size):
+            write_bisect(self._insert, chunk, self._on_error)
+
+        # Slugs created concurrently by another batch come back empty from
+        # ON CONFLICT DO NOTHING, so look their ids up directly
+        missing = [r["slug"] for r in rows if r["slug"] not in self.ids]
+        for chunk in chunked(missing, LOOKUP_CHUNK_SIZE):
+            result = self.client.table("companies").select("id, name, slug, logo_url").in_("slug", chunk).execute()
+            for row in result.data or []:
+                self._remember(row)
+
+    def flush_updates(self):
+        """Write each changed company once, grouped into bulk upserts by column set."""
+        groups: dict[tuple[str, ...], list[dict]] = {}
+        for slug, updates in self.pending_updates.items():
+            if not updates:
+                continue
+            # Bulk upserts need identical keys in every row
+            columns = tuple(sorted(updates))
+            groups.setdefault(columns, []).append({"name": self.known[slug]["name"], "slug": slug, **updates})
+        self.pending_updates = {}
+
+        for rows in groups.values():
+            for chunk in chunked(rows, self.chunk_size):
+                write_bisect(self._update, chunk, self._on_error)
+
+    def flush(self):
+        self.flush_new()
+        self.flush_updates()
+
+    def _insert(self, rows: list[dict]):
+        for row in self.sink.upsert("companies", rows, on_conflict="slug", ignore_duplicates=True):
+            self._remember(row)
+            self.created += 1
+
+    def _update(self, rows: list[dict]):
+        self.sink.upsert("companies", rows, on_conflict="slug", returning=False)
+        self.updated += len(rows)
+
+    def _remember(self, row: dict):
+        self.ids[row["slug"]] = row["id"]
+        self.known[row["slug"]] = {"id": row["id"], "name": row["name"], "slug": row["slug"], "logo_url": row.get("logo_url")}
+
+    def _on_error(self, row: dict, e: Exception):
+        self.errors += 1
+        if self.errors <= 10:
+            print(f"  Error writing company '{row.get('slug')}': {e}")
@@ -0,0 +1,54 @@
+"""
+Shared Supabase helpers for the scraper and aggregation scripts.
+"""
+
+from typing import Callable, Iterator
+
+# PostgREST caps responses at 1000 rows by default, so never ask for more per page
+PAGE_SIZE = 1000
+
+
+def iter_rows(
+    client,
+    table: str,
+    columns: str,
+    apply_filters: Callable | None = None,
+    page_size: int = PAGE_SIZE,
+) -> Iterator[dict]:
+    """Stream rows from a table using keyset pagination on id.
+
+    `columns` must include `id`. `apply_filters` receives the select builder and
+    returns it with any `.eq()`/`.gte()`/... filters applied.
+    """
+    last_id = None
+    while True:
+        query = client.table(table).select(columns)
+        if apply_filters:
+            query = apply_filters(query)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        result = query.order("id").limit(page_size).execute()
+        rows = result.data or []
+        yield from rows
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1]["id"]
+
+
+def chunked(items: list, size: int) -> Iterator[list]:
+    """Yield successive slices of at most `size` items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def write_bisect(write: Callable[[list[dict]], None], rows: list[dict], on_error: Callable[[dict, Exception], None]):
+    """Call `write` on rows, splitting the batch in half on failure until the bad rows are isolated."""
+    try:
+        write(rows)
+    except Exception as e:
+        if len(rows) == 1:
+            on_error(rows[0], e)
+            return
+        mid = len(rows) // 2
+        write_bisect(write, rows[:mid], on_error)
+        write_bisect(write, rows[mid:], on_error)
@@ -0,0 +1,88 @@
+"""
+Job deduplication index.
+Loads existing (source, source_id) pairs and slugs in bulk so the scraper can
+check membership in memory instead of issuing two SELECTs per scraped row.
+"""
+
+from datetime import datetime, timedelta
+
+from db import chunked, iter_rows
+
+# Jobs created within this window are preloaded; older ones are resolved lazily
+DEDUP_WINDOW_DAYS = 30
+
+# Keep in_() filters well under URL length limits
+LOOKUP_CHUNK_SIZE = 100
+
+
+class DedupIndex:
+    """In-memory view of existing jobs keyed by (source, source_id) and slug."""
+
+    def __init__(self, client, window_days: int = DEDUP_WINDOW_DAYS):
+        self.client = client
+        self.window_days = window_days
+        self.source_ids: set[tuple[str, str]] = set()
+        self.slugs: set[str] = set()
+
+    def load(self) -> "DedupIndex":
+        """Preload identities of recently created jobs in paged reads."""
+        cutoff = (datetime.now() - timedelta(days=self.window_days)).isoformat()
+        for row in iter_rows(
+            self.client,
+            "jobs",
+            "id, source, source_id, slug",
+            lambda q: q.gte("created_at", cutoff),
+        ):
+            self._remember(row)
+        print(f"Dedup index loaded: {len(self.source_ids)} source ids, {len(self.slugs)} slugs")
+        return self
+
+    def prefetch(self, candidates: list[tuple[str, str, str]]):
+        """Resolve (source, source_id, slug) candidates missing from the index.
+
+        Jobs older than the preload window are looked up with one batched in_()
+        query per source and per slug chunk, so a whole result set costs a
+        handful of round trips instead of two per row.
+        """
+        by_source: dict[str, set[str]] = {}
+        slugs: set[str] = set()
+        for source, source_id, slug in candidates:
+            if (source, source_id) not in self.source_ids:
+                by_source.setdefault(source, set()).add(source_id)
+            if slug not in self.slugs:
+                slugs.add(slug)
+
+        for source, source_ids in by_source.items():
+            for chunk in chunked(sorted(source_ids), LOOKUP_CHUNK_SIZE):
+                result = (
+                    self.client.table("jobs")
+                    .select("source, source_id, slug")
+                    .eq("source", source)
+                    .in_("source_id", chunk)
+                    .execute()
+                )
+                for row in result.data or []:
+                    self._remember(row)
+
+        missing_slugs = sorted(s for s in slugs if s not in self.slugs)
+        for chunk in chunked(missing_slugs, LOOKUP_CHUNK_SIZE):
+            result = self.client.table("jobs").select("slug").in_("slug", chunk).execute()
+            for row in result.data or []:
+                self.slugs.add(row["slug"])
+
+    def has_source_id(self, source: str, source_id: str) -> bool:
+        return (source, source_id) in self.source_ids
+
+    def has_slug(self, slug: str) -> bool:
+        return slug in self.slugs
+
+    def add(self, source: str, source_id: str, slug: str):
+        """Record a job inserted during this run."""
+        self.source_ids.add((source, source_id))
+        self.slugs.add(slug)
+
+    def _remember(self, row: dict):
+        if row.get("source_id"):
+            self.source_ids.add((row["source"], row["source_id"]))
+        if row.get("slug"):
+            self.slugs.add(row["slug"])
@@ -0,0 +1,106 @@
+"""
+Concurrent scraping engine.
+Dispatches (query, site) units to a bounded thread pool, throttles each job
+board with its own token bucket and hands results to a single consumer so
+network fetches overlap with transform/load work.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+# Sustained requests per second allowed against each job board
+SITE_RATE_LIMITS = {
+    "indeed": 0.2,
+    "linkedin": 0.1,
+    "glassdoor": 0.2,
+    "google": 0.2,
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def site_limiters(rates: dict[str, float] = SITE_RATE_LIMITS) -> dict[str, TokenBucket]:
+    return {site: TokenBucket(rate) for site, rate in rates.items()}
+
+
+def run_units(
+    units: list[tuple[str, str]],
+    fetch: Callable[[str, str], object],
+    workers: int,
+    limiters: dict[str, TokenBucket] | None = None,
+) -> Iterator[tuple[tuple[str, str], object, Exception | None]]:
+    """Fetch (query, site) units concurrently, yielding (unit, result, error) as they finish.
+
+    Results pass through a bounded queue, so workers stall instead of piling up
+    DataFrames when the consumer falls behind. A worker that dies without queuing
+    its result (say, in a rate limiter) is yielded as an error rather than waited on.
+    """
+    limiters = limiters if limiters is not None else site_limiters()
+    results: queue.Queue = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+
+    def work(unit: tuple[str, str]) -> bool:
+        if stop.is_set():
+            return False
+        query, site = unit
+        limiter = limiters.get(site)
+        if limiter:
+            limiter.acquire()
+        try:
+            item = (unit, fetch(query, site), None)
+        except Exception as e:
+            item = (unit, None, e)
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape")
+    try:
+        futures = {pool.submit(work, unit): unit for unit in units}
+        pending = len(units)
+        while pending:
+            try:
+                item = results.get(timeout=1)
+            except queue.Empty:
+                for future in [f for f in futures if f.done()]:
+                    unit = futures.pop(future)
+                    error = future.exception()
+                    if error is not None or not future.result():
+                        pending -= 1
+                        yield unit, None, error or RuntimeError(f"worker for {unit} exited without a result")
+                continue
+            pending -= 1
+            yield item
+    finally:
+        # Unblock and cancel remaining workers if the consumer bails out early
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,403 @@
+"""
+In-memory stand-in for the slice of the Supabase/PostgREST API the scripts use.
+Tables are lists of dicts with the schema's unique constraints and defaults;
+queries support the builder methods the scraper and aggregation call
+(select/insert/upsert/update/delete, eq/gt/gte/lt/lte/in_/is_/not_, order,
+limit) and cap reads at PostgREST's 1000-row page, so paging behaves like
+production. `rpc()` runs Python versions of the SQL functions, and updating or
+deleting jobs logs salary_benchmark_departures like migration 010's triggers.
+`bench.py pipeline` and `bench.py incremental` run the scraper and aggregation
+against it offline; `bench.py queue` pages SupabaseQueue status through it.
+"""
+
+import bisect
+import heapq
+import uuid
+from datetime import datetime, timezone
+
+from postgrest.exceptions import APIError
+
+# Supabase's default max-rows per response
+MAX_ROWS = 1000
+
+UNIQUE = {
+    "jobs": [("slug",), ("source", "source_id")],
+    "companies": [("slug",)],
+    "categories": [("slug",)],
+    "salary_benchmarks": [("normalized_title", "experience_level")],
+    "aggregation_watermarks": [("name",)],
+    "scrape_checkpoints": [("run_id", "query", "site")],
+    "scrape_queue": [("run_id", "query", "site")],
+    "job_alert_matches": [("alert_id", "job_id")],
+    "job_signatures": [("job_id",)],
+    "scrape_watermarks": [("query", "site")],
+    "scrape_query_stats": [("query", "site")],
+}
+
+# bigserial ids; every other table gets uuid ids
+SERIAL_TABLES = {
+    "salary_benchmark_departures", "scrape_checkpoints", "scrape_queue", "job_alert_matches", "job_signatures",
+    "scrape_watermarks", "scrape_query_stats",
+}
+
+TIMESTAMP_DEFAULTS = {
+    "jobs": ("created_at", "updated_at"),
+    "companies": ("created_at",),
+    "scrape_checkpoints": ("completed_at",),
+    "scrape_queue": ("created_at",),
+    "job_alert_matches": ("matched_at",),
+    "job_signatures": ("created_at",),
+    "market_snapshots": ("created_at",),
+}
+
+# Columns whose change on a job fires migration 010's departure trigger
+DEPARTURE_COLUMNS = ("title", "normalized_title", "experience_level")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Result:
+    def __init__(self, data: list[dict], count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+class Query:
+    """One PostgREST request being built; `execute()` runs it against the fake tables."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.verb = None
+        self.payload = None
+        self.columns = "*"
+        self.count = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters = []
+        # (op, column, value) of plain eq/in/gt/gte filters, for index lookups
+        self.keys = []
+        self.negate = False
+        self.ordering = None
+        self.row_limit = None
+
+    # Statements
+    def select(self, columns: str = "*", count: str | None = None) -> "Query":
+        self.verb, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, rows) -> "Query":
+        self.verb, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", ignore_duplicates: bool = False) -> "Query":
+        self.verb, self.payload = "upsert", rows if isinstance(rows, list) else [rows]
+        self.on_conflict = tuple(c.strip() for c in on_conflict.split(",")) if on_conflict else None
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: dict) -> "Query":
+        self.verb, self.payload = "update", values
+        return self
+
+    def delete(self) -> "Query":
+        self.verb = "delete"
+        return self
+
+    # Filters
+    @property
+    def not_(self) -> "Query":
+        self.negate = True
+        return self
+
+    def _filter(self, test, key: tuple | None = None) -> "Query":
+        negate, self.negate = self.negate, False
+        self.filters.append((lambda row: not test(row)) if negate else test)
+        if key and not negate:
+            self.keys.append(key)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value, ("in", column, {value}))
+
+    def neq(self, column, value):
+        return self._filter(lambda row: row.get(column) != value)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] > value, ("gt", column, value))
+
+    def gte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] >= value, ("gte", column, value))
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._filter(lambda row: row.get(column) in values, ("in", column, values))
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        return self._filter(lambda row: row.get(column) is expected)
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False) -> "Query":
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, n: int) -> "Query":
+        self.row_limit = n
+        return self
+
+    def execute(self) -> Result:
+        self.db.requests += 1
+        return getattr(self.db, f"_{self.verb}")(self)
+
+    def matches(self, row: dict) -> bool:
+        return all(test(row) for test in self.filters)
+
+
+class RpcCall:
+    def __init__(self, db: "FakeSupabase", name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self) -> Result:
+        self.db.requests += 1
+        fn = self.db.functions.get(self.name)
+        if fn is None:
+            raise APIError({"code": "PGRST202", "message": f"Could not find the function public.{self.name}"})
+        return Result(fn(self.db, **self.params))
+
+
+def run_job_maintenance(db: "FakeSupabase", stale_before: str) -> list[dict]:
+    deactivated = 0
+    for job in db.tables["jobs"]:
+        if job.get("is_active") and (job.get("date_posted") or "") < stale_before:
+            job["is_active"] = False
+            deactivated += 1
+    counts: dict[str, int] = {}
+    for job in db.tables["jobs"]:
+        if job.get("is_active") and job.get("category_id"):
+            counts[job["category_id"]] = counts.get(job["category_id"], 0) + 1
+    updated = 0
+    for category in db.tables["categories"]:
+        count = counts.get(category["id"], 0)
+        if category.get("job_count") != count:
+            category["job_count"] = count
+            updated += 1
+    return [{"deactivated": deactivated, "categories_updated": updated}]
+
+
+def write_salary_benchmarks(db: "FakeSupabase", p_rows: list[dict], p_stale: list[dict]) -> list[dict]:
+    upserted = db._upsert(Query(db, "salary_benchmarks").upsert(p_rows, on_conflict="normalized_title,experience_level"))
+    stale = {(key["normalized_title"], key["experience_level"]) for key in p_stale}
+    removed = db._delete(Query(db, "salary_benchmarks").delete()._filter(
+        lambda row: (row.get("normalized_title"), row.get("experience_level")) in stale
+    ))
+    return [{"upserted": len(upserted.data), "removed": len(removed.data)}]
+
+
+class FakeSupabase:
+    """Drop-in for the supabase-py client's `table()`/`rpc()` surface; `requests` counts round trips."""
+
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {}
+        self.functions = {
+            "run_job_maintenance": run_job_maintenance,
+            "write_salary_benchmarks": write_salary_benchmarks,
+        }
+        self.requests = 0
+        self.serial = 0
+        # (table, unique columns) -> {key: row}; dropped on update/delete and rebuilt on demand
+        self.indexes: dict[tuple[str, tuple], dict] = {}
+        # table -> (sorted ids, rows in id order), for keyset paging on id
+        self.by_id: dict[str, tuple[list, list[dict]]] = {}
+
+    def table(self, name: str) -> Query:
+        self.tables.setdefault(name, [])
+        return Query(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: dict | None = None) -> RpcCall:
+        return RpcCall(self, name, params or {})
+
+    def seed(self, table: str, rows: list[dict]):
+        """Insert rows directly, applying defaults but no round trip."""
+        self.tables.setdefault(table, [])
+        self._store(table, [self._with_defaults(table, row) for row in rows])
+
+    def _with_defaults(self, table: str, row: dict) -> dict:
+        row = dict(row)
+        if "id" not in row:
+            self.serial += 1
+            row["id"] = self.serial if table in SERIAL_TABLES else str(uuid.uuid4())
+        for column in TIMESTAMP_DEFAULTS.get(table, ()):
+            row.setdefault(column, _now())
+        return row
+
+    def _index(self, table: str, columns: tuple) -> dict:
+        index = self.indexes.get((table, columns))
+        if index is None:
+            index = self.indexes[(table, columns)] = {}
+            for row in self.tables[table]:
+                self._add_key(index, row, columns)
+        return index
+
+    @staticmethod
+    def _add_key(index: dict, row: dict, columns: tuple):
+        key = tuple(row.get(c) for c in columns)
+        # NULLs never conflict
+        if None not in key:
+            index[key] = row
+
+    def _conflict(self, table: str, row: dict, columns: tuple, pending: dict | None = None) -> dict | None:
+        key = tuple(row.get(c) for c in columns)
+        if None in key:
+            return None
+        return self._index(table, columns).get(key) or (pending or {}).get((columns, key))
+
+    def _check_unique(self, table: str, row: dict, pending: dict):
+        """Raise like Postgres on a duplicate key, then reserve the row's keys in `pending`."""
+        for columns in UNIQUE.get(table, []):
+            if self._conflict(table, row, columns, pending):
+                raise APIError({
+                    "code": "23505",
+                    "message": f"duplicate key value violates unique constraint on {table}({', '.join(columns)})",
+                })
+        for columns in UNIQUE.get(table, []):
+            key = tuple(row.get(c) for c in columns)
+            if None not in key:
+                pending[(columns, key)] = row
+
+    def _store(self, table: str, new: list[dict]):
+        self.tables[table].extend(new)
+        self.by_id.pop(table, None)
+        for columns in UNIQUE.get(table, []):
+            if (table, columns) in self.indexes:
+                index = self.indexes[(table, columns)]
+                for row in new:
+                    self._add_key(index, row, columns)
+
+    def _invalidate(self, table: str, columns=None):
+        """Drop cached indexes on `table`, or only those covering any of `columns`."""
+        if columns is None or "id" in columns:
+            self.by_id.pop(table, None)
+        for key in [k for k in self.indexes if k[0] == table and (columns is None or set(k[1]) & set(columns))]:
+            del self.indexes[key]
+
+    def _candidates(self, q: Query) -> list[dict]:
+        """Rows that can match: a unique-index lookup for eq/in_ on id or a unique column, else the table."""
+        unique = {("id",), *(c for c in UNIQUE.get(q.table, []) if len(c) == 1)}
+        for op, column, values in q.keys:
+            if op == "in" and (column,) in unique:
+                index = self._index(q.table, (column,))
+                return [row for row in (index.get((v,)) for v in values) if row is not None]
+        return self.tables[q.table]
+
+    def _id_page(self, q: Query, limit: int) -> list[dict]:
+        """Keyset page in id order, starting after any gt/gte filter on id, without scanning the table."""
+        if q.table not in self.by_id:
+            rows = sorted(self.tables[q.table], key=lambda r: r["id"])
+            self.by_id[q.table] = ([r["id"] for r in rows], rows)
+        ids, rows = self.by_id[q.table]
+        start = 0
+        for op, column, value in q.keys:
+            if column == "id" and op in ("gt", "gte"):
+                start = max(start, (bisect.bisect_right if op == "gt" else bisect.bisect_left)(ids, value))
+        page = []
+        for row in rows[start:]:
+            if q.matches(row):
+                page.append(row)
+                if len(page) == limit:
+                    break
+        return page
+
+    def _select(self, q: Query) -> Result:
+        limit = min(q.row_limit or MAX_ROWS, MAX_ROWS)
+        if q.ordering == ("id", False) and not q.count:
+            return Result(self._project(self._id_page(q, limit), q.columns))
+        rows = [row for row in self._candidates(q) if q.matches(row)]
+        count = len(rows) if q.count else None
+        if q.ordering:
+            column, desc = q.ordering
+            present = [r for r in rows if r.get(column) is not None]
+            # Only the returned page needs sorting; keeps keyset paging from going quadratic
+            pick = heapq.nlargest if desc else heapq.nsmallest
+            present = pick(limit, present, key=lambda r: r[column])
+            missing = [r for r in rows if r.get(column) is None]
+            # Postgres sorts NULLs last ascending and first descending
+            rows = missing + present if desc else present + missing
+        rows = rows[:limit]
+        return Result(self._project(rows, q.columns), count)
+
+    @staticmethod
+    def _project(rows: list[dict], columns: str) -> list[dict]:
+        if columns.strip() == "*":
+            return [dict(row) for row in rows]
+        names = [c.strip() for c in columns.split(",")]
+        return [{name: row.get(name) for name in names} for row in rows]
+
+    def _insert(self, q: Query) -> Result:
+        new = [self._with_defaults(q.table, row) for row in q.payload]
+        # A statement is atomic: check every row before storing any
+        pending: dict = {}
+        for row in new:
+            self._check_unique(q.table, row, pending)
+        self._store(q.table, new)
+        return Result([dict(row) for row in new])
+
+    def _upsert(self, q: Query) -> Result:
+        columns = q.on_conflict or next(iter(UNIQUE.get(q.table, [("id",)])))
+        written, inserts, updates, pending = [], [], [], {}
+        for row in q.payload:
+            existing = self._conflict(q.table, row, columns, pending)
+            if existing is None:
+                new = self._with_defaults(q.table, row)
+                self._check_unique(q.table, new, pending)
+                inserts.append(new)
+                written.append(new)
+            elif not q.ignore_duplicates:
+                updates.append((existing, row))
+                written.append(existing)
+        self._store(q.table, inserts)
+        for existing, row in updates:
+            existing.update(row)
+        if updates:
+            self._invalidate(q.table, {c for _, row in updates for c in row} - set(columns))
+        return Result([dict(row) for row in written])
+
+    def _update(self, q: Query) -> Result:
+        changed = [row for row in self._candidates(q) if q.matches(row)]
+        departed = []
+        for row in changed:
+            old = {c: row.get(c) for c in DEPARTURE_COLUMNS}
+            row.update(q.payload)
+            if q.table == "jobs":
+                row["updated_at"] = _now()
+                if any(row.get(c) != old[c] for c in DEPARTURE_COLUMNS):
+                    departed.append(old)
+        self._invalidate(q.table, q.payload)
+        self._log_departures(departed)
+        return Result([dict(row) for row in changed])
+
+    def _delete(self, q: Query) -> Result:
+        removed = [row for row in self._candidates(q) if q.matches(row)]
+        if removed:
+            gone = {id(row) for row in removed}
+            self.tables[q.table] = [row for row in self.tables[q.table] if id(row) not in gone]
+        self._invalidate(q.table)
+        if q.table == "jobs":
+            self._log_departures([{c: row.get(c) for c in DEPARTURE_COLUMNS} for row in removed])
+        return Result([dict(row) for row in removed])
+
+    def _log_departures(self, rows: list[dict]):
+        """What the jobs departure triggers insert into salary_benchmark_departures."""
+        if rows:
+            self.tables.setdefault("salary_benchmark_departures", [])
+            self._store("salary_benchmark_departures", [self._with_defaults("salary_benchmark_departures", r) for r in rows])
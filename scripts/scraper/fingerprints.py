@@ -0,0 +1,76 @@
+"""
+Cross-run fingerprint index for cross-source dedup.
+`make_fingerprint` values are stored on `jobs.fingerprint`. At startup the
+recent ones are streamed once into a sorted array of 64-bit hashes (8 bytes
+per job), so every scraped row is checked in memory against all batches and
+earlier runs without a database call.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from db import iter_rows
+from dedup import DEDUP_WINDOW_DAYS
+
+# Concurrent workers' inserts are pulled in at most this often
+REFRESH_SECONDS = 60
+
+
+def fingerprint_hash(fingerprint: str) -> int:
+    """First 64 bits of a hex fingerprint."""
+    return int(fingerprint[:16], 16)
+
+
+class FingerprintIndex:
+    """Fingerprints of recently created jobs, plus any seen or inserted during this run."""
+
+    def __init__(self, client, window_days: int = DEDUP_WINDOW_DAYS, refresh_seconds: float = REFRESH_SECONDS):
+        self.client = client
+        self.window_days = window_days
+        self.refresh_seconds = refresh_seconds
+        self.hashes = np.empty(0, dtype=np.uint64)
+        # Added this run or pulled in by refresh(); small next to the preloaded array
+        self.recent: set[int] = set()
+        self.loaded_at: str | None = None
+        self.refreshed = 0.0
+
+    def load(self) -> "FingerprintIndex":
+        """Stream fingerprints of jobs created within the window into the sorted array."""
+        cutoff = (datetime.now() - timedelta(days=self.window_days)).isoformat()
+        self.hashes = np.unique(np.fromiter(self._fetch(cutoff), dtype=np.uint64))
+        print(f"Fingerprint index loaded: {len(self.hashes)} fingerprints ({self.hashes.nbytes // 1024} KiB)")
+        return self
+
+    def refresh(self):
+        """Pick up fingerprints other workers inserted since the last load or refresh."""
+        if time.monotonic() - self.refreshed < self.refresh_seconds:
+            return
+        self.recent.update(self._fetch(self.loaded_at))
+
+    def _fetch(self, created_since: str):
+        # Backed off by one interval so clock skew and slow commits overlap the next refresh rather than slip past it
+        started = datetime.now().astimezone() - timedelta(seconds=self.refresh_seconds)
+        for row in iter_rows(
+            self.client,
+            "jobs",
+            "id, fingerprint",
+            lambda q: q.gte("created_at", created_since).not_.is_("fingerprint", "null"),
+        ):
+            yield fingerprint_hash(row["fingerprint"])
+        self.loaded_at = started.isoformat()
+        self.refreshed = time.monotonic()
+
+    def __contains__(self, fingerprint: str) -> bool:
+        value = fingerprint_hash(fingerprint)
+        if value in self.recent:
+            return True
+        i = np.searchsorted(self.hashes, np.uint64(value))
+        return i < len(self.hashes) and int(self.hashes[i]) == value
+
+    def add(self, fingerprint: str):
+        self.recent.add(fingerprint_hash(fingerprint))
+
+    def __len__(self) -> int:
+        return len(self.hashes) + len(self.recent)
@@ -0,0 +1,163 @@
+"""
+Lightweight run instrumentation for the scraper and aggregation scripts.
+Stage timers, Supabase round-trip counters (by table and verb) and optional
+cProfile output all feed one module-level `report`, which `write()` saves as a
+JSON run report that can be diffed across runs.
+
+Stage times are wall-clock and inclusive: a stage nested in another counts
+toward both, and stages run on worker threads (fetch) add up across threads.
+"""
+
+import cProfile
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# Query builder methods that pick the statement a PostgREST request runs
+VERBS = {"select", "insert", "upsert", "update", "delete"}
+
+
+class RunReport:
+    """Accumulates timings and counters for one run; safe to use from worker threads."""
+
+    def __init__(self):
+        self.started_at = datetime.now().astimezone()
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.meta: dict = {}
+        self.stages: dict[str, dict] = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+        self.requests: dict[str, dict] = defaultdict(lambda: {"seconds": 0.0, "calls": 0, "rows": 0, "errors": 0})
+        self.counters: dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                stats = self.stages[name]
+                stats["seconds"] += elapsed
+                stats["calls"] += 1
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] += n
+
+    def record_request(self, key: str, seconds: float, rows: int, failed: bool):
+        with self.lock:
+            stats = self.requests[key]
+            stats["seconds"] += seconds
+            stats["calls"] += 1
+            stats["rows"] += rows
+            stats["errors"] += failed
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            requests = dict(sorted(self.requests.items()))
+            return {
+                **self.meta,
+                "started_at": self.started_at.isoformat(),
+                "finished_at": datetime.now().astimezone().isoformat(),
+                "wall_seconds": round(time.perf_counter() - self.started, 3),
+                "cpu_seconds": round(time.process_time() - self.cpu_started, 3),
+                # KiB on Linux, bytes on macOS
+                "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                "python": platform.python_version(),
+                "argv": sys.argv[1:],
+                "stages": {name: {**s, "seconds": round(s["seconds"], 3)} for name, s in sorted(self.stages.items())},
+                "supabase": {
+                    "calls": sum(r["calls"] for r in requests.values()),
+                    "seconds": round(sum(r["seconds"] for r in requests.values()), 3),
+                    "requests": {key: {**r, "seconds": round(r["seconds"], 3)} for key, r in requests.items()},
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def write(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"Run report written to {path}")
+
+
+report = RunReport()
+stage = report.stage
+count = report.count
+
+
+class _Instrumented:
+    """Proxy over a client or query builder that times and counts each `execute()`."""
+
+    def __init__(self, target, key: str | None = None):
+        self._target = target
+        self._key = key
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name == "execute":
+            return self._execute
+        if callable(value):
+            return self._wrap_call(name, value)
+        return self._wrap(value, name)
+
+    def _wrap(self, value, name: str):
+        if not hasattr(value, "execute"):
+            return value
+        key = self._key
+        if name in VERBS and key and key.endswith(".?"):
+            key = f"{key[:-2]}.{name}"
+        return _Instrumented(value, key)
+
+    def _wrap_call(self, name: str, method):
+        def call(*args, **kwargs):
+            if name in ("table", "from_"):
+                return _Instrumented(method(*args, **kwargs), f"{args[0]}.?")
+            if name == "rpc":
+                return _Instrumented(method(*args, **kwargs), f"rpc.{args[0]}")
+            return self._wrap(method(*args, **kwargs), name)
+        return call
+
+    def _execute(self, *args, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        rows = 0
+        try:
+            result = self._target.execute(*args, **kwargs)
+            data = getattr(result, "data", None)
+            rows = len(data) if isinstance(data, list) else 0
+            failed = False
+            return result
+        finally:
+            report.record_request(self._key or "?", time.perf_counter() - start, rows, failed)
+
+
+def instrument_client(client):
+    """Wrap a Supabase client so every request it executes is counted in `report`."""
+    return _Instrumented(client)
+
+
+@contextmanager
+def profiled(path: str | None):
+    """cProfile the block and dump pstats to `path`; a no-op when `path` is None."""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        profiler.dump_stats(path)
+        print(f"Profile written to {path} (view with: python -m pstats {path})")
@@ -0,0 +1,147 @@
+"""
+Compiled multi-keyword matcher.
+Tokenizes a text once and resolves every keyword against the token set, so a
+description costs one pass instead of one substring scan per keyword, and
+keywords only match as whole words ("Go" no longer fires on "good").
+"""
+
+import string
+from typing import Hashable
+
+# Punctuation separates words; "#" and "+" stay so "C#" / "C++" survive as tokens.
+# "_" stays too, matching regex \w semantics.
+_SEPARATORS = str.maketrans(
+    {c: " " for c in string.punctuation if c not in "#+_"} | {c: " " for c in "’‘“”–—•…·"}
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens with punctuation treated as whitespace."""
+    return text.lower().translate(_SEPARATORS).split()
+
+
+# Skipped when looking back for the end of the previous sentence
+_SENTENCE_OPENERS = " \t\"'“‘(*•-–"
+_SENTENCE_ENDS = ".!?:\n"
+# A keyword followed by one of these is an item in a list ("Go, Rust", "Go/Golang")
+_LIST_SEPARATORS = ",/;:)\n"
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _opens_sentence(text: str, i: int) -> bool:
+    j = i - 1
+    while j >= 0 and text[j] in _SENTENCE_OPENERS:
+        j -= 1
+    return j < 0 or text[j] in _SENTENCE_ENDS
+
+
+def _rest_of_sentence(text: str, start: int) -> str:
+    end = start
+    while end < len(text) and not (
+        text[end] in "!?\n" or text[end] == "." and (end + 1 == len(text) or text[end + 1].isspace())
+    ):
+        end += 1
+    return text[start:end]
+
+
+def _has_exact_word(text: str, word: str, context: frozenset | None = None) -> bool:
+    """Whether `word` (or its plural) occurs in `text` with exact casing and word boundaries.
+
+    With `context` (lowercase tokens), an occurrence that opens a sentence only counts
+    as a list item or when the rest of its sentence mentions another context token.
+    """
+    own = (word.lower(), word.lower() + "s")
+    n = len(word)
+    i = text.find(word)
+    while i != -1:
+        end = i + n
+        if end < len(text) and text[end] == "s":
+            end += 1
+        before_ok = i == 0 or not _is_word_char(text[i - 1])
+        after_ok = end >= len(text) or not _is_word_char(text[end])
+        if before_ok and after_ok and (
+            context is None
+            or end >= len(text)
+            or text[end] in _LIST_SEPARATORS
+            or not _opens_sentence(text, i)
+            or any(t in context and t not in own for t in tokenize(_rest_of_sentence(text, end)))
+        ):
+            return True
+        i = text.find(word, i + 1)
+    return False
+
+
+class KeywordMatcher:
+    """Match labelled keyword groups as whole words (plural `s` allowed).
+
+    Single-word keywords are resolved with one set intersection against the
+    text's tokens; multi-word keywords ("Tailwind CSS", "visa sponsorship",
+    "CI/CD") are confirmed as phrases only when all their words are present.
+    Keywords listed in `case_sensitive` must also appear with their exact
+    casing, which keeps "Go" or "REST" from firing on ordinary prose. Those
+    also in `sentence_verbs` don't count at the start of a sentence ("Go above
+    and beyond") unless a list separator follows ("Go, Rust", "Go/Golang") or
+    the sentence names another keyword ("Go services on Kubernetes").
+    """
+
+    def __init__(
+        self,
+        groups: dict[Hashable, list[str]],
+        case_sensitive: set[str] | frozenset = frozenset(),
+        sentence_verbs: set[str] | frozenset = frozenset(),
+    ):
+        # token (and its plural) -> labels, for single-word keywords
+        self.words: dict[str, set] = {}
+        # first token -> [(tokens, labels)] for multi-word keywords
+        self.phrases: dict[str, list[tuple[tuple[str, ...], frozenset]]] = {}
+        # token -> exact-case spelling that must appear in the original text
+        self.exact_case: dict[str, str] = {}
+        self.sentence_verbs = frozenset(sentence_verbs)
+
+        phrase_labels: dict[tuple[str, ...], set] = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                tokens = tuple(tokenize(keyword))
+                if len(tokens) == 1:
+                    for form in (tokens[0], tokens[0] + "s"):
+                        self.words.setdefault(form, set()).add(label)
+                    if keyword in case_sensitive:
+                        self.exact_case[tokens[0]] = keyword
+                        self.exact_case[tokens[0] + "s"] = keyword
+                else:
+                    phrase_labels.setdefault(tokens, set()).add(label)
+        for tokens, labels in phrase_labels.items():
+            self.phrases.setdefault(tokens[0], []).append((tokens, frozenset(labels)))
+        self.word_set = frozenset(self.words)
+        self.phrase_starts = frozenset(self.phrases)
+
+    def match_labels(self, text: str) -> set:
+        """Labels of every group with at least one hit in `text`."""
+        if not text:
+            return set()
+        tokens = tokenize(text)
+        present = set(tokens)
+
+        found: set = set()
+        for word in present & self.word_set:
+            exact = self.exact_case.get(word)
+            if exact is None or _has_exact_word(text, exact, self.word_set if exact in self.sentence_verbs else None):
+                found |= self.words[word]
+
+        joined = None
+        for start in present & self.phrase_starts:
+            for phrase, labels in self.phrases[start]:
+                if labels <= found:
+                    continue
+                last = phrase[-1]
+                if not all(t in present for t in phrase[1:-1]) or (last not in present and last + "s" not in present):
+                    continue
+                if joined is None:
+                    joined = f" {' '.join(tokens)} "
+                head = " " + " ".join(phrase)
+                if f"{head} " in joined or f"{head}s " in joined:
+                    found |= labels
+        return found
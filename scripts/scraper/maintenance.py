@@ -0,0 +1,66 @@
+"""
+End-of-run maintenance for the scraper: deactivate stale jobs and refresh
+`categories.job_count`. Runs server-side through the `run_job_maintenance` RPC
+(migration 009); the client-side loops are only used when that function is missing.
+"""
+
+from datetime import datetime, timedelta
+
+from postgrest.exceptions import APIError
+
+from categories import CategoryRegistry
+
+# PostgREST's "function not found in the schema cache" error code
+MISSING_FUNCTION = "PGRST202"
+
+
+def run_maintenance(client, categories: CategoryRegistry, max_age_days: int = 30) -> tuple[int, int]:
+    """Deactivate jobs older than `max_age_days` and recount categories.
+
+    Returns (jobs deactivated, categories whose count changed).
+    """
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+    try:
+        result = client.rpc("run_job_maintenance", {"stale_before": cutoff}).execute()
+    except APIError as e:
+        if e.code != MISSING_FUNCTION:
+            raise
+        print("  run_job_maintenance RPC not found, falling back to client-side cleanup")
+        return deactivate_stale_loop(client, cutoff), recount_categories_loop(client, categories)
+    row = (result.data or [{}])[0]
+    return row.get("deactivated", 0), row.get("categories_updated", 0)
+
+
+def deactivate_stale_loop(client, cutoff: str, batch_size: int = 500) -> int:
+    """Fallback: select and deactivate stale ids in batches (two round trips per batch)."""
+    total = 0
+    while True:
+        stale = (
+            client.table("jobs")
+            .select("id")
+            .eq("is_active", True)
+            .lt("date_posted", cutoff)
+            .limit(batch_size)
+            .execute()
+        )
+        if not stale.data:
+            break
+        stale_ids = [row["id"] for row in stale.data]
+        client.table("jobs").update({"is_active": False}).in_("id", stale_ids).execute()
+        total += len(stale_ids)
+        print(f"  Deactivated {len(stale_ids)} old jobs")
+    return total
+
+
+def recount_categories_loop(client, categories: CategoryRegistry) -> int:
+    """Fallback: one exact count and one update per category."""
+    for _, category_id in categories.items():
+        count_result = (
+            client.table("jobs")
+            .select("id", count="exact")
+            .eq("category_id", category_id)
+            .eq("is_active", True)
+            .execute()
+        )
+        client.table("categories").update({"job_count": count_result.count or 0}).eq("id", category_id).execute()
+    return len(categories.items())
@@ -0,0 +1,245 @@
+"""
+Near-duplicate detection for syndicated postings.
+`make_fingerprint` only catches exact title+company matches; the same posting
+relayed through several boards often differs in abbreviations ("Sr." vs
+"Senior"), company suffixes ("Inc.") or description markup. Each job gets a
+MinHash signature over normalized title, company and description shingles,
+bucketed with LSH so a new job is compared only with the few jobs sharing a
+band. Only jobs with the same `match_key` (company, plus the numbers and
+seniority words in the title) are compared, so "Engineer II" and "Engineer III"
+at one company stay distinct however alike their descriptions are. Signatures
+persist in `job_signatures`, so the check spans batches and runs.
+"""
+
+import base64
+import re
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from db import chunked, iter_rows
+from dedup import DEDUP_WINDOW_DAYS
+from fingerprints import REFRESH_SECONDS
+
+NUM_PERM = 64
+# 16 bands of 4 rows: pairs at Jaccard 0.7 share a band 99% of the time, at 0.3 only 12%
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard at or above which a candidate with the same match key is a duplicate
+SIMILARITY_THRESHOLD = 0.65
+
+# Boards truncate descriptions differently; the opening is what they share
+DESCRIPTION_CHARS = 2000
+SHINGLE_WORDS = 3
+
+WRITE_CHUNK_SIZE = 500
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+TITLE_ABBREVIATIONS = {
+    "sr": "senior", "snr": "senior", "jr": "junior", "mgr": "manager", "eng": "engineer", "engr": "engineer",
+    "dev": "developer", "swe": "software engineer", "ii": "2", "iii": "3", "iv": "4",
+}
+# Location and arrangement noise boards append to titles
+TITLE_NOISE = {"remote", "hybrid", "wfh", "anywhere", "us", "usa", "fully", "100"}
+# Title words that tell apart separate openings for one role; numbers count too
+SENIORITY_WORDS = {"intern", "junior", "associate", "mid", "senior", "staff", "principal", "lead", "head", "chief"}
+COMPANY_SUFFIXES = {"inc", "llc", "ltd", "limited", "corp", "corporation", "co", "company", "gmbh", "plc", "the"}
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures are persisted and must be comparable across runs
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+# Odd multipliers folding a band's ROWS values into one 64-bit key
+_BAND_MIX = _rng.randint(1, 1 << 62, size=ROWS, dtype=np.uint64) | np.uint64(1)
+
+
+def title_tokens(title: str | None) -> list[str]:
+    words = []
+    for token in TOKEN_PATTERN.findall((title or "").lower()):
+        if token not in TITLE_NOISE:
+            words.extend(TITLE_ABBREVIATIONS.get(token, token).split())
+    return words
+
+
+def company_key(company: str | None) -> str:
+    """Company name without punctuation or legal suffixes, for comparing across boards."""
+    tokens = TOKEN_PATTERN.findall((company or "").lower())
+    return " ".join(t for t in tokens if t not in COMPANY_SUFFIXES) or " ".join(tokens)
+
+
+def title_key(title: str | None) -> str:
+    """The numbers and seniority words in a title, sorted; syndicated copies keep these."""
+    return " ".join(sorted({t for t in title_tokens(title) if t.isdigit() or t in SENIORITY_WORDS}))
+
+
+def match_key(title: str | None, company: str | None) -> tuple[str, str]:
+    """Jobs are only compared with others sharing this (company key, title key) pair."""
+    return company_key(company), title_key(title)
+
+
+def shingles(title: str | None, company: str | None, description: str | None) -> set[str]:
+    """Title words and bigrams, company words, and word n-grams from the start of the description."""
+    words = title_tokens(title)
+    result = {f"t:{w}" for w in words}
+    result.update(f"t:{a} {b}" for a, b in zip(words, words[1:]))
+    result.update(f"c:{w}" for w in company_key(company).split())
+    text = TOKEN_PATTERN.findall((description or "")[:DESCRIPTION_CHARS].lower())
+    result.update(f"d:{' '.join(text[i:i + SHINGLE_WORDS])}" for i in range(len(text) - SHINGLE_WORDS + 1))
+    return result
+
+
+def signature(items: set[str]) -> np.ndarray | None:
+    """MinHash signature (NUM_PERM uint32 values) of a shingle set; None when it is empty."""
+    if not items:
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in items), dtype=np.uint64, count=len(items))
+    # Universal hashing mod a Mersenne prime; uint64 products wrap, which is deterministic and fine here
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signatures: np.ndarray) -> np.ndarray:
+    """LSH band keys: (BANDS,) for one signature, (n, BANDS) for a stack of them."""
+    bands = signatures.astype(np.uint64).reshape(*signatures.shape[:-1], BANDS, ROWS)
+    return (bands * _BAND_MIX).sum(axis=-1, dtype=np.uint64) + np.arange(BANDS, dtype=np.uint64)
+
+
+def encode_signature(sig: np.ndarray) -> str:
+    return base64.b64encode(sig.astype("<u4").tobytes()).decode()
+
+
+def decode_signature(text: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype="<u4").astype(np.uint32)
+
+
+class NearDupIndex:
+    """Signatures of recently created jobs, plus any seen during this run.
+
+    Preloaded signatures sit in an (n, NUM_PERM) array with one sorted key
+    array per band; signatures added during the run go in a dict of buckets.
+    """
+
+    def __init__(
+        self,
+        client,
+        window_days: int = DEDUP_WINDOW_DAYS,
+        refresh_seconds: float = REFRESH_SECONDS,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        self.client = client
+        self.window_days = window_days
+        self.refresh_seconds = refresh_seconds
+        self.threshold = threshold
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        # Match key of each preloaded signature
+        self.keys: list[tuple[str, str]] = []
+        # Per band: sorted keys and the row each key belongs to
+        self.band_sorted = np.empty((BANDS, 0), dtype=np.uint64)
+        self.band_rows = np.empty((BANDS, 0), dtype=np.int32)
+        # band key -> indexes into recent
+        self.buckets: dict[int, list[int]] = {}
+        self.recent: list[tuple[np.ndarray, tuple[str, str]]] = []
+        # slug -> (match key, signature, index into recent) awaiting the job's insert
+        self.pending: dict[str, tuple[tuple[str, str], np.ndarray, int]] = {}
+        self.discarded = 0
+        self.candidates = 0
+        self.errors = 0
+        self.loaded_at: str | None = None
+        self.refreshed = 0.0
+
+    def load(self) -> "NearDupIndex":
+        """Stream signatures of jobs created within the window into the banded arrays."""
+        cutoff = (datetime.now() - timedelta(days=self.window_days)).isoformat()
+        rows = list(self._fetch(cutoff))
+        self.keys = [key for key, _ in rows]
+        if rows:
+            self.signatures = np.stack([sig for _, sig in rows])
+            keys = band_keys(self.signatures).T
+            order = np.argsort(keys, axis=1, kind="stable")
+            self.band_sorted = np.take_along_axis(keys, order, axis=1)
+            self.band_rows = order.astype(np.int32)
+        size = self.signatures.nbytes + self.band_sorted.nbytes + self.band_rows.nbytes
+        print(f"Near-dup index loaded: {len(rows)} signatures ({size // 1024} KiB)")
+        return self
+
+    def refresh(self):
+        """Pick up signatures other workers stored since the last load or refresh."""
+        if time.monotonic() - self.refreshed < self.refresh_seconds:
+            return
+        for key, sig in self._fetch(self.loaded_at):
+            self._add_recent(sig, key)
+
+    def _fetch(self, created_since: str):
+        # Same overlap as FingerprintIndex: rows committed late are caught by the next refresh
+        started = datetime.now().astimezone() - timedelta(seconds=self.refresh_seconds)
+        for row in iter_rows(
+            self.client,
+            "job_signatures",
+            "id, company_key, title_key, signature",
+            lambda q: q.gte("created_at", created_since),
+        ):
+            yield (row["company_key"], row["title_key"] or ""), decode_signature(row["signature"])
+        self.loaded_at = started.isoformat()
+        self.refreshed = time.monotonic()
+
+    def find(self, sig: np.ndarray, key: tuple[str, str]) -> bool:
+        """True when a job with the same match key and estimated Jaccard >= threshold is indexed."""
+        bands = band_keys(sig)
+        candidates = set()
+        for band, band_key in enumerate(bands):
+            keys_in_band = self.band_sorted[band]
+            lo, hi = keys_in_band.searchsorted(band_key, "left"), keys_in_band.searchsorted(band_key, "right")
+            candidates.update(self.band_rows[band, lo:hi].tolist())
+        preloaded = [i for i in candidates if self.keys[i] == key]
+        recent = {i for band_key in bands.tolist() for i in self.buckets.get(band_key, ()) if self.recent[i][1] == key}
+        self.candidates += len(preloaded) + len(recent)
+
+        if preloaded and ((self.signatures[preloaded] == sig).mean(axis=1) >= self.threshold).any():
+            return True
+        return any((self.recent[i][0] == sig).mean() >= self.threshold for i in recent)
+
+    def add(self, slug: str, sig: np.ndarray, key: tuple[str, str]):
+        """Index a job queued for insert; its signature is stored once the insert returns its id."""
+        self.pending[slug] = (key, sig, self._add_recent(sig, key))
+
+    def _add_recent(self, sig: np.ndarray, key: tuple[str, str]) -> int:
+        self.recent.append((sig, key))
+        index = len(self.recent) - 1
+        for key in band_keys(sig).tolist():
+            self.buckets.setdefault(key, []).append(index)
+        return index
+
+    def save(self, inserted: list[dict]):
+        """Store signatures for newly inserted jobs (rows with id and slug). Best effort:
+        a missing signature only means later runs can't near-dup against that job."""
+        rows = []
+        for job in inserted:
+            entry = self.pending.pop(job.get("slug"), None)
+            if entry:
+                (company, title), sig = entry[0], entry[1]
+                rows.append({"job_id": job["id"], "company_key": company, "title_key": title, "signature": encode_signature(sig)})
+        for chunk in chunked(rows, WRITE_CHUNK_SIZE):
+            try:
+                self.client.table("job_signatures").upsert(chunk, on_conflict="job_id", ignore_duplicates=True).execute()
+            except Exception as e:
+                self.errors += 1
+                print(f"  Failed to store {len(chunk)} job signatures: {e}")
+
+    def discard_pending(self):
+        """Unindex jobs that were queued but not inserted (source conflicts or failed writes).
+
+        Call once everything queued has been written: `save` has taken the inserted ones,
+        and the rest must not keep matching later postings as near-duplicates.
+        """
+        for _, sig, index in self.pending.values():
+            for key in band_keys(sig).tolist():
+                self.buckets[key].remove(index)
+        self.discarded += len(self.pending)
+        self.pending.clear()
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.recent) - self.discarded
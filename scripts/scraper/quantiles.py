@@ -0,0 +1,17 @@
+"""
+Percentile helper for salary aggregates.
+Benchmark percentiles and snapshot medians are persisted, so they are computed
+exactly from each group's sorted salary midpoints.
+"""
+
+
+def exact_percentile(sorted_values: list, p: float) -> int:
+    """Linear-interpolated percentile of an already sorted list (0 if empty)."""
+    if not sorted_values:
+        return 0
+    k = (len(sorted_values) - 1) * p / 100
+    f = int(k)
+    c = f + 1
+    if c >= len(sorted_values):
+        return sorted_values[f]
+    return int(sorted_values[f] + (k - f) * (sorted_values[c] - sorted_values[f]))
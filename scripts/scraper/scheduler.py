@@ -0,0 +1,197 @@
+"""
+Yield-aware scheduling of (query, site) units.
+Each unit's fetched, new, same-source dupes, cross-source dupes, errors and
+fetch latency are kept as moving averages in `scrape_query_stats`. Runs fetch
+units in order of expected new jobs per second of board time, size each
+unit's `results_wanted` to what it has been yielding, and with a time budget
+drop the units that no longer fit.
+"""
+
+import math
+import statistics
+import threading
+from datetime import datetime, timedelta, timezone
+
+from db import iter_rows
+from engine import SITE_RATE_LIMITS
+
+# Weight of the latest run in each moving average
+EWMA_ALPHA = 0.3
+
+DEFAULT_RESULTS_WANTED = 80
+MIN_RESULTS_WANTED = 20
+MAX_RESULTS_WANTED = 200
+# A unit is saturated when it returns at least this share of what was asked for
+SATURATED = 0.9
+# Saturated units adding at least this share of new jobs get a bigger page next time
+GROW_NEW_SHARE = 0.5
+GROW_FACTOR = 1.5
+# ...and below this share only ask for a few times what they add
+SHRINK_NEW_SHARE = 0.1
+SHRINK_HEADROOM = 3
+
+# With a budget, units expected to add fewer new jobs per fetch are dropped
+MIN_EXPECTED_NEW = 0.5
+
+# Units not run for this long are scored as if they were typical for their
+# site, so a query that went quiet is retried instead of starved for good
+EXPLORE_AFTER_HOURS = 48
+
+STATS = ("fetched", "new", "skipped", "cross_dupes", "errors", "seconds")
+
+
+def unit_sites(site: str) -> list[str]:
+    """Sites a stats key covers: one site, or several joined by checkpoint.unit_site."""
+    return site.split(",")
+
+
+class QueryScheduler:
+    """Per-unit yield statistics, the run plan built from them, and this run's observations."""
+
+    def __init__(self, client, now: datetime | None = None):
+        self.client = client
+        self.now = now or datetime.now(timezone.utc)
+        # (query, site) -> stored row
+        self.stats: dict[tuple[str, str], dict] = {}
+        # (query, site) -> results_wanted planned for this run
+        self.planned: dict[tuple[str, str], int] = {}
+        # (query, site) -> this run's totals
+        self.observed: dict[tuple[str, str], dict] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> "QueryScheduler":
+        columns = f"id, query, site, runs, results_wanted, last_run_at, {', '.join(STATS)}"
+        for row in iter_rows(self.client, "scrape_query_stats", columns):
+            self.stats[(row["query"], row["site"])] = row
+        print(f"Query stats loaded: {len(self.stats)} (query, site) units")
+        return self
+
+    def cost(self, query: str, site: str) -> float:
+        """Expected board seconds per fetch: its latency, or the site's rate-limit interval if longer."""
+        row = self.stats.get((query, site))
+        seconds = row["seconds"] if row and row["seconds"] else self._typical(site, "seconds", 10.0)
+        pacing = max(1 / SITE_RATE_LIMITS.get(s, math.inf) for s in unit_sites(site))
+        return max(seconds, pacing)
+
+    def expected_new(self, query: str, site: str) -> float:
+        """New jobs a fetch is expected to add: its average, or its site's typical unit's if unknown or stale."""
+        row = self.stats.get((query, site))
+        typical = self._typical(site, "new", 1.0)
+        if row is None:
+            return typical
+        own = row["new"] or 0
+        stale = not row.get("last_run_at") or (
+            self.now - datetime.fromisoformat(row["last_run_at"]) >= timedelta(hours=EXPLORE_AFTER_HOURS)
+        )
+        return max(own, typical) if stale else own
+
+    def score(self, query: str, site: str) -> float:
+        """Expected new jobs per board second."""
+        return self.expected_new(query, site) / self.cost(query, site)
+
+    def _typical(self, site: str, field: str, default: float) -> float:
+        values = [row[field] for (_, s), row in self.stats.items() if s == site and row[field] is not None]
+        return statistics.median(values) if values else default
+
+    def results_wanted(self, query: str, site: str) -> int:
+        """Next page size: grown while a saturated unit keeps adding new jobs, shrunk when it mostly repeats."""
+        row = self.stats.get((query, site))
+        if not row or not row.get("results_wanted"):
+            return DEFAULT_RESULTS_WANTED
+        wanted = row["results_wanted"]
+        fetched, new = row["fetched"] or 0, row["new"] or 0
+        # JobSpy's results_wanted is per site
+        if fetched < SATURATED * wanted * len(unit_sites(site)):
+            return wanted
+        if new >= GROW_NEW_SHARE * fetched:
+            wanted = math.ceil(wanted * GROW_FACTOR)
+        elif new < SHRINK_NEW_SHARE * fetched:
+            wanted = math.ceil(SHRINK_HEADROOM * new / len(unit_sites(site)))
+        return min(max(wanted, MIN_RESULTS_WANTED), MAX_RESULTS_WANTED)
+
+    def plan(
+        self, units: list[tuple[str, str]], budget_seconds: float | None = None, workers: int = 1
+    ) -> list[tuple[str, str]]:
+        """Units in order of expected yield, keeping only those that fit the budget.
+
+        The budget bounds both the pool's total fetch time (`workers` at once)
+        and each site's rate-limited fetches; units that don't fit are skipped
+        in favour of cheaper, lower-ranked ones that still do. Units expected
+        to add almost nothing are dropped too, so the run can finish early.
+        """
+        ranked = sorted(units, key=lambda u: self.score(*u), reverse=True)
+        chosen = ranked
+        if budget_seconds is not None:
+            chosen = []
+            spent = 0.0
+            by_site: dict[str, float] = {}
+            for query, site in ranked:
+                if self.expected_new(query, site) < MIN_EXPECTED_NEW:
+                    continue
+                cost = self.cost(query, site)
+                pacing = {s: by_site.get(s, 0.0) + 1 / SITE_RATE_LIMITS.get(s, math.inf) for s in unit_sites(site)}
+                if spent + cost > budget_seconds * workers or max(pacing.values()) > budget_seconds:
+                    continue
+                chosen.append((query, site))
+                spent += cost
+                by_site.update(pacing)
+        for query, site in chosen:
+            self.planned[(query, site)] = self.results_wanted(query, site)
+        expected = sum((self.stats.get(u) or {}).get("new") or 0 for u in chosen)
+        print(f"Scheduled {len(chosen)} of {len(units)} units, ~{expected:.0f} new jobs expected from their history")
+        return chosen
+
+    def wanted(self, query: str, site: str) -> int:
+        """results_wanted for fetching a unit, planned now if `plan()` didn't cover it."""
+        with self.lock:
+            if (query, site) not in self.planned:
+                self.planned[(query, site)] = self.results_wanted(query, site)
+            return self.planned[(query, site)]
+
+    def record_fetch(self, query: str, site: str, seconds: float, failed: bool = False):
+        with self.lock:
+            seen = self.observed.setdefault((query, site), dict.fromkeys(STATS, 0))
+            seen["seconds"] += seconds
+            seen["errors"] += failed
+
+    def record_load(self, query: str, site: str, counts: dict):
+        """Counters from JobLoader.load for a loaded unit."""
+        with self.lock:
+            seen = self.observed.setdefault((query, site), dict.fromkeys(STATS, 0))
+            seen["fetched"] += counts.get("found", 0)
+            seen["new"] += counts.get("queued", 0)
+            for name in ("skipped", "cross_dupes", "errors"):
+                seen[name] += counts.get(name, 0)
+
+    def commit(self):
+        """Fold this run's observations into the stored averages. Best effort, once per run."""
+        with self.lock:
+            observed, self.observed = self.observed, {}
+        rows = []
+        for (query, site), seen in observed.items():
+            row = self.stats.get((query, site))
+            if seen["seconds"] == 0 and row:
+                # Loaded from the cache: no latency measured this run
+                seen["seconds"] = row["seconds"]
+            averaged = {
+                name: value if not row or row[name] is None else (1 - EWMA_ALPHA) * row[name] + EWMA_ALPHA * value
+                for name, value in seen.items()
+            }
+            rows.append({
+                "query": query,
+                "site": site,
+                **averaged,
+                "runs": (row["runs"] if row else 0) + 1,
+                "results_wanted": self.planned.get((query, site)) or (row or {}).get("results_wanted") or DEFAULT_RESULTS_WANTED,
+                "last_run_at": self.now.isoformat(),
+            })
+        if not rows:
+            return
+        try:
+            self.client.table("scrape_query_stats").upsert(rows, on_conflict="query,site").execute()
+        except Exception as e:
+            # Best effort: the next run just plans from older averages
+            print(f"  Could not save stats for {len(rows)} query units: {e}")
+            return
+        for row in rows:
+            self.stats[(row["query"], row["site"])] = row
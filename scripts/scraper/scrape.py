@@ -1,26 +1,59 @@
 """
 Weightless Job Scraper
 Scrapes remote jobs from major job boards via JobSpy, transforms and loads into Supabase.
-Run: python scripts/scraper/scrape.py [--batch N --total-batches M]
+Run: python scripts/scraper/scrape.py [--batch N --total-batches M] [--workers N] [--replay | --no-cache] [--resume]
+     python scripts/scraper/scrape.py --queue [--workers N]   (then --finalize once all workers exit)
+     Each unit searches only since its last successful scrape; add --full-sweep for the full 14-day window.
+     Add --report PATH for a JSON run report (stage timings, Supabase calls) and --profile PATH for cProfile stats.
+     --sink postgres writes jobs and companies over a direct connection (SUPABASE_DB_URL) with COPY.
 """
 
 import os
-import re
 import time
+import sys
 import random
-import hashlib
 import argparse
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 from jobspy import scrape_jobs
-from supabase import create_client, Client
+from supabase import create_client
+
+from alerts import match_new_jobs
+from cache import DEFAULT_CACHE_DIR, DEFAULT_TTL_HOURS, ScrapeCache
+from categories import CategoryRegistry
+from checkpoint import Checkpoint, default_run_id, unit_site
+from companies import CompanyResolver
+from dedup import DedupIndex
+from engine import run_units
+from fingerprints import FingerprintIndex
+from neardup import NearDupIndex, match_key, shingles, signature
+from watermarks import FULL_WINDOW_HOURS, ScrapeWatermarks
+from instrument import instrument_client, profiled, report, stage
+from maintenance import run_maintenance
+from scheduler import QueryScheduler
+from sinks import create_sink
+from transform import slugify, transform_frame
+from workqueue import SqliteQueue, SupabaseQueue, WorkQueue, default_worker_id
+from writer import DEFAULT_CHUNK_SIZE, JobWriter
 
 load_dotenv(".env.local")
 
-SUPABASE_URL = os.environ["NEXT_PUBLIC_SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+# Set by connect(); the functions below all use this client, and this sink for bulk job/company writes
+supabase = None
+sink = None
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+def connect(client=None, sink_kind: str = "postgrest"):
+    """Use `client` (e.g. fakedb.FakeSupabase in benchmarks) or create one from the environment.
+
+    Either way every request is timed and counted by table and verb for the run report.
+    """
+    global supabase, sink
+    if client is None:
+        client = create_client(os.environ["NEXT_PUBLIC_SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+    supabase = instrument_client(client)
+    sink = create_sink(sink_kind, supabase)
+    return supabase
 
 # Search queries targeting remote/nomad jobs
 SEARCH_QUERIES = [
@@ -169,426 +202,632 @@ SEARCH_QUERIES = [
     "remote freelance developer",
 ]
 
-TECH_KEYWORDS = [
-    "React", "Next.js", "Vue", "Angular", "Svelte",
-    "Node.js", "Express", "Django", "Flask", "FastAPI",
-    "Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "C#", "Ruby",
-    "PostgreSQL", "MySQL", "MongoDB", "Redis", "Elasticsearch",
-    "AWS", "GCP", "Azure", "Docker", "Kubernetes", "Terraform",
-    "GraphQL", "REST", "gRPC",
-    "TensorFlow", "PyTorch", "Pandas", "Spark",
-    "Figma", "Sketch", "Adobe XD",
-    "Git", "CI/CD", "Jenkins", "GitHub Actions",
-    "Tailwind CSS", "SASS", "CSS",
-    "Linux", "Nginx", "Apache",
-    "Kafka", "RabbitMQ", "Celery",
-    "Snowflake", "BigQuery", "Redshift",
-]
-
-CATEGORY_MAP = {
-    "engineering": ["engineer", "developer", "devops", "sre", "architect", "programmer", "cto", "sysadmin", "qa "],
-    "design": ["designer", "ux ", "ui ", "creative director", "illustrator", "design lead", "art director"],
-    "marketing": ["marketing", " seo", "growth", "social media", "brand manager", "demand gen", "paid media"],
-    "product": ["product manager", "product owner", "product lead", "product director", "program manager"],
-    "support": ["customer support", "customer success", "account manager", "customer service", "helpdesk", "help desk"],
-    "writing": ["writer", "copywriter", "technical writer", "content strategist", "content manager", "editor"],
-    "data": ["data engineer", "data scientist", "data analyst", "machine learning", "ml engineer", "ai engineer", "analytics engineer", "bi analyst", "business intelligence"],
-    "education": ["teacher", "tutor", "instructor", "professor", "curriculum", "teaching", "academic"],
-}
+SCRAPE_SITES = ["indeed", "linkedin", "glassdoor", "google"]
 
-EXPERIENCE_MAP = {
-    "junior": ["junior", "entry level", "associate", "intern", "jr", "early career"],
-    "mid": ["mid", "intermediate"],
-    "senior": ["senior", "sr", "staff", "principal"],
-    "lead": ["lead", "manager", "head of", "director", "vp"],
-    "executive": ["cto", "ceo", "cfo", "coo", "c-level", "executive", "chief"],
+# JobSpy search parameters shared by every query; with each unit's overrides, the cache key
+SCRAPE_PARAMS = {
+    "location": "remote",
+    "results_wanted": 80,
+    # 14 days; ScrapeWatermarks narrows it per unit to the time since its last scrape
+    "hours_old": FULL_WINDOW_HOURS,
+    "is_remote": True,
+    "country_indeed": "USA",
 }
 
 
-def safe_str(val, default="") -> str:
-    """Safely convert a value to string, handling NaN/None."""
-    if val is None:
-        return default
-    s = str(val)
-    if s in ("nan", "None", "NaT", ""):
-        return default
-    return s.strip()
-
-
-def slugify(text: str) -> str:
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s-]", "", text)
-    text = re.sub(r"[\s_]+", "-", text)
-    text = re.sub(r"^-+|-+$", "", text)
-    return text
-
-
-def extract_tech_stack(text: str) -> list[str]:
-    if not text:
-        return []
-    found = []
-    text_lower = text.lower()
-    for tech in TECH_KEYWORDS:
-        if tech.lower() in text_lower:
-            found.append(tech)
-    return found[:10]
-
-
-def classify_category(title: str) -> str:
-    title_lower = title.lower()
-    # Priority order matters — check more specific categories first
-    priority_order = ["data", "product", "education", "writing", "support", "design", "marketing", "engineering"]
-    for category in priority_order:
-        keywords = CATEGORY_MAP[category]
-        for keyword in keywords:
-            if keyword in title_lower:
-                return category
-    return "engineering"
-
-
-def classify_experience(title: str, description: str = "") -> str:
-    combined = f"{title} {description[:500]}".lower()
-    for level, keywords in EXPERIENCE_MAP.items():
-        for keyword in keywords:
-            if keyword in combined:
-                return level
-    return "mid"
-
-
-def normalize_salary(min_val, max_val, interval) -> tuple[int | None, int | None]:
-    """Normalize salary to annual USD."""
-    try:
-        min_f = float(min_val) if min_val and safe_str(min_val) else None
-        max_f = float(max_val) if max_val and safe_str(max_val) else None
-    except (ValueError, TypeError):
-        return None, None
-
-    if min_f is None and max_f is None:
-        return None, None
-
-    multiplier = 1
-    interval_str = safe_str(interval).lower()
-    if "hour" in interval_str:
-        multiplier = 2080
-    elif "month" in interval_str:
-        multiplier = 12
-
-    sal_min = int(min_f * multiplier) if min_f else None
-    sal_max = int(max_f * multiplier) if max_f else None
-
-    # Sanity check: skip if < $10k or > $1M annual
-    if sal_min and (sal_min < 10000 or sal_min > 1000000):
-        sal_min = None
-    if sal_max and (sal_max < 10000 or sal_max > 1000000):
-        sal_max = None
-
-    return sal_min, sal_max
-
-
-def detect_visa_sponsorship(text: str) -> bool:
-    if not text:
-        return False
-    keywords = ["visa sponsor", "visa sponsorship", "work permit", "relocation"]
-    return any(k in text.lower() for k in keywords)
-
-
-def detect_async_friendly(text: str) -> bool:
-    if not text:
-        return False
-    keywords = ["async", "asynchronous", "flexible hours", "flexible schedule", "any timezone"]
-    return any(k in text.lower() for k in keywords)
-
-
-def generate_source_id(source: str, job_id: str, title: str, company: str) -> str:
-    """Generate a unique source ID for deduplication."""
-    if job_id and safe_str(job_id):
-        return safe_str(job_id)[:64]
-    raw = f"{source}:{title}:{company}".lower()
-    return hashlib.md5(raw.encode()).hexdigest()[:16]
-
-
-def make_fingerprint(title: str, company: str) -> str:
-    """Generate a cross-source fingerprint for deduplication across job boards."""
-    normalized = re.sub(r"[^a-z0-9]", "", f"{title}{company}".lower())
-    return hashlib.md5(normalized.encode()).hexdigest()[:20]
-
-
-JOB_BOARD_DOMAINS = {"indeed.com", "linkedin.com", "glassdoor.com", "ziprecruiter.com", "google.com"}
-
-
-def is_job_board_domain(domain: str) -> bool:
-    """Check if a domain belongs to a job board rather than a company."""
-    if domain in JOB_BOARD_DOMAINS:
-        return True
-    for jb in JOB_BOARD_DOMAINS:
-        if domain.endswith(f".{jb}"):
-            return True
-    return False
-
-
-def derive_logo_url(website: str, name: str) -> str | None:
-    """Derive a company logo URL from website domain using Clearbit Logo CDN."""
-    domain = ""
-    if website:
-        domain = re.sub(r"^https?://", "", website).split("/")[0].strip().lower()
-        domain = re.sub(r"^www\.", "", domain)
-
-    # Skip job board domains
-    if domain and not is_job_board_domain(domain):
-        return f"https://logo.clearbit.com/{domain}"
-
-    # Guess from company name (only for short clean names)
-    clean_name = re.sub(r"[^\w]", "", name.lower())
-    if clean_name and 3 <= len(clean_name) <= 20 and " " not in name.strip():
-        return f"https://logo.clearbit.com/{clean_name}.com"
-
-    return None
-
-
-def get_or_create_company(name: str, logo_url: str = "", website: str = "", description: str = "", size: str = "") -> str:
-    """Get existing company or create new one, return company ID."""
-    slug = slugify(name)
-    if not slug:
-        slug = "unknown"
-
-    # Auto-derive logo if not provided
-    if not logo_url:
-        logo_url = derive_logo_url(website, name) or ""
-
-    result = supabase.table("companies").select("id, logo_url").eq("slug", slug).execute()
-    if result.data:
-        # Update with new info if available
-        updates = {}
-        if logo_url and not result.data[0].get("logo_url"):
-            updates["logo_url"] = logo_url
-        if website:
-            updates["website"] = website
-        if description:
-            updates["description"] = description[:1000]
-        if size:
-            updates["size"] = size
-        if updates:
-            supabase.table("companies").update(updates).eq("id", result.data[0]["id"]).execute()
-        return result.data[0]["id"]
+def fetch_jobs(query: str, sites: list[str], hours_old: int | None = None, results_wanted: int | None = None):
+    """Run one JobSpy search and return its DataFrame (or None).
+
+    `hours_old` narrows the search window from SCRAPE_PARAMS' full 14 days;
+    `results_wanted` overrides its page size.
+    """
+    params = dict(SCRAPE_PARAMS)
+    if hours_old is not None:
+        params["hours_old"] = hours_old
+    if results_wanted is not None:
+        params["results_wanted"] = results_wanted
+    with stage("fetch"):
+        return scrape_jobs(site_name=sites, search_term=query, **params)
+
+
+def load_watermarks(cache: ScrapeCache | None, full_sweep: bool = False) -> ScrapeWatermarks | None:
+    """Scrape windows for this run; None in replay mode, which never fetches and mustn't advance them."""
+    if cache and cache.replay:
+        return None
+    return ScrapeWatermarks(supabase, full_sweep=full_sweep).load()
+
+
+def load_scheduler(cache: ScrapeCache | None) -> QueryScheduler | None:
+    """Yield stats for this run; None in replay mode, whose timings and yields say nothing about the boards."""
+    if cache and cache.replay:
+        return None
+    return QueryScheduler(supabase).load()
+
+
+class JobLoader:
+    """Transform scraped result sets and feed new jobs to the buffered writer."""
+
+    def __init__(
+        self,
+        client,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        checkpoint: Checkpoint | WorkQueue | None = None,
+        watermarks: ScrapeWatermarks | None = None,
+        scheduler: QueryScheduler | None = None,
+        sink=None,
+        cache: ScrapeCache | None = None,
+    ):
+        with stage("warmup"):
+            self.categories = CategoryRegistry(client).load()
+            self.dedup = DedupIndex(client).load()
+            self.fingerprints = FingerprintIndex(client).load()
+            self.near_dups = NearDupIndex(client).load()
+            self.companies = CompanyResolver(client, sink=sink).load()
+        self.checkpoint = checkpoint
+        self.watermarks = watermarks
+        self.scheduler = scheduler
+        # Only read, to date cached results when advancing watermarks
+        self.cache = cache
+        self.writer = JobWriter(
+            client, chunk_size=chunk_size, companies=self.companies, on_flush=self._flushed, on_insert=self._remember_new,
+            sink=sink,
+        )
+        # Jobs inserted this run, trimmed to what alert matching reads
+        self.new_jobs: list[dict] = []
+        self.found = 0
+        self.queued = 0
+        self.skipped = 0
+        self.cross_dupes = 0
+        self.errors = 0
+
+    def counters(self) -> dict:
+        return {
+            "found": self.found,
+            "queued": self.queued,
+            "skipped": self.skipped,
+            "cross_dupes": self.cross_dupes,
+            "errors": self.errors,
+        }
+
+    def load(self, jobs_df) -> dict:
+        """Transform one JobSpy result set column-wise, then dedup and buffer its records.
+
+        Returns this result set's counters, for its checkpoint.
+        """
+        before = self.counters()
+        self.found += len(jobs_df)
+        with stage("transform"):
+            records = transform_frame(jobs_df)
+        with stage("dedup"):
+            self.fingerprints.refresh()
+            self.near_dups.refresh()
+            if not records.empty:
+                self.dedup.prefetch(list(zip(records["source"], records["source_id"], records["slug"])))
+
+        for record in records.to_dict("records"):
+            try:
+                self._load_record(record)
+            except Exception as e:
+                self.errors += 1
+                if self.errors <= 10:
+                    print(f"  Error processing job: {e}")
+        return {k: v - before[k] for k, v in self.counters().items()}
+
+    def _remember_new(self, rows: list[dict]):
+        self.near_dups.save(rows)
+        self.new_jobs.extend(
+            {k: row.get(k) for k in ("id", "title", "description_plain", "tech_stack", "category_id")} for row in rows
+        )
+
+    def search_params(self, query: str, sites: list[str]) -> dict:
+        """A unit's overrides of SCRAPE_PARAMS: its watermark window and scheduled page size."""
+        params = {}
+        if self.watermarks:
+            params["hours_old"] = self.watermarks.hours_old(query, sites)
+        if self.scheduler:
+            params["results_wanted"] = self.scheduler.wanted(query, unit_site(sites))
+        return params
+
+    def fetch(self, query: str, sites: list[str]):
+        """`fetch_jobs` for a unit with its `search_params`.
+
+        Fetch latency and failures feed the unit's yield stats.
+        """
+        params = self.search_params(query, sites)
+        start = time.perf_counter()
+        try:
+            jobs_df = fetch_jobs(query, sites, params.get("hours_old"), params.get("results_wanted"))
+        except Exception:
+            if self.scheduler:
+                self.scheduler.record_fetch(query, unit_site(sites), time.perf_counter() - start, failed=True)
+            raise
+        if self.scheduler:
+            self.scheduler.record_fetch(query, unit_site(sites), time.perf_counter() - start)
+        return jobs_df
+
+    def plan(self, units: list[tuple[str, str]], budget_seconds: float | None = None, workers: int = 1) -> list[tuple[str, str]]:
+        """Order (and with a budget, trim) units by expected yield; unchanged without stats."""
+        if not self.scheduler:
+            return units
+        planned = self.scheduler.plan(units, budget_seconds, workers)
+        report.count("units_scheduled", len(planned))
+        report.count("units_over_budget", len(units) - len(planned))
+        return planned
+
+    def complete(self, query: str, sites: list[str], counts: dict | None = None):
+        """Mark a (query, sites) unit done; persisted once its jobs have been written."""
+        if self.checkpoint:
+            self.checkpoint.complete(query, sites, counts or {"found": 0})
+        if self.watermarks:
+            fetched_at = self.cache.fetched_at(query, sites, self.search_params(query, sites)) if self.cache else None
+            self.watermarks.advance(query, sites, fetched_at)
+        if self.scheduler:
+            self.scheduler.record_load(query, unit_site(sites), counts or {})
+
+    def _flushed(self):
+        # Everything queued is written now; jobs still awaiting an id were not inserted
+        self.near_dups.discard_pending()
+        self._commit()
+
+    def _commit(self):
+        if self.checkpoint:
+            self.checkpoint.commit()
+        if self.watermarks:
+            self.watermarks.commit()
+
+    def _load_record(self, record: dict):
+        source, source_id, slug, fingerprint = record["source"], record["source_id"], record["slug"], record["fingerprint"]
+
+        # Check for existing in DB (same source + source_id)
+        if self.dedup.has_source_id(source, source_id):
+            self.skipped += 1
+            return
+
+        # Cross-source dedup: same title+company from ANY source, in any batch or recent run
+        if fingerprint in self.fingerprints:
+            self.cross_dupes += 1
+            return
+        self.fingerprints.add(fingerprint)
+
+        # Near-duplicates: the same posting with reworded title, company suffix or description markup
+        company_name = record["company"]
+        with stage("near_dedup"):
+            near_key = match_key(record["title"], company_name)
+            near_sig = signature(shingles(record["title"], company_name, record["description_plain"]))
+            if near_sig is not None and self.near_dups.find(near_sig, near_key):
+                self.cross_dupes += 1
+                report.count("near_dupes")
+                return
+
+        # Slugs are unique on jobs and truncated, so distinct fingerprints can still collide here
+        if self.dedup.has_slug(slug):
+            self.cross_dupes += 1
+            return
+
+        with stage("company_resolve"):
+            company_slug = self.companies.resolve(
+                slugify(company_name) or "unknown",
+                company_name,
+                record["company_logo"],
+                record["company_url"],
+                record["company_description"],
+                record["company_size"],
+            )
 
-    result = supabase.table("companies").insert({
-        "name": name,
-        "slug": slug,
-        "logo_url": logo_url or None,
-        "website": website or None,
-        "description": (description[:1000]) if description else None,
-        "size": size or None,
-        "remote_policy": "Remote",
-    }).execute()
-    return result.data[0]["id"]
+        job_data = {
+            "title": record["title"],
+            "normalized_title": record["normalized_title"],
+            "slug": slug,
+            "fingerprint": fingerprint,
+            "company_slug": company_slug,
+            "description": record["description"],
+            "description_plain": record["description_plain"],
+            "category_id": self.categories.id_for(record["category_slug"]),
+            "job_type": "full_time",
+            "experience_level": record["experience_level"],
+            "salary_min": record["salary_min"],
+            "salary_max": record["salary_max"],
+            "salary_currency": "USD",
+            "location_requirements": "Remote",
+            "is_async_friendly": record["is_async_friendly"],
+            "visa_sponsorship": record["visa_sponsorship"],
+            "tech_stack": record["tech_stack"],
+            "source": source,
+            "source_id": source_id,
+            "source_url": record["source_url"],
+            "apply_url": record["apply_url"],
+            "is_featured": False,
+            "is_active": True,
+            "date_posted": record["date_posted"],
+        }
+
+        # Indexed before queuing: the add below may flush, and the flush stores its signature
+        if near_sig is not None:
+            self.near_dups.add(slug, near_sig, near_key)
+        self.writer.add(job_data)
+        self.queued += 1
+        self.dedup.add(source, source_id, slug)
+
+    def finish(self):
+        """Flush buffered jobs and company updates."""
+        self.writer.flush()
+        self._commit()
+        with stage("company_resolve"):
+            self.companies.flush_updates()
+        self.errors += self.writer.errors + self.companies.errors + self.near_dups.errors
+        for name, value in {**self.counters(), "inserted": self.writer.inserted}.items():
+            report.count(f"jobs_{name}", value)
+        print(f"Companies: {self.companies.created} created, {self.companies.updated} updated")
+        if self.watermarks:
+            full, incremental = self.watermarks.summary()
+            report.count("windows_full", full)
+            report.count("windows_incremental", incremental)
+            print(f"Scrape windows: {incremental} incremental, {full} full sweeps")
+        if self.scheduler:
+            self.scheduler.commit()
+
+    def match_alerts(self):
+        """Match this run's new jobs against active job alerts."""
+        category_slugs = {category_id: slug for slug, category_id in self.categories.items()}
+        try:
+            with stage("alerts"):
+                alerts, matches = match_new_jobs(self.writer.client, self.new_jobs, category_slugs)
+        except Exception as e:
+            # New jobs are already saved; a failed match only delays their alerts
+            print(f"Job alert matching failed: {e}")
+            return
+        report.count("alert_matches", matches)
+        print(f"Job alerts: {matches} matches for {alerts} alerts from {len(self.new_jobs)} new jobs")
+
+
+def scrape_sequential(
+    queries: list[str],
+    loader: JobLoader,
+    cache: ScrapeCache | None = None,
+    resume: bool = False,
+    budget_seconds: float | None = None,
+):
+    """Run each query against all sites in turn, with a randomized pause between network fetches."""
+    site = unit_site(SCRAPE_SITES)
+    queries = [query for query, _ in loader.plan([(query, site) for query in queries], budget_seconds)]
+    fetched = False
+    for i, query in enumerate(queries):
+        print(f"\nSearching: '{query}' ({i + 1}/{len(queries)})")
+        if resume and loader.checkpoint.is_done(query, SCRAPE_SITES):
+            print("  Already completed in this run, skipping")
+            continue
 
+        try:
+            params = loader.search_params(query, SCRAPE_SITES)
+            jobs_df = cache.get(query, SCRAPE_SITES, params) if cache else None
+            if jobs_df is not None:
+                print("  Using cached results")
+            elif cache and cache.replay:
+                print(f"  No cached results for '{query}'")
+                continue
+            else:
+                # Randomized throttle between queries to avoid rate limiting
+                if fetched:
+                    delay = random.uniform(3, 10)
+                    with stage("sleep"):
+                        time.sleep(delay)
+                fetched = True
+                jobs_df = loader.fetch(query, SCRAPE_SITES)
+                if cache:
+                    cache.put(query, SCRAPE_SITES, jobs_df, params)
 
-def get_category_id(slug: str) -> str | None:
-    result = supabase.table("categories").select("id").eq("slug", slug).execute()
-    return result.data[0]["id"] if result.data else None
+            if jobs_df is None or jobs_df.empty:
+                print(f"  No results for '{query}'")
+                loader.complete(query, SCRAPE_SITES)
+                continue
 
+            print(f"  Found {len(jobs_df)} results")
+            loader.complete(query, SCRAPE_SITES, loader.load(jobs_df))
 
-# In-memory set of fingerprints seen during this run (cross-source dedup within a run)
-_seen_fingerprints: set[str] = set()
+        except Exception as e:
+            print(f"  Error scraping '{query}': {e}")
+            continue
 
 
-def scrape_and_load(batch: int = 0, total_batches: int = 1):
+def load_unit(prefix: str, query: str, site: str, jobs_df, loader: JobLoader):
+    if jobs_df is None or jobs_df.empty:
+        print(f"  {prefix}: no results")
+        loader.complete(query, [site])
+        return
+    print(f"  {prefix}: {len(jobs_df)} results")
+    try:
+        loader.complete(query, [site], loader.load(jobs_df))
+    except Exception as e:
+        print(f"  {prefix}: error loading: {e}")
+
+
+def scrape_concurrent(
+    queries: list[str],
+    loader: JobLoader,
+    workers: int,
+    cache: ScrapeCache | None = None,
+    resume: bool = False,
+    budget_seconds: float | None = None,
+):
+    """Fetch (query, site) units on a worker pool while this thread transforms and loads results."""
+    units = [(query, site) for query in queries for site in SCRAPE_SITES]
+    if resume:
+        remaining = [(query, site) for query, site in units if not loader.checkpoint.is_done(query, [site])]
+        print(f"Resume: skipping {len(units) - len(remaining)} completed (query, site) units")
+        units = remaining
+    scrape_units(loader.plan(units, budget_seconds, workers), loader, workers, cache)
+
+
+def scrape_units(
+    units: list[tuple[str, str]],
+    loader: JobLoader,
+    workers: int,
+    cache: ScrapeCache | None = None,
+    on_error=None,
+):
+    """Fetch and load (query, site) units; `on_error(query, site, error)` is told about failed fetches.
+
+    Units with a cached result are loaded first, straight from disk, without
+    taking a rate-limit token or a worker.
+    """
+    cached = [unit for unit in units if cache and cache.has(unit[0], [unit[1]], loader.search_params(unit[0], [unit[1]]))]
+    cached_set = set(cached)
+    pending = [unit for unit in units if unit not in cached_set]
+
+    for query, site in cached:
+        jobs_df = cache.get(query, [site], loader.search_params(query, [site]))
+        load_unit(f"[cached] '{query}' on {site}", query, site, jobs_df, loader)
+
+    if cache and cache.replay:
+        if pending:
+            print(f"  Replay: skipping {len(pending)} (query, site) units with no cached results")
+        return
+
+    def fetch(query: str, site: str):
+        if cache:
+            return cache.fetch(loader.fetch, query, [site], loader.search_params(query, [site]))
+        return loader.fetch(query, [site])
+
+    print(f"Dispatching {len(pending)} (query, site) units to {workers} workers ({len(cached)} cached)")
+    for done, ((query, site), jobs_df, error) in enumerate(run_units(pending, fetch, workers), start=1):
+        prefix = f"[{done}/{len(pending)}] '{query}' on {site}"
+        if error is not None:
+            print(f"  {prefix}: error scraping: {error}")
+            if on_error:
+                on_error(query, site, error)
+            continue
+        load_unit(prefix, query, site, jobs_df, loader)
+
+
+def scrape_queue(
+    work: WorkQueue,
+    loader: JobLoader,
+    workers: int,
+    cache: ScrapeCache | None = None,
+    deadline: float | None = None,
+):
+    """Claim units from the shared queue in small batches until none are left to claim, or the deadline passes."""
+    with work.heartbeating():
+        while (deadline is None or time.monotonic() < deadline) and (units := work.claim(max(1, workers) * 2)):
+            # Done units are reported as the writer flushes their jobs; the rest stay leased
+            scrape_units(units, loader, workers, cache, on_error=work.fail)
+
+
+def run_queue_worker(
+    work: WorkQueue,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    cache: ScrapeCache | None = None,
+    alerts: bool = True,
+    full_sweep: bool = False,
+    budget_seconds: float | None = None,
+):
+    """Queue mode: enqueue every unit of the run, then work the queue alongside the other workers.
+
+    Units are enqueued, and so claimed, in order of expected yield. With a
+    budget, this worker stops claiming once it is spent; units still pending
+    are left for `finalize_queue`.
+    """
+    deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+    print(f"Starting queue worker {work.worker_id} on run '{work.run_id}' at {datetime.now().isoformat()}")
+    report.meta.update({"script": "scrape", "run_id": work.run_id, "worker_id": work.worker_id})
+
+    loader = JobLoader(
+        supabase, chunk_size=chunk_size, checkpoint=work,
+        watermarks=load_watermarks(cache, full_sweep), scheduler=load_scheduler(cache), sink=sink, cache=cache,
+    )
+    work.enqueue(loader.plan([(query, site) for query in SEARCH_QUERIES for site in SCRAPE_SITES]))
+    scrape_queue(work, loader, workers, cache, deadline)
+    loader.finish()
+    if alerts:
+        loader.match_alerts()
+    if cache:
+        print(f"Scrape cache: {cache.hits} hits, {cache.misses} misses")
+        report.count("cache_hits", cache.hits)
+        report.count("cache_misses", cache.misses)
+
+    print(f"\nWorker done! New: {loader.writer.inserted}, Skipped (same-source dupes): {loader.skipped}, Cross-source dupes: {loader.cross_dupes}, Errors: {loader.errors}")
+
+
+def finalize_queue(
+    work: WorkQueue,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    cache: ScrapeCache | None = None,
+    wait_minutes: float = 30,
+    alerts: bool = True,
+    full_sweep: bool = False,
+) -> bool:
+    """Wait for the queue to drain, working any reclaimable units itself, then run cleanup once.
+
+    Pending units (left by budgeted workers) and expired leases (from workers
+    that crashed or timed out) are both finished here. Returns False, without
+    cleanup, if units are still leased after `wait_minutes`.
+    """
+    deadline = time.monotonic() + wait_minutes * 60
+    while True:
+        status = work.status()
+        print(
+            f"Queue '{work.run_id}': {status['done']} done, {status['failed']} failed, "
+            f"{status['pending']} pending, {status['leased']} leased, {status['expired']} expired"
+        )
+        if status["pending"] or status["expired"]:
+            loader = JobLoader(
+                supabase, chunk_size=chunk_size, checkpoint=work,
+                watermarks=load_watermarks(cache, full_sweep), scheduler=load_scheduler(cache), sink=sink, cache=cache,
+            )
+            scrape_queue(work, loader, workers, cache)
+            loader.finish()
+            if alerts:
+                loader.match_alerts()
+            continue
+        if not status["leased"]:
+            break
+        if time.monotonic() > deadline:
+            print(f"Gave up waiting for {status['leased']} leased units; skipping cleanup")
+            return False
+        time.sleep(30)
+
+    totals = status["totals"]
+    print("Deactivating old jobs and updating category counts...")
+    with stage("cleanup"):
+        deactivated, recounted = run_maintenance(supabase, CategoryRegistry(supabase).load())
+    print(f"  Deactivated {deactivated} old jobs, updated {recounted} category counts")
+    print(
+        f"\nRun complete! Found: {totals['found']}, Queued: {totals['queued']}, "
+        f"Skipped (same-source dupes): {totals['skipped']}, Cross-source dupes: {totals['cross_dupes']}, "
+        f"Errors: {totals['errors']}, Failed units: {status['failed']}"
+    )
+    return True
+
+
+def scrape_and_load(
+    batch: int = 0,
+    total_batches: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    cache: ScrapeCache | None = None,
+    run_id: str | None = None,
+    resume: bool = False,
+    alerts: bool = True,
+    full_sweep: bool = False,
+    budget_seconds: float | None = None,
+):
     """Main scraping pipeline."""
-    global _seen_fingerprints
-
     # Split queries into batches for parallel execution
     queries = SEARCH_QUERIES
     if total_batches > 1:
-        chunk_size = len(queries) // total_batches + 1
-        start = batch * chunk_size
-        end = min(start + chunk_size, len(queries))
+        queries_per_batch = len(queries) // total_batches + 1
+        start = batch * queries_per_batch
+        end = min(start + queries_per_batch, len(queries))
         queries = queries[start:end]
         print(f"Batch {batch + 1}/{total_batches}: running queries {start}-{end - 1} ({len(queries)} queries)")
 
     print(f"Starting scrape at {datetime.now().isoformat()}")
-    total_new = 0
-    total_skipped = 0
-    total_cross_dupes = 0
-    total_errors = 0
 
-    for i, query in enumerate(queries):
-        print(f"\nSearching: '{query}' ({i + 1}/{len(queries)})")
-
-        # Randomized throttle between queries to avoid rate limiting
-        if i > 0:
-            delay = random.uniform(3, 10)
-            time.sleep(delay)
-
-        try:
-            jobs_df = scrape_jobs(
-                site_name=["indeed", "linkedin", "glassdoor", "google"],
-                search_term=query,
-                location="remote",
-                results_wanted=80,
-                hours_old=336,  # 14 days
-                is_remote=True,
-                country_indeed="USA",
-            )
-
-            if jobs_df is None or jobs_df.empty:
-                print(f"  No results for '{query}'")
-                continue
-
-            print(f"  Found {len(jobs_df)} results")
-
-            for _, row in jobs_df.iterrows():
-                try:
-                    title = safe_str(row.get("title"))
-                    company_name = safe_str(row.get("company"), "Unknown")
-
-                    if not title or company_name == "Unknown":
-                        continue
-
-                    # Cross-source dedup: skip if we've seen this title+company combo
-                    fingerprint = make_fingerprint(title, company_name)
-                    if fingerprint in _seen_fingerprints:
-                        total_cross_dupes += 1
-                        continue
-                    _seen_fingerprints.add(fingerprint)
-
-                    source = safe_str(row.get("site"), "manual").lower()
-                    if source == "zip_recruiter":
-                        source = "ziprecruiter"
-                    job_id_raw = safe_str(row.get("id"))
-                    source_id = generate_source_id(source, job_id_raw, title, company_name)
-
-                    # Check for existing in DB (same source + source_id)
-                    valid_sources = ["indeed", "linkedin", "glassdoor", "ziprecruiter", "google"]
-                    db_source = source if source in valid_sources else "manual"
-                    existing = (
-                        supabase.table("jobs")
-                        .select("id")
-                        .eq("source", db_source)
-                        .eq("source_id", source_id)
-                        .execute()
-                    )
-                    if existing.data:
-                        total_skipped += 1
-                        continue
-
-                    # Cross-source dedup: check DB for same title+company from ANY source
-                    slug = slugify(f"{title}-{company_name}")[:80]
-                    slug_exists = supabase.table("jobs").select("id").eq("slug", slug).execute()
-                    if slug_exists.data:
-                        total_cross_dupes += 1
-                        continue
-
-                    description = safe_str(row.get("description"))
-                    description_plain = re.sub(r"<[^>]+>", "", description).strip() if description else ""
-
-                    salary_min, salary_max = normalize_salary(
-                        row.get("min_amount"),
-                        row.get("max_amount"),
-                        row.get("interval"),
-                    )
-
-                    # Company info
-                    logo_url = safe_str(row.get("company_logo"))
-                    company_url = safe_str(row.get("company_url"))
-                    company_desc = safe_str(row.get("company_description"))
-                    company_size = safe_str(row.get("company_num_employees"))
-                    company_id = get_or_create_company(company_name, logo_url, company_url, company_desc, company_size)
-
-                    category_slug = classify_category(title)
-                    category_id = get_category_id(category_slug)
-
-                    # Parse date
-                    date_posted = datetime.now().isoformat()
-                    try:
-                        dp = row.get("date_posted")
-                        if dp is not None and safe_str(dp):
-                            date_posted = dp.isoformat() if hasattr(dp, 'isoformat') else str(dp)
-                    except Exception:
-                        pass
-
-                    job_url = safe_str(row.get("job_url_direct")) or safe_str(row.get("job_url"))
-
-                    job_data = {
-                        "title": title,
-                        "slug": slug,
-                        "company_id": company_id,
-                        "description": description[:50000] if description else "",
-                        "description_plain": description_plain[:5000] if description_plain else None,
-                        "category_id": category_id,
-                        "job_type": "full_time",
-                        "experience_level": classify_experience(title, description_plain),
-                        "salary_min": salary_min,
-                        "salary_max": salary_max,
-                        "salary_currency": "USD",
-                        "location_requirements": "Remote",
-                        "is_async_friendly": detect_async_friendly(description),
-                        "visa_sponsorship": detect_visa_sponsorship(description),
-                        "tech_stack": extract_tech_stack(description),
-                        "source": db_source,
-                        "source_id": source_id,
-                        "source_url": safe_str(row.get("job_url")) or None,
-                        "apply_url": job_url or None,
-                        "is_featured": False,
-                        "is_active": True,
-                        "date_posted": date_posted,
-                    }
-
-                    supabase.table("jobs").insert(job_data).execute()
-                    total_new += 1
-
-                    if total_new % 25 == 0:
-                        print(f"    ... {total_new} new jobs inserted")
-
-                except Exception as e:
-                    total_errors += 1
-                    if total_errors <= 10:
-                        print(f"  Error processing job: {e}")
-                    continue
-
-        except Exception as e:
-            print(f"  Error scraping '{query}': {e}")
-            continue
+    # Completed units are always recorded, so any run can be resumed later
+    checkpoint = Checkpoint(supabase, run_id or default_run_id(batch)).load()
+    report.meta.update({"script": "scrape", "run_id": checkpoint.run_id, "batch": batch, "total_batches": total_batches})
+    if resume:
+        print(f"Resuming run '{checkpoint.run_id}': {len(checkpoint.done)} units already completed")
+
+    loader = JobLoader(
+        supabase, chunk_size=chunk_size, checkpoint=checkpoint,
+        watermarks=load_watermarks(cache, full_sweep), scheduler=load_scheduler(cache), sink=sink, cache=cache,
+    )
+    if workers > 1:
+        scrape_concurrent(queries, loader, workers, cache, resume, budget_seconds)
+    else:
+        scrape_sequential(queries, loader, cache, resume, budget_seconds)
+    loader.finish()
+    if alerts:
+        loader.match_alerts()
+    if cache:
+        print(f"Scrape cache: {cache.hits} hits, {cache.misses} misses")
+        report.count("cache_hits", cache.hits)
+        report.count("cache_misses", cache.misses)
 
     # Only run cleanup on the last batch (or single-batch mode)
     is_last_batch = (total_batches == 1) or (batch == total_batches - 1)
     if is_last_batch:
-        # Cleanup: mark old jobs inactive (batched to avoid statement timeout)
-        cutoff = (datetime.now() - timedelta(days=30)).isoformat()
-        print("Deactivating old jobs...")
-        while True:
-            stale = (
-                supabase.table("jobs")
-                .select("id")
-                .eq("is_active", True)
-                .lt("date_posted", cutoff)
-                .limit(500)
-                .execute()
-            )
-            if not stale.data:
-                break
-            stale_ids = [row["id"] for row in stale.data]
-            supabase.table("jobs").update({"is_active": False}).in_("id", stale_ids).execute()
-            print(f"  Deactivated {len(stale_ids)} old jobs")
-
-        # Update category counts
-        categories = supabase.table("categories").select("id, slug").execute()
-        for cat in categories.data:
-            count_result = (
-                supabase.table("jobs")
-                .select("id", count="exact")
-                .eq("category_id", cat["id"])
-                .eq("is_active", True)
-                .execute()
-            )
-            supabase.table("categories").update({"job_count": count_result.count or 0}).eq("id", cat["id"]).execute()
-        print("Cleanup and category counts updated.")
+        print("Deactivating old jobs and updating category counts...")
+        with stage("cleanup"):
+            deactivated, recounted = run_maintenance(supabase, loader.categories)
+        print(f"  Deactivated {deactivated} old jobs, updated {recounted} category counts")
 
-    print(f"\nScrape complete! New: {total_new}, Skipped (same-source dupes): {total_skipped}, Cross-source dupes: {total_cross_dupes}, Errors: {total_errors}")
+    print(f"\nScrape complete! New: {loader.writer.inserted}, Skipped (same-source dupes): {loader.skipped}, Cross-source dupes: {loader.cross_dupes}, Errors: {loader.errors}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--batch", type=int, default=0, help="Batch index (0-based)")
     parser.add_argument("--total-batches", type=int, default=1, help="Total number of batches")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Jobs per upsert request")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent (query, site) fetches; 1 keeps the sequential mode")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory for cached JobSpy result sets (Parquet)")
+    parser.add_argument("--cache-ttl-hours", type=float, default=DEFAULT_TTL_HOURS, help="Reuse cached result sets younger than this")
+    parser.add_argument("--no-cache", action="store_true", help="Always scrape and don't write the result cache")
+    parser.add_argument("--replay", action="store_true", help="Load only cached result sets, whatever their age; never scrape")
+    parser.add_argument("--run-id", help="Checkpoint run id (default: the GitHub Actions run id, or today's date, plus the batch)")
+    parser.add_argument("--resume", action="store_true", help="Skip (query, site) units this run id already completed")
+    parser.add_argument("--queue", action="store_true", help="Claim (query, site) units from the shared work queue instead of a fixed batch")
+    parser.add_argument("--finalize", action="store_true", help="Wait for the work queue to drain, then run cleanup and category counts")
+    parser.add_argument("--finalize-wait-minutes", type=float, default=30, help="How long --finalize waits on units other workers still lease")
+    parser.add_argument("--queue-db", help="Use a local SQLite file as the work queue instead of Supabase")
+    parser.add_argument("--full-sweep", action="store_true", help="Search every unit's full 14-day window instead of since its last scrape")
+    parser.add_argument("--budget-minutes", type=float, help="Scrape the highest-yield units that fit in this many minutes and skip the rest (--finalize always finishes leftover units)")
+    parser.add_argument("--no-alerts", action="store_true", help="Don't match new jobs against job alerts")
+    parser.add_argument(
+        "--sink", choices=["postgrest", "postgres"], default="postgrest",
+        help="Write jobs and companies through PostgREST, or with COPY over a direct connection (SUPABASE_DB_URL)",
+    )
+    parser.add_argument("--report", help="Write a JSON run report (stage timings, Supabase calls, counters) to this path")
+    parser.add_argument("--profile", help="Write cProfile stats for the whole run to this path")
     args = parser.parse_args()
-    scrape_and_load(batch=args.batch, total_batches=args.total_batches)
+    if args.replay and args.no_cache:
+        parser.error("--replay needs the cache")
+    if (args.queue or args.finalize) and (args.replay or args.resume or args.total_batches > 1):
+        parser.error("--queue/--finalize replace --batch/--total-batches, --resume and --replay")
+    connect(sink_kind=args.sink)
+    cache = None if args.no_cache else ScrapeCache(
+        SCRAPE_PARAMS, directory=args.cache_dir, ttl_hours=args.cache_ttl_hours, replay=args.replay
+    )
+    budget_seconds = args.budget_minutes * 60 if args.budget_minutes is not None else None
+    ok = True
+    try:
+        with profiled(args.profile):
+            if args.queue or args.finalize:
+                run_id, worker_id = args.run_id or default_run_id(), default_worker_id()
+                if args.queue_db:
+                    work = SqliteQueue(args.queue_db, run_id, worker_id)
+                else:
+                    work = SupabaseQueue(supabase, run_id, worker_id)
+                if args.queue:
+                    run_queue_worker(
+                        work, chunk_size=args.chunk_size, workers=args.workers, cache=cache,
+                        alerts=not args.no_alerts, full_sweep=args.full_sweep, budget_seconds=budget_seconds,
+                    )
+                if args.finalize:
+                    ok = finalize_queue(
+                        work, chunk_size=args.chunk_size, workers=args.workers, cache=cache,
+                        wait_minutes=args.finalize_wait_minutes, alerts=not args.no_alerts, full_sweep=args.full_sweep,
+                    )
+            else:
+                scrape_and_load(
+                    batch=args.batch,
+                    total_batches=args.total_batches,
+                    chunk_size=args.chunk_size,
+                    workers=args.workers,
+                    cache=cache,
+                    run_id=args.run_id,
+                    resume=args.resume,
+                    alerts=not args.no_alerts,
+                    full_sweep=args.full_sweep,
+                    budget_seconds=budget_seconds,
+                )
+    finally:
+        # Written even when the run fails, so a crashed batch still leaves its timings
+        sink.close()
+        if args.report:
+            report.write(args.report)
+    sys.exit(0 if ok else 1)
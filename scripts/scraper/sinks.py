@@ -0,0 +1,128 @@
+"""
+Bulk write sinks for the scraper and aggregation scripts.
+`PostgrestSink` writes through supabase-py, one JSON HTTP request per chunk.
+`PostgresSink` connects to the database directly (`SUPABASE_DB_URL`), streams
+each chunk with COPY into a temporary staging table and merges it with one
+`INSERT ... ON CONFLICT`, over a connection pool shared by the whole run.
+Both return inserted (or upserted) rows the way PostgREST does, as JSON-style
+dicts, so callers don't care which one they were given. `returning=False`
+tells a sink the caller won't read them.
+"""
+
+import json
+import os
+import time
+
+from instrument import report
+
+# Connections the direct sink keeps open; writers share them across threads
+POOL_SIZE = 4
+
+
+class PostgrestSink:
+    """Writes through the (instrumented) Supabase client."""
+
+    name = "postgrest"
+
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(
+        self, table: str, rows: list[dict], on_conflict: str, ignore_duplicates: bool = False, returning: bool = True
+    ) -> list[dict]:
+        result = self.client.table(table).upsert(rows, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates).execute()
+        return result.data or []
+
+    def insert(self, table: str, rows: list[dict], returning: bool = True) -> list[dict]:
+        result = self.client.table(table).insert(rows).execute()
+        return result.data or []
+
+    def close(self):
+        pass
+
+
+class PostgresSink:
+    """COPY into a staging table, then merge with INSERT ... ON CONFLICT, on pooled direct connections.
+
+    Each call is one transaction, so a failed chunk leaves nothing behind and
+    `db.write_bisect` can split it like a failed PostgREST request.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, pool_size: int = POOL_SIZE):
+        # Only needed for this sink, so PostgREST-only runs don't need psycopg installed
+        from psycopg_pool import ConnectionPool
+
+        self.pool = ConnectionPool(dsn, min_size=1, max_size=pool_size, open=True)
+
+    def upsert(
+        self, table: str, rows: list[dict], on_conflict: str, ignore_duplicates: bool = False, returning: bool = True
+    ) -> list[dict]:
+        keys = _quoted([k.strip() for k in on_conflict.split(",")])
+        columns = _columns(rows)
+        # ON CONFLICT can't touch a row twice in one statement (PostgREST fails the request);
+        # keep one staged row per key. Callers don't repeat keys, so which one is moot.
+        select = f"SELECT DISTINCT ON ({', '.join(keys)}) {', '.join(_quoted(columns))} FROM staged"
+        if ignore_duplicates:
+            # Skip keys already stored before they reach the insert: ON CONFLICT alone
+            # still computes defaults and generated columns (jobs.fts) for every row
+            target = ", ".join(f"t.{k}" for k in keys)
+            source = ", ".join(f"staged.{k}" for k in keys)
+            select += f' WHERE NOT EXISTS (SELECT 1 FROM "{table}" t WHERE ({target}) = ({source}))'
+            action = "DO NOTHING"
+        else:
+            updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in _quoted(columns) if c not in keys)
+            action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        # The anti-join above only sees committed rows; ON CONFLICT covers concurrent writers
+        return self._merge(table, rows, columns, f"{select} ON CONFLICT ({', '.join(keys)}) {action}", returning, "upsert")
+
+    def insert(self, table: str, rows: list[dict], returning: bool = True) -> list[dict]:
+        columns = _columns(rows)
+        return self._merge(table, rows, columns, f"SELECT {', '.join(_quoted(columns))} FROM staged", returning, "insert")
+
+    def _merge(self, table: str, rows: list[dict], columns: list[str], select: str, returning: bool, verb: str) -> list[dict]:
+        if not rows:
+            return []
+        cols = ", ".join(_quoted(columns))
+        insert = f'INSERT INTO "{table}" ({cols}) {select}'
+        start = time.perf_counter()
+        failed = True
+        result: list[dict] = []
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                # Same column types as the target, no constraints or defaults; dropped at commit
+                cur.execute(f'CREATE TEMP TABLE staged ON COMMIT DROP AS SELECT {cols} FROM "{table}" WITH NO DATA')
+                # Untyped text COPY: values are parsed server-side, as PostgREST parses JSON
+                with cur.copy(f"COPY staged ({cols}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row([row.get(c) for c in columns])
+                if returning:
+                    # Rendered by the server the way PostgREST does, and much faster than converting rows here
+                    cur.execute(f"WITH merged AS ({insert} RETURNING *) SELECT coalesce(json_agg(merged), '[]')::text FROM merged")
+                    result = json.loads(cur.fetchone()[0])
+                else:
+                    cur.execute(insert)
+            failed = False
+            return result
+        finally:
+            report.record_request(f"pg.{table}.{verb}", time.perf_counter() - start, len(result), failed)
+
+    def close(self):
+        self.pool.close()
+
+
+def _columns(rows: list[dict]) -> list[str]:
+    """Union of row keys in first-seen order; rows missing a key write NULL, as PostgREST's bulk insert does."""
+    return list(dict.fromkeys(k for row in rows for k in row))
+
+
+def _quoted(names: list[str]) -> list[str]:
+    return [f'"{n}"' for n in names]
+
+
+def create_sink(kind: str, client):
+    """The sink for `--sink`: 'postgrest' over `client`, or 'postgres' on SUPABASE_DB_URL."""
+    if kind == "postgres":
+        return PostgresSink(os.environ["SUPABASE_DB_URL"])
+    return PostgrestSink(client)
@@ -0,0 +1,72 @@
+"""
+Job title normalization shared by the scraper and the aggregation pipeline.
+Titles are normalized once at ingest and stored in `jobs.normalized_title`;
+aggregation falls back to `normalize_title` for rows that predate the column.
+"""
+
+import re
+from functools import lru_cache
+
+# Normalized role titles mapped from common title patterns
+ROLE_NORMALIZATIONS = {
+    "software engineer": [r"software engineer", r"software developer", r"swe\b"],
+    "frontend engineer": [r"frontend", r"front-end", r"front end", r"react developer", r"react engineer"],
+    "backend engineer": [r"backend", r"back-end", r"back end"],
+    "full stack engineer": [r"full.?stack", r"fullstack"],
+    "devops engineer": [r"devops", r"dev ops", r"site reliability", r"sre\b", r"platform engineer"],
+    "data scientist": [r"data scientist"],
+    "data engineer": [r"data engineer"],
+    "data analyst": [r"data analyst", r"business analyst", r"bi analyst"],
+    "machine learning engineer": [r"machine learning", r"ml engineer", r"ai engineer"],
+    "product manager": [r"product manager", r"product owner"],
+    "product designer": [r"product designer"],
+    "ux designer": [r"ux designer", r"ux researcher", r"user experience"],
+    "ui designer": [r"ui designer", r"visual designer"],
+    "marketing manager": [r"marketing manager", r"growth manager", r"head of marketing"],
+    "content writer": [r"content writer", r"copywriter", r"technical writer"],
+    "customer success": [r"customer success", r"customer support", r"account manager"],
+    "engineering manager": [r"engineering manager", r"eng manager", r"tech lead"],
+    "cloud engineer": [r"cloud engineer", r"aws engineer", r"gcp engineer", r"azure engineer"],
+    "qa engineer": [r"qa engineer", r"quality assurance", r"test engineer", r"sdet"],
+    "security engineer": [r"security engineer", r"infosec", r"cybersecurity"],
+}
+
+
+def _compile_roles(roles: dict[str, list[str]]) -> tuple[re.Pattern, dict[str, str]]:
+    """One anchored regex with a lookahead branch per role, tried in dict order.
+
+    A plain alternation would return whichever role matches leftmost in the
+    title; the lookahead branches keep "first role with any match wins".
+    """
+    group_roles = {f"r{i}": role for i, role in enumerate(roles)}
+    branches = [
+        f"(?=.*?(?:{'|'.join(roles[role])}))(?P<{name}>)"
+        for name, role in group_roles.items()
+    ]
+    return re.compile(f"^(?:{'|'.join(branches)})", re.DOTALL), group_roles
+
+
+ROLE_PATTERN, ROLE_GROUPS = _compile_roles(ROLE_NORMALIZATIONS)
+
+
+@lru_cache(maxsize=8192)
+def _normalize_lower(title_lower: str) -> str | None:
+    match = ROLE_PATTERN.match(title_lower)
+    return ROLE_GROUPS[match.lastgroup] if match else None
+
+
+def normalize_title(title: str | None) -> str | None:
+    """Map a job title to a normalized role name."""
+    if not title:
+        return None
+    return _normalize_lower(title.lower())
+
+
+def normalize_title_reference(title: str) -> str | None:
+    """The original per-pattern `re.search` loop, kept as the reference for `bench.py titles`."""
+    title_lower = title.lower()
+    for normalized, patterns in ROLE_NORMALIZATIONS.items():
+        for pattern in patterns:
+            if re.search(pattern, title_lower):
+                return normalized
+    return None
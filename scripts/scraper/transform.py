@@ -0,0 +1,414 @@
+"""
+Transform stage for the scraper.
+Turns JobSpy result DataFrames into job records ready for dedup and loading.
+`transform_frame` is the column-wise hot path; the per-row helpers remain the
+reference implementation it must match (see `bench.py transform`).
+"""
+
+import hashlib
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from keywords import KeywordMatcher
+from titles import normalize_title
+
+TECH_KEYWORDS = [
+    "React", "Next.js", "Vue", "Angular", "Svelte",
+    "Node.js", "Express", "Django", "Flask", "FastAPI",
+    "Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "C#", "Ruby",
+    "PostgreSQL", "MySQL", "MongoDB", "Redis", "Elasticsearch",
+    "AWS", "GCP", "Azure", "Docker", "Kubernetes", "Terraform",
+    "GraphQL", "REST", "gRPC",
+    "TensorFlow", "PyTorch", "Pandas", "Spark",
+    "Figma", "Sketch", "Adobe XD",
+    "Git", "CI/CD", "Jenkins", "GitHub Actions",
+    "Tailwind CSS", "SASS", "CSS",
+    "Linux", "Nginx", "Apache",
+    "Kafka", "RabbitMQ", "Celery",
+    "Snowflake", "BigQuery", "Redshift",
+]
+
+CATEGORY_MAP = {
+    "engineering": ["engineer", "developer", "devops", "sre", "architect", "programmer", "cto", "sysadmin", "qa"],
+    "design": ["designer", "ux", "ui", "creative director", "illustrator", "design lead", "art director"],
+    "marketing": ["marketing", "seo", "growth", "social media", "brand manager", "brand management", "demand gen", "paid media"],
+    "product": [
+        "product manager", "product management", "product owner", "product lead", "product director",
+        "program manager", "program management",
+    ],
+    "support": ["customer support", "customer success", "account manager", "account management", "customer service", "helpdesk", "help desk"],
+    "writing": ["writer", "copywriter", "technical writer", "content strategist", "content manager", "editor", "editorial"],
+    "data": [
+        "data engineer", "data engineering", "data scientist", "data analyst", "machine learning", "ml engineer",
+        "ml engineering", "ai engineer", "ai engineering", "analytics engineer", "analytics engineering",
+        "bi analyst", "business intelligence",
+    ],
+    "education": ["teacher", "tutor", "tutoring", "instructor", "professor", "curriculum", "teaching", "academic"],
+}
+
+EXPERIENCE_MAP = {
+    "junior": ["junior", "entry level", "associate", "intern", "internship", "jr", "early career"],
+    "mid": ["mid", "intermediate"],
+    "senior": ["senior", "sr", "staff", "principal"],
+    "lead": ["lead", "manager", "head of", "director", "vp"],
+    "executive": ["cto", "ceo", "cfo", "coo", "c-level", "executive", "chief"],
+}
+
+
+def safe_str(val, default="") -> str:
+    """Safely convert a value to string, handling NaN/None."""
+    if val is None:
+        return default
+    s = str(val)
+    if s in ("nan", "None", "NaT", ""):
+        return default
+    return s.strip()
+
+
+def slugify(text: str) -> str:
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s-]", "", text)
+    text = re.sub(r"[\s_]+", "-", text)
+    text = re.sub(r"^-+|-+$", "", text)
+    return text
+
+
+# Priority order matters — check more specific categories first
+CATEGORY_PRIORITY = ["data", "product", "education", "writing", "support", "design", "marketing", "engineering"]
+
+VISA_KEYWORDS = ["visa sponsor", "visa sponsorship", "work permit", "relocation"]
+
+ASYNC_KEYWORDS = ["async", "asynchronous", "flexible hours", "flexible schedule", "any timezone"]
+
+TECH_ALIASES = {"Go": ["Golang"]}
+
+# Tech names that are also everyday words only count with their exact casing
+CASE_SENSITIVE_KEYWORDS = {"Go", "REST", "Express", "Spark", "Sketch"}
+# ...and these also open ordinary sentences ("Go above and beyond", "Express interest"),
+# so there they need a list or another tech keyword around them
+SENTENCE_VERB_KEYWORDS = {"Go", "Express", "Spark", "Sketch"}
+
+SIGNAL_MATCHER = KeywordMatcher(
+    {
+        **{("tech", tech): [tech, *TECH_ALIASES.get(tech, [])] for tech in TECH_KEYWORDS},
+        ("flag", "visa"): VISA_KEYWORDS,
+        ("flag", "async"): ASYNC_KEYWORDS,
+    },
+    case_sensitive=CASE_SENSITIVE_KEYWORDS,
+    sentence_verbs=SENTENCE_VERB_KEYWORDS,
+)
+
+EXPERIENCE_MATCHER = KeywordMatcher(EXPERIENCE_MAP)
+
+# Tech stacks are reported in TECH_KEYWORDS order
+TECH_RANK = {tech: i for i, tech in enumerate(TECH_KEYWORDS)}
+
+CATEGORY_MATCHER = KeywordMatcher(CATEGORY_MAP)
+
+
+def extract_signals(title: str, description: str) -> dict:
+    """Scan a plain-text description once for every keyword-driven field.
+
+    Tech stack and visa/async flags come from the whole description; the
+    experience level looks at the title plus the first 500 characters.
+    """
+    body = SIGNAL_MATCHER.match_labels(description)
+    levels = EXPERIENCE_MATCHER.match_labels(f"{title} {description[:500]}")
+    return {
+        "tech_stack": sorted((v for kind, v in body if kind == "tech"), key=TECH_RANK.__getitem__)[:10],
+        "visa_sponsorship": ("flag", "visa") in body,
+        "is_async_friendly": ("flag", "async") in body,
+        "experience_level": next((level for level in EXPERIENCE_MAP if level in levels), "mid"),
+    }
+
+
+def extract_tech_stack(text: str) -> list[str]:
+    found = SIGNAL_MATCHER.match_labels(text)
+    return sorted((v for kind, v in found if kind == "tech"), key=TECH_RANK.__getitem__)[:10]
+
+
+def classify_category(title: str) -> str:
+    found = CATEGORY_MATCHER.match_labels(title)
+    return next((category for category in CATEGORY_PRIORITY if category in found), "engineering")
+
+
+def classify_experience(title: str, description: str = "") -> str:
+    return extract_signals(title, description[:500])["experience_level"]
+
+
+def normalize_salary(min_val, max_val, interval) -> tuple[int | None, int | None]:
+    """Normalize salary to annual USD."""
+    try:
+        min_f = float(min_val) if min_val and safe_str(min_val) else None
+        max_f = float(max_val) if max_val and safe_str(max_val) else None
+    except (ValueError, TypeError):
+        return None, None
+
+    if min_f is None and max_f is None:
+        return None, None
+
+    multiplier = 1
+    interval_str = safe_str(interval).lower()
+    if "hour" in interval_str:
+        multiplier = 2080
+    elif "month" in interval_str:
+        multiplier = 12
+
+    sal_min = int(min_f * multiplier) if min_f else None
+    sal_max = int(max_f * multiplier) if max_f else None
+
+    # Sanity check: skip if < $10k or > $1M annual
+    if sal_min and (sal_min < 10000 or sal_min > 1000000):
+        sal_min = None
+    if sal_max and (sal_max < 10000 or sal_max > 1000000):
+        sal_max = None
+
+    return sal_min, sal_max
+
+
+def detect_visa_sponsorship(text: str) -> bool:
+    return ("flag", "visa") in SIGNAL_MATCHER.match_labels(text)
+
+
+def detect_async_friendly(text: str) -> bool:
+    return ("flag", "async") in SIGNAL_MATCHER.match_labels(text)
+
+
+def generate_source_id(source: str, job_id: str, title: str, company: str) -> str:
+    """Generate a unique source ID for deduplication."""
+    if job_id and safe_str(job_id):
+        return safe_str(job_id)[:64]
+    raw = f"{source}:{title}:{company}".lower()
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+def make_fingerprint(title: str, company: str) -> str:
+    """Generate a cross-source fingerprint for deduplication across job boards."""
+    normalized = re.sub(r"[^a-z0-9]", "", f"{title}{company}".lower())
+    return hashlib.md5(normalized.encode()).hexdigest()[:20]
+
+
+VALID_SOURCES = ["indeed", "linkedin", "glassdoor", "ziprecruiter", "google"]
+
+
+def job_identity(row) -> tuple[str, str, str, str, str] | None:
+    """Derive (title, company, db_source, source_id, slug) for a scraped row, or None if unusable."""
+    title = safe_str(row.get("title"))
+    company_name = safe_str(row.get("company"), "Unknown")
+    if not title or company_name == "Unknown":
+        return None
+
+    source = safe_str(row.get("site"), "manual").lower()
+    if source == "zip_recruiter":
+        source = "ziprecruiter"
+    source_id = generate_source_id(source, safe_str(row.get("id")), title, company_name)
+    db_source = source if source in VALID_SOURCES else "manual"
+    slug = slugify(f"{title}-{company_name}")[:80]
+    return title, company_name, db_source, source_id, slug
+
+
+def parse_date_posted(dp, now: str) -> str:
+    """ISO date for a JobSpy date_posted value, falling back to `now`."""
+    try:
+        if dp is not None and safe_str(dp):
+            return dp.isoformat() if hasattr(dp, "isoformat") else str(dp)
+    except Exception:
+        pass
+    return now
+
+
+def transform_row(row, now: str | None = None) -> dict | None:
+    """Turn one JobSpy row into a job record, or None if it lacks a title or company."""
+    identity = job_identity(row)
+    if identity is None:
+        return None
+    title, company_name, db_source, source_id, slug = identity
+    now = now or datetime.now().isoformat()
+
+    description = safe_str(row.get("description"))
+    description_plain = re.sub(r"<[^>]+>", "", description).strip() if description else ""
+
+    salary_min, salary_max = normalize_salary(
+        row.get("min_amount"),
+        row.get("max_amount"),
+        row.get("interval"),
+    )
+    source_url = safe_str(row.get("job_url"))
+    job_url = safe_str(row.get("job_url_direct")) or source_url
+    signals = extract_signals(title, description_plain)
+
+    return {
+        "title": title,
+        "company": company_name,
+        "source": db_source,
+        "source_id": source_id,
+        "slug": slug,
+        "normalized_title": normalize_title(title),
+        "fingerprint": make_fingerprint(title, company_name),
+        "description": description[:50000],
+        "description_plain": description_plain[:5000] or None,
+        "category_slug": classify_category(title),
+        "experience_level": signals["experience_level"],
+        "salary_min": salary_min,
+        "salary_max": salary_max,
+        "is_async_friendly": signals["is_async_friendly"],
+        "visa_sponsorship": signals["visa_sponsorship"],
+        "tech_stack": signals["tech_stack"],
+        "source_url": source_url or None,
+        "apply_url": job_url or None,
+        "date_posted": parse_date_posted(row.get("date_posted"), now),
+        "company_logo": safe_str(row.get("company_logo")),
+        "company_url": safe_str(row.get("company_url")),
+        "company_description": safe_str(row.get("company_description")),
+        "company_size": safe_str(row.get("company_num_employees")),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Column-wise transform
+# ---------------------------------------------------------------------------
+
+RECORD_COLUMNS = [
+    "title", "company", "source", "source_id", "slug", "normalized_title", "fingerprint",
+    "description", "description_plain", "category_slug", "experience_level",
+    "salary_min", "salary_max", "is_async_friendly", "visa_sponsorship", "tech_stack",
+    "source_url", "apply_url", "date_posted",
+    "company_logo", "company_url", "company_description", "company_size",
+]
+
+NULL_STRINGS = ["nan", "None", "NaT", ""]
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def safe_str_series(col: pd.Series, default: str = "") -> pd.Series:
+    """Column-wise `safe_str`."""
+    s = col.astype(object).astype(str)
+    missing = s.isin(NULL_STRINGS)
+    return s.str.strip().mask(missing, default)
+
+
+def _none_if_empty(s: pd.Series) -> pd.Series:
+    return s.where(s != "", None)
+
+
+def slugify_series(s: pd.Series) -> pd.Series:
+    """Column-wise `slugify`."""
+    return (
+        s.str.lower()
+        .str.strip()
+        .str.replace(r"[^\w\s-]", "", regex=True)
+        .str.replace(r"[\s_]+", "-", regex=True)
+        .str.replace(r"^-+|-+$", "", regex=True)
+    )
+
+
+def _md5_prefixes(values, length: int) -> list[str]:
+    md5 = hashlib.md5
+    return [md5(v.encode()).hexdigest()[:length] for v in values]
+
+
+def _salary_amounts(col: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Parse salary amounts; returns (values with NaN for missing/zero, unparseable mask)."""
+    present = (safe_str_series(col) != "").to_numpy()
+    values = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float)
+    unparseable = present & np.isnan(values)
+    values = np.where(present & (values != 0), values, np.nan)
+    return values, unparseable
+
+
+def normalize_salary_columns(min_col: pd.Series, max_col: pd.Series, interval_col: pd.Series) -> tuple[list, list]:
+    """Column-wise `normalize_salary`: annual USD ints or None."""
+    mins, min_bad = _salary_amounts(min_col)
+    maxs, max_bad = _salary_amounts(max_col)
+    # normalize_salary drops both bounds when either fails to parse
+    bad = min_bad | max_bad
+
+    interval = safe_str_series(interval_col).str.lower()
+    multiplier = np.where(
+        interval.str.contains("hour", regex=False).to_numpy(), 2080,
+        np.where(interval.str.contains("month", regex=False).to_numpy(), 12, 1),
+    )
+
+    def annualize(values: np.ndarray) -> list:
+        annual = np.trunc(values * multiplier)
+        # Sanity check: skip if < $10k or > $1M annual
+        out_of_range = (annual != 0) & ((annual < 10000) | (annual > 1000000))
+        annual[out_of_range | bad] = np.nan
+        return [None if np.isnan(v) else int(v) for v in annual]
+
+    return annualize(mins), annualize(maxs)
+
+
+def transform_frame(jobs_df: pd.DataFrame, now: str | None = None) -> pd.DataFrame:
+    """Column-wise equivalent of applying `transform_row` to every row of a JobSpy frame."""
+    now = now or datetime.now().isoformat()
+
+    titles = safe_str_series(_column(jobs_df, "title"))
+    companies = safe_str_series(_column(jobs_df, "company"), "Unknown")
+    keep = ((titles != "") & (companies != "Unknown")).to_numpy()
+    df = jobs_df[keep]
+    titles, companies = titles[keep], companies[keep]
+    if df.empty:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+
+    source = safe_str_series(_column(df, "site"), "manual").str.lower().replace("zip_recruiter", "ziprecruiter")
+    db_source = source.where(source.isin(VALID_SOURCES), "manual")
+
+    job_ids = safe_str_series(_column(df, "id"))
+    has_id = job_ids != ""
+    source_ids = job_ids.str.slice(0, 64)
+    raw = (source + ":" + titles + ":" + companies).str.lower()
+    source_ids[~has_id] = _md5_prefixes(raw[~has_id], 16)
+
+    fingerprints = _md5_prefixes((titles + companies).str.lower().str.replace(r"[^a-z0-9]", "", regex=True), 20)
+
+    description = safe_str_series(_column(df, "description"))
+    description_plain = description.str.replace(r"<[^>]+>", "", regex=True).str.strip()
+
+    salary_min, salary_max = normalize_salary_columns(
+        _column(df, "min_amount"), _column(df, "max_amount"), _column(df, "interval")
+    )
+
+    # One compiled keyword scan per job covers tech stack, flags and experience
+    signals = pd.DataFrame(
+        [extract_signals(t, d) for t, d in zip(titles, description_plain)], index=df.index
+    )
+
+    source_url = safe_str_series(_column(df, "job_url"))
+    direct_url = safe_str_series(_column(df, "job_url_direct"))
+    apply_url = direct_url.where(direct_url != "", source_url)
+
+    records = pd.DataFrame({
+        "title": titles,
+        "company": companies,
+        "source": db_source,
+        "source_id": source_ids,
+        "slug": slugify_series(titles + "-" + companies).str.slice(0, 80),
+        "normalized_title": [normalize_title(t) for t in titles],
+        "fingerprint": fingerprints,
+        "description": description.str.slice(0, 50000),
+        "description_plain": description_plain.str.slice(0, 5000).pipe(_none_if_empty),
+        "category_slug": [classify_category(t) for t in titles],
+        "experience_level": signals["experience_level"],
+        "salary_min": pd.Series(salary_min, index=df.index, dtype=object),
+        "salary_max": pd.Series(salary_max, index=df.index, dtype=object),
+        "is_async_friendly": signals["is_async_friendly"],
+        "visa_sponsorship": signals["visa_sponsorship"],
+        "tech_stack": signals["tech_stack"],
+        "source_url": source_url.pipe(_none_if_empty),
+        "apply_url": apply_url.pipe(_none_if_empty),
+        "date_posted": [parse_date_posted(dp, now) for dp in _column(df, "date_posted")],
+        "company_logo": safe_str_series(_column(df, "company_logo")),
+        "company_url": safe_str_series(_column(df, "company_url")),
+        "company_description": safe_str_series(_column(df, "company_description")),
+        "company_size": safe_str_series(_column(df, "company_num_employees")),
+    }, index=df.index)
+    return records.reset_index(drop=True)
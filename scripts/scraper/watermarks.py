@@ -0,0 +1,111 @@
+"""
+Incremental scrape windows.
+Each (query, site) records when it was last scraped successfully in
+`scrape_watermarks`, and the next run asks JobSpy only for postings since
+then plus a safety margin, instead of the full 14 days every 6 hours. Each
+unit still gets a full-window sweep every few days to catch postings boards
+index late.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+from db import iter_rows
+
+# The widest window ever requested: JobSpy's hours_old for a full sweep
+FULL_WINDOW_HOURS = 336  # 14 days
+# Added to the time since the last scrape. Covers cron jitter and postings boards
+# index up to a day late (Indeed filters by whole days anyway).
+SAFETY_MARGIN_HOURS = 24
+# Windows are rounded up to whole steps, so a rerun soon after an aborted run
+# asks for the same window and can reuse its cached results
+WINDOW_STEP_HOURS = 6
+# Each unit falls back to a full-window sweep this often
+FULL_SWEEP_INTERVAL_HOURS = 7 * 24
+
+
+class ScrapeWatermarks:
+    """Per-(query, site) scrape windows for one run.
+
+    Like checkpoints, a unit's watermark only advances once its jobs are
+    written (`commit()` runs on each writer flush), so a unit that fails or is
+    killed mid-run is scraped over the same window next time.
+    """
+
+    def __init__(self, client, started_at: datetime | None = None, full_sweep: bool = False):
+        self.client = client
+        # Units advance to the run's start, not the end: postings that appear mid-run fall in the next window
+        self.started_at = started_at or datetime.now(timezone.utc)
+        self.full_sweep = full_sweep
+        # (query, site) -> (scraped_through, full_sweep_at)
+        self.marks: dict[tuple[str, str], tuple[datetime, datetime | None]] = {}
+        # (query, site) -> whether this run's window was a full sweep
+        self.windows: dict[tuple[str, str], bool] = {}
+        self.pending: dict[tuple[str, str], dict] = {}
+
+    def load(self) -> "ScrapeWatermarks":
+        for row in iter_rows(self.client, "scrape_watermarks", "id, query, site, scraped_through, full_sweep_at"):
+            self.marks[(row["query"], row["site"])] = (
+                datetime.fromisoformat(row["scraped_through"]),
+                datetime.fromisoformat(row["full_sweep_at"]) if row.get("full_sweep_at") else None,
+            )
+        print(f"Scrape watermarks loaded: {len(self.marks)} (query, site) units")
+        return self
+
+    def _hours(self, query: str, site: str) -> int:
+        mark = self.marks.get((query, site))
+        if self.full_sweep or mark is None or mark[1] is None:
+            return FULL_WINDOW_HOURS
+        if self.started_at - mark[1] >= timedelta(hours=FULL_SWEEP_INTERVAL_HOURS):
+            return FULL_WINDOW_HOURS
+        elapsed = max((self.started_at - mark[0]).total_seconds() / 3600, 0)
+        hours = math.ceil((elapsed + SAFETY_MARGIN_HOURS) / WINDOW_STEP_HOURS) * WINDOW_STEP_HOURS
+        return min(hours, FULL_WINDOW_HOURS)
+
+    def hours_old(self, query: str, sites: list[str]) -> int:
+        """JobSpy `hours_old` for a fetch of `query` on these sites: the widest window any of them needs."""
+        hours = max(self._hours(query, site) for site in sites)
+        for site in sites:
+            self.windows[(query, site)] = hours >= FULL_WINDOW_HOURS
+        return hours
+
+    def advance(self, query: str, sites: list[str], fetched_at: datetime | None = None):
+        """Mark sites of a loaded unit scraped through the run's start; persisted by `commit()`.
+
+        Results cached before the run (`fetched_at`) only count through when
+        they were fetched, both as the watermark and as a full sweep.
+        """
+        through = min(fetched_at, self.started_at) if fetched_at else self.started_at
+        for site in sites:
+            previous = self.marks.get((query, site))
+            full_sweep_at = previous[1].isoformat() if previous and previous[1] else None
+            if self.windows.get((query, site)):
+                full_sweep_at = through.isoformat()
+            self.pending[(query, site)] = {
+                "query": query,
+                "site": site,
+                "scraped_through": through.isoformat(),
+                "full_sweep_at": full_sweep_at,
+            }
+
+    def commit(self):
+        """Persist watermarks advanced so far; call after their jobs are written."""
+        if not self.pending:
+            return
+        rows, self.pending = list(self.pending.values()), {}
+        try:
+            self.client.table("scrape_watermarks").upsert(rows, on_conflict="query,site").execute()
+        except Exception as e:
+            # Best effort: a lost watermark only means the unit's next window is wider
+            print(f"  Could not save {len(rows)} scrape watermarks: {e}")
+            return
+        for row in rows:
+            self.marks[(row["query"], row["site"])] = (
+                datetime.fromisoformat(row["scraped_through"]),
+                datetime.fromisoformat(row["full_sweep_at"]) if row["full_sweep_at"] else None,
+            )
+
+    def summary(self) -> tuple[int, int]:
+        """(full sweeps, incremental windows) requested so far."""
+        full = sum(self.windows.values())
+        return full, len(self.windows) - full
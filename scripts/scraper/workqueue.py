@@ -0,0 +1,308 @@
+"""
+Shared work queue for scraper workers (`scrape.py --queue`).
+Every worker enqueues the run's (query, site) units idempotently, then claims
+them in small batches under a lease that a heartbeat thread keeps extending.
+A unit whose worker dies is reclaimed once its lease expires; `--finalize`
+runs cleanup only after every unit is done or has failed for good.
+
+`SupabaseQueue` is backed by the `scrape_queue` table and its RPCs (migration
+012); `SqliteQueue` implements the same protocol on a local SQLite file so
+several workers can be exercised on one machine.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from checkpoint import RETENTION_DAYS
+from db import iter_rows
+
+# A claimed unit is given back to the queue if not completed or extended within this window
+LEASE_SECONDS = 600
+HEARTBEAT_SECONDS = 120
+# Claims per unit before it is marked failed
+MAX_ATTEMPTS = 3
+
+COUNTERS = ("found", "queued", "skipped", "cross_dupes", "errors")
+
+
+def default_worker_id(batch: int | None = None) -> str:
+    suffix = f"-batch{batch}" if batch is not None else ""
+    return f"{socket.gethostname()}-{os.getpid()}{suffix}"
+
+
+class WorkQueue:
+    """Claim/complete bookkeeping shared by the queue backends.
+
+    Mirrors `checkpoint.Checkpoint`: units are marked complete once loaded and
+    only reported done by `commit()`, after the writer has flushed their jobs.
+    Until then they stay leased and keep being heartbeated.
+    """
+
+    def __init__(self, run_id: str, worker_id: str, lease_seconds: int = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.run_id = run_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # (query, site) -> claimed row, for units this worker holds a lease on
+        self.held: dict[tuple[str, str], dict] = {}
+        self.pending: list[dict] = []
+        self.lock = threading.Lock()
+
+    def enqueue(self, units: list[tuple[str, str]]):
+        """Add the run's units; units already queued (by this or another worker) are left alone."""
+        self._enqueue(units)
+
+    def claim(self, limit: int) -> list[tuple[str, str]]:
+        """Lease up to `limit` claimable units; an empty list means nothing is left to claim."""
+        rows = self._claim(limit)
+        with self.lock:
+            for row in rows:
+                self.held[(row["query"], row["site"])] = row
+        return [(row["query"], row["site"]) for row in rows]
+
+    def complete(self, query: str, sites: list[str], counts: dict):
+        for site in sites:
+            row = self.held.get((query, site))
+            if row:
+                self.pending.append({"id": row["id"], **{k: counts.get(k, 0) for k in COUNTERS}})
+
+    def commit(self):
+        """Report units marked complete so far as done; call after their jobs are written."""
+        if not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        try:
+            self._complete(rows)
+        except Exception as e:
+            # The leases lapse and another worker redoes these units
+            print(f"  Could not mark {len(rows)} queue units done: {e}")
+        done = {row["id"] for row in rows}
+        with self.lock:
+            self.held = {unit: row for unit, row in self.held.items() if row["id"] not in done}
+
+    def fail(self, query: str, site: str, error: Exception):
+        """Give a unit back for retry, or mark it failed once it has used up its attempts."""
+        with self.lock:
+            row = self.held.pop((query, site), None)
+        if row:
+            final = row["attempts"] >= self.max_attempts
+            self._fail(row["id"], "failed" if final else "pending", str(error)[:500])
+
+    def heartbeat(self):
+        with self.lock:
+            ids = [row["id"] for row in self.held.values()]
+        if ids:
+            self._heartbeat(ids)
+
+    @contextmanager
+    def heartbeating(self, interval: float = HEARTBEAT_SECONDS):
+        """Extend this worker's leases from a background thread while the block runs."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f"  Queue heartbeat failed: {e}")
+
+        thread = threading.Thread(target=beat, name="queue-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+    def status(self) -> dict:
+        """Unit counts by state ("expired" = leased past its lease) and summed counters of done units."""
+        now = datetime.now().astimezone()
+        status = dict.fromkeys(("pending", "leased", "expired", "done", "failed"), 0)
+        totals = dict.fromkeys(COUNTERS, 0)
+        for row in self._rows():
+            state = row["status"]
+            if state == "leased" and self._expires(row) <= now:
+                state = "expired"
+            status[state] += 1
+            if state == "done":
+                for k in COUNTERS:
+                    totals[k] += row[k] or 0
+        return {**status, "totals": totals}
+
+
+class SupabaseQueue(WorkQueue):
+    """Work queue in the `scrape_queue` table; claims and heartbeats use database time."""
+
+    def __init__(self, client, run_id: str, worker_id: str, **kwargs):
+        super().__init__(run_id, worker_id, **kwargs)
+        self.client = client
+
+    def _enqueue(self, units):
+        cutoff = (datetime.now() - timedelta(days=RETENTION_DAYS)).isoformat()
+        self.client.table("scrape_queue").delete().lt("created_at", cutoff).execute()
+        rows = [{"run_id": self.run_id, "query": query, "site": site} for query, site in units]
+        self.client.table("scrape_queue").upsert(rows, on_conflict="run_id,query,site", ignore_duplicates=True).execute()
+
+    def _claim(self, limit):
+        result = self.client.rpc("claim_scrape_units", {
+            "p_run_id": self.run_id,
+            "p_worker": self.worker_id,
+            "p_limit": limit,
+            "p_lease_seconds": self.lease_seconds,
+            "p_max_attempts": self.max_attempts,
+        }).execute()
+        return result.data or []
+
+    def _heartbeat(self, ids):
+        self.client.rpc("heartbeat_scrape_units", {
+            "p_worker": self.worker_id,
+            "p_ids": ids,
+            "p_lease_seconds": self.lease_seconds,
+        }).execute()
+
+    def _complete(self, rows):
+        self.client.rpc("complete_scrape_units", {"p_worker": self.worker_id, "p_units": rows}).execute()
+
+    def _fail(self, unit_id, status, error):
+        (
+            self.client.table("scrape_queue")
+            .update({"status": status, "leased_by": None, "lease_expires_at": None, "last_error": error})
+            .eq("id", unit_id)
+            .eq("leased_by", self.worker_id)
+            .execute()
+        )
+
+    def _rows(self):
+        # Paged: a run can queue more units than PostgREST returns in one response
+        return iter_rows(
+            self.client,
+            "scrape_queue",
+            ", ".join(("id", "status", "lease_expires_at", *COUNTERS)),
+            lambda q: q.eq("run_id", self.run_id),
+        )
+
+    @staticmethod
+    def _expires(row):
+        return datetime.fromisoformat(row["lease_expires_at"])
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_queue (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_id TEXT NOT NULL,
+  query TEXT NOT NULL,
+  site TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  leased_by TEXT,
+  lease_expires_at REAL,
+  last_error TEXT,
+  found INTEGER NOT NULL DEFAULT 0,
+  queued INTEGER NOT NULL DEFAULT 0,
+  skipped INTEGER NOT NULL DEFAULT 0,
+  cross_dupes INTEGER NOT NULL DEFAULT 0,
+  errors INTEGER NOT NULL DEFAULT 0,
+  created_at REAL NOT NULL,
+  completed_at REAL,
+  UNIQUE (run_id, query, site)
+)
+"""
+
+
+class SqliteQueue(WorkQueue):
+    """The same queue on a local SQLite file, for running several workers without the database.
+
+    Each operation opens its own connection, so the heartbeat thread and other
+    processes can share the file; `BEGIN IMMEDIATE` makes a claim atomic.
+    """
+
+    def __init__(self, path: str, run_id: str, worker_id: str, **kwargs):
+        super().__init__(run_id, worker_id, **kwargs)
+        self.path = path
+        with self._connect() as db:
+            db.execute(SQLITE_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _enqueue(self, units):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("DELETE FROM scrape_queue WHERE created_at < ?", (now - RETENTION_DAYS * 86400,))
+            db.executemany(
+                "INSERT OR IGNORE INTO scrape_queue (run_id, query, site, created_at) VALUES (?, ?, ?, ?)",
+                [(self.run_id, query, site, now) for query, site in units],
+            )
+
+    def _claim(self, limit):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "UPDATE scrape_queue SET status = 'failed', leased_by = NULL, last_error = 'lease expired' "
+                "WHERE run_id = ? AND status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+                (self.run_id, now, self.max_attempts),
+            )
+            ids = [row["id"] for row in db.execute(
+                "SELECT id FROM scrape_queue WHERE run_id = ? AND attempts < ? "
+                "AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < ?)) "
+                "ORDER BY attempts, id LIMIT ?",
+                (self.run_id, self.max_attempts, now, limit),
+            )]
+            db.executemany(
+                "UPDATE scrape_queue SET status = 'leased', leased_by = ?, attempts = attempts + 1, "
+                "lease_expires_at = ? WHERE id = ?",
+                [(self.worker_id, now + self.lease_seconds, unit_id) for unit_id in ids],
+            )
+            rows = db.execute(
+                f"SELECT * FROM scrape_queue WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall() if ids else []
+        return [dict(row) for row in rows]
+
+    def _heartbeat(self, ids):
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE scrape_queue SET lease_expires_at = ? WHERE id = ? AND leased_by = ? AND status = 'leased'",
+                [(time.time() + self.lease_seconds, unit_id, self.worker_id) for unit_id in ids],
+            )
+
+    def _complete(self, rows):
+        now = time.time()
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE scrape_queue SET status = 'done', leased_by = NULL, lease_expires_at = NULL, completed_at = ?, "
+                "found = ?, queued = ?, skipped = ?, cross_dupes = ?, errors = ? WHERE id = ? AND leased_by = ?",
+                [(now, *(row[k] for k in COUNTERS), row["id"], self.worker_id) for row in rows],
+            )
+
+    def _fail(self, unit_id, status, error):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE scrape_queue SET status = ?, leased_by = NULL, lease_expires_at = NULL, last_error = ? "
+                "WHERE id = ? AND leased_by = ?",
+                (status, error, unit_id, self.worker_id),
+            )
+
+    def _rows(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM scrape_queue WHERE run_id = ?", (self.run_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _expires(row):
+        return datetime.fromtimestamp(row["lease_expires_at"]).astimezone()
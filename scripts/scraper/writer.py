@@ -0,0 +1,84 @@
+"""
+Buffered job writer.
+Collects transformed job rows and writes them in chunked upserts keyed on
+(source, source_id), so a run costs a few requests instead of one per job.
+"""
+
+from db import write_bisect
+from instrument import stage
+from sinks import PostgrestSink
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Print at most this many row-level write errors per run
+MAX_REPORTED_ERRORS = 10
+
+
+class JobWriter:
+    """Buffer job rows and flush them to `jobs` in chunked upserts."""
+
+    def __init__(
+        self, client, chunk_size: int = DEFAULT_CHUNK_SIZE, companies=None, on_flush=None, on_insert=None, sink=None
+    ):
+        self.client = client
+        # Where upserts go: PostgREST through `client` unless a sinks.PostgresSink is given
+        self.sink = sink or PostgrestSink(client)
+        # Optional CompanyResolver: rows then carry `company_slug` instead of `company_id`
+        self.companies = companies
+        # Optional callback run after each flush, once everything buffered so far is written
+        self.on_flush = on_flush
+        # Optional callback given the rows each upsert actually inserted
+        self.on_insert = on_insert
+        self.chunk_size = max(1, chunk_size)
+        self.buffer: list[dict] = []
+        self.inserted = 0
+        self.errors = 0
+
+    def add(self, job: dict):
+        self.buffer.append(job)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far."""
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        if self.companies:
+            with stage("company_resolve"):
+                rows = self._attach_companies(rows)
+        before = self.inserted
+        with stage("insert"):
+            self._write(rows)
+        print(f"    ... flushed {len(rows)} jobs ({self.inserted - before} new, {self.inserted} total)")
+        if self.on_flush:
+            self.on_flush()
+
+    def _attach_companies(self, rows: list[dict]) -> list[dict]:
+        """Create pending companies, then swap each row's company slug for its id."""
+        self.companies.flush_new()
+        ready = []
+        for row in rows:
+            company_id = self.companies.id_for(row.pop("company_slug"))
+            if not company_id:
+                self._on_error(row, ValueError("company could not be created"))
+                continue
+            row["company_id"] = company_id
+            ready.append(row)
+        return ready
+
+    def _write(self, rows: list[dict]):
+        """Upsert a chunk, bisecting on failure so one bad row doesn't sink the batch."""
+        write_bisect(self._upsert, rows, self._on_error)
+
+    def _upsert(self, rows: list[dict]):
+        inserted = self.sink.upsert("jobs", rows, on_conflict="source,source_id", ignore_duplicates=True)
+        # Rows skipped by ON CONFLICT DO NOTHING are not returned
+        self.inserted += len(inserted)
+        if self.on_insert and inserted:
+            self.on_insert(inserted)
+
+    def _on_error(self, row: dict, e: Exception):
+        self.errors += 1
+        if self.errors <= MAX_REPORTED_ERRORS:
+            print(f"  Error inserting job '{row.get('slug')}': {e}")
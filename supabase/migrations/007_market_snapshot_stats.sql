@@ -0,0 +1,46 @@
+-- ============================================
+-- Market snapshot aggregates in one pass
+-- ============================================
+
+-- Per-category, per-tech-skill and per-experience-level job counts and salary
+-- stats for active jobs, matching scripts/aggregate.py's streaming engine:
+-- averages skip zero/NULL salaries, the median is over (min + max) / 2 for jobs
+-- with both bounds. Every category and level is returned, even with no jobs.
+CREATE OR REPLACE FUNCTION market_snapshot_stats(tech_skills TEXT[])
+RETURNS TABLE (
+  dimension TEXT,
+  value TEXT,
+  job_count INTEGER,
+  avg_salary_min INTEGER,
+  avg_salary_max INTEGER,
+  median_salary INTEGER
+) AS $$
+  WITH active AS (
+    SELECT true AS matched, category_id, experience_level::TEXT AS experience_level, tech_stack, salary_min, salary_max
+    FROM jobs
+    WHERE is_active = true
+  ),
+  slices AS (
+    SELECT 'category' AS dimension, c.slug AS value, a.matched, a.salary_min, a.salary_max
+    FROM categories c
+    LEFT JOIN active a ON a.category_id = c.id
+    UNION ALL
+    SELECT 'tech', t.skill, a.matched, a.salary_min, a.salary_max
+    FROM unnest(tech_skills) AS t(skill)
+    LEFT JOIN active a ON a.tech_stack @> ARRAY[t.skill]
+    UNION ALL
+    SELECT 'experience', l.level, a.matched, a.salary_min, a.salary_max
+    FROM unnest(enum_range(NULL::experience_level)::TEXT[]) AS l(level)
+    LEFT JOIN active a ON a.experience_level = l.level
+  )
+  SELECT
+    dimension,
+    value,
+    COUNT(matched)::INTEGER,
+    FLOOR(AVG(salary_min) FILTER (WHERE salary_min <> 0))::INTEGER,
+    FLOOR(AVG(salary_max) FILTER (WHERE salary_max <> 0))::INTEGER,
+    FLOOR(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY (salary_min + salary_max) / 2)
+      FILTER (WHERE salary_min <> 0 AND salary_max <> 0))::INTEGER
+  FROM slices
+  GROUP BY dimension, value;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,10 @@
+-- ============================================
+-- Normalized role title, computed at ingest
+-- ============================================
+
+-- Written by the scraper (scripts/scraper/titles.py) so the weekly salary
+-- benchmark run no longer re-normalizes every job title.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS normalized_title TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_normalized_title ON jobs(normalized_title, experience_level)
+  WHERE normalized_title IS NOT NULL;
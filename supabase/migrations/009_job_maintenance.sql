@@ -0,0 +1,36 @@
+-- ============================================
+-- Set-based end-of-scrape maintenance
+-- ============================================
+
+-- Deactivates every active job posted before `stale_before` and recomputes
+-- categories.job_count in one call, replacing the scraper's 500-row
+-- select/update loop and per-category count queries. Only categories whose
+-- count actually changed are rewritten.
+CREATE OR REPLACE FUNCTION run_job_maintenance(stale_before TIMESTAMPTZ)
+RETURNS TABLE (deactivated INTEGER, categories_updated INTEGER) AS $$
+DECLARE
+  n_deactivated INTEGER;
+  n_categories INTEGER;
+BEGIN
+  UPDATE jobs SET is_active = false
+  WHERE is_active = true AND date_posted < stale_before;
+  GET DIAGNOSTICS n_deactivated = ROW_COUNT;
+
+  UPDATE categories c SET job_count = counts.active
+  FROM (
+    SELECT c2.id, COUNT(j.id)::INTEGER AS active
+    FROM categories c2
+    LEFT JOIN jobs j ON j.category_id = c2.id AND j.is_active = true
+    GROUP BY c2.id
+  ) counts
+  WHERE c.id = counts.id AND c.job_count IS DISTINCT FROM counts.active;
+  GET DIAGNOSTICS n_categories = ROW_COUNT;
+
+  RETURN QUERY SELECT n_deactivated, n_categories;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION run_job_maintenance(TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+
+-- Lets the stale-job scan skip inactive rows entirely
+CREATE INDEX IF NOT EXISTS idx_jobs_active_date_posted ON jobs(date_posted) WHERE is_active = TRUE;
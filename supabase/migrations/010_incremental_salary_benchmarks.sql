@@ -0,0 +1,58 @@
+-- ============================================
+-- Incremental salary benchmarks
+-- ============================================
+
+-- One row per benchmark group so scripts/aggregate.py can upsert groups in
+-- place instead of deleting and re-inserting the whole table
+ALTER TABLE salary_benchmarks
+  ADD CONSTRAINT salary_benchmarks_group_key UNIQUE (normalized_title, experience_level);
+
+-- Per-pipeline high-water marks on jobs.updated_at
+CREATE TABLE IF NOT EXISTS aggregation_watermarks (
+  name text PRIMARY KEY,
+  watermark timestamptz NOT NULL
+);
+
+ALTER TABLE aggregation_watermarks ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full aggregation_watermarks" ON aggregation_watermarks FOR ALL TO service_role USING (true);
+
+-- The updated_at watermark only shows a job's current group. When a job's
+-- title or experience level changes, or it is deleted, log the group it left
+-- so the next incremental run recomputes that group too.
+CREATE TABLE IF NOT EXISTS salary_benchmark_departures (
+  id bigserial PRIMARY KEY,
+  title text,
+  normalized_title text,
+  experience_level text,
+  created_at timestamptz DEFAULT now()
+);
+
+ALTER TABLE salary_benchmark_departures ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full salary_benchmark_departures" ON salary_benchmark_departures FOR ALL TO service_role USING (true);
+
+-- Runs as the table owner: job updates and deletes by roles without a policy on
+-- salary_benchmark_departures must still be logged rather than fail under RLS.
+CREATE OR REPLACE FUNCTION log_salary_benchmark_departure()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO salary_benchmark_departures (title, normalized_title, experience_level)
+  VALUES (OLD.title, OLD.normalized_title, OLD.experience_level::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER trigger_jobs_benchmark_departure_update
+  AFTER UPDATE OF title, normalized_title, experience_level ON jobs
+  FOR EACH ROW
+  WHEN (
+    OLD.title IS DISTINCT FROM NEW.title
+    OR OLD.normalized_title IS DISTINCT FROM NEW.normalized_title
+    OR OLD.experience_level IS DISTINCT FROM NEW.experience_level
+  )
+  EXECUTE FUNCTION log_salary_benchmark_departure();
+
+CREATE TRIGGER trigger_jobs_benchmark_departure_delete
+  AFTER DELETE ON jobs
+  FOR EACH ROW EXECUTE FUNCTION log_salary_benchmark_departure();
+
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at);
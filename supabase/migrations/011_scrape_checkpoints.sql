@@ -0,0 +1,25 @@
+-- ============================================
+-- Scrape run checkpoints
+-- ============================================
+
+-- One row per completed (query, site) unit of a scrape run. `site` is a
+-- comma-joined list when one fetch covered several sites. A retried run with
+-- the same run_id passes --resume to skip these units.
+CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+  id bigserial PRIMARY KEY,
+  run_id text NOT NULL,
+  query text NOT NULL,
+  site text NOT NULL,
+  found integer NOT NULL DEFAULT 0,
+  queued integer NOT NULL DEFAULT 0,
+  skipped integer NOT NULL DEFAULT 0,
+  cross_dupes integer NOT NULL DEFAULT 0,
+  errors integer NOT NULL DEFAULT 0,
+  completed_at timestamptz DEFAULT now(),
+  UNIQUE (run_id, query, site)
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrape_checkpoints_completed_at ON scrape_checkpoints(completed_at);
+
+ALTER TABLE scrape_checkpoints ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full scrape_checkpoints" ON scrape_checkpoints FOR ALL TO service_role USING (true);
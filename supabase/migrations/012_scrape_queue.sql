@@ -0,0 +1,109 @@
+-- ============================================
+-- Shared scrape work queue
+-- ============================================
+
+-- One row per (query, site) unit of a queue-mode scrape run. Workers claim
+-- units under a lease (status = 'leased', lease_expires_at in the future) and
+-- heartbeat to extend it; a unit whose lease lapses is claimable again until
+-- it has used max_attempts, after which it is marked failed.
+CREATE TABLE IF NOT EXISTS scrape_queue (
+  id bigserial PRIMARY KEY,
+  run_id text NOT NULL,
+  query text NOT NULL,
+  site text NOT NULL,
+  status text NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'leased', 'done', 'failed')),
+  attempts integer NOT NULL DEFAULT 0,
+  leased_by text,
+  lease_expires_at timestamptz,
+  last_error text,
+  found integer NOT NULL DEFAULT 0,
+  queued integer NOT NULL DEFAULT 0,
+  skipped integer NOT NULL DEFAULT 0,
+  cross_dupes integer NOT NULL DEFAULT 0,
+  errors integer NOT NULL DEFAULT 0,
+  created_at timestamptz DEFAULT now(),
+  completed_at timestamptz,
+  UNIQUE (run_id, query, site)
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrape_queue_claimable ON scrape_queue(run_id, attempts, id) WHERE status IN ('pending', 'leased');
+CREATE INDEX IF NOT EXISTS idx_scrape_queue_created_at ON scrape_queue(created_at);
+
+ALTER TABLE scrape_queue ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full scrape_queue" ON scrape_queue FOR ALL TO service_role USING (true);
+
+-- Lease up to p_limit claimable units to p_worker. SKIP LOCKED lets
+-- concurrent workers claim disjoint units without waiting on each other.
+CREATE OR REPLACE FUNCTION claim_scrape_units(
+  p_run_id TEXT,
+  p_worker TEXT,
+  p_limit INTEGER,
+  p_lease_seconds INTEGER,
+  p_max_attempts INTEGER
+)
+RETURNS SETOF scrape_queue AS $$
+BEGIN
+  UPDATE scrape_queue
+  SET status = 'failed', leased_by = NULL, last_error = 'lease expired'
+  WHERE run_id = p_run_id AND status = 'leased'
+    AND lease_expires_at < now() AND attempts >= p_max_attempts;
+
+  RETURN QUERY
+  UPDATE scrape_queue q
+  SET status = 'leased',
+      leased_by = p_worker,
+      attempts = q.attempts + 1,
+      lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+  WHERE q.id IN (
+    SELECT id FROM scrape_queue
+    WHERE run_id = p_run_id AND attempts < p_max_attempts
+      AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < now()))
+    ORDER BY attempts, id
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING q.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Extend the leases p_worker still holds
+CREATE OR REPLACE FUNCTION heartbeat_scrape_units(p_worker TEXT, p_ids BIGINT[], p_lease_seconds INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+  n_extended INTEGER;
+BEGIN
+  UPDATE scrape_queue
+  SET lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+  WHERE id = ANY(p_ids) AND leased_by = p_worker AND status = 'leased';
+  GET DIAGNOSTICS n_extended = ROW_COUNT;
+  RETURN n_extended;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mark units done with their counters in one call. p_units is a JSON array
+-- of {id, found, queued, skipped, cross_dupes, errors}.
+CREATE OR REPLACE FUNCTION complete_scrape_units(p_worker TEXT, p_units JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+  n_completed INTEGER;
+BEGIN
+  UPDATE scrape_queue q
+  SET status = 'done',
+      leased_by = NULL,
+      lease_expires_at = NULL,
+      completed_at = now(),
+      found = (u->>'found')::INTEGER,
+      queued = (u->>'queued')::INTEGER,
+      skipped = (u->>'skipped')::INTEGER,
+      cross_dupes = (u->>'cross_dupes')::INTEGER,
+      errors = (u->>'errors')::INTEGER
+  FROM jsonb_array_elements(p_units) u
+  WHERE q.id = (u->>'id')::BIGINT AND q.leased_by = p_worker;
+  GET DIAGNOSTICS n_completed = ROW_COUNT;
+  RETURN n_completed;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION claim_scrape_units(TEXT, TEXT, INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION heartbeat_scrape_units(TEXT, BIGINT[], INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION complete_scrape_units(TEXT, JSONB) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,21 @@
+-- ============================================
+-- Persisted cross-source fingerprints
+-- ============================================
+
+-- make_fingerprint(title, company) from scripts/scraper/transform.py: the
+-- first 20 hex digits of md5(lower(title || company) stripped to [a-z0-9]).
+-- Stored at ingest so every scraper batch and run dedups against the same set.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+
+-- Backfill from the stored company name; jobs whose company was renamed since
+-- ingest may get a different fingerprint, which only weakens dedup for them
+UPDATE jobs j
+SET fingerprint = left(md5(regexp_replace(lower(j.title || c.name), '[^a-z0-9]', '', 'g')), 20)
+FROM companies c
+WHERE c.id = j.company_id AND j.fingerprint IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_fingerprint ON jobs(fingerprint) WHERE fingerprint IS NOT NULL;
+
+-- The scraper preloads fingerprints of recently created jobs
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at_fingerprint ON jobs(created_at) INCLUDE (fingerprint)
+  WHERE fingerprint IS NOT NULL;
@@ -0,0 +1,22 @@
+-- ============================================
+-- Job alert matches
+-- ============================================
+
+-- Written by the scraper after each run (scripts/scraper/alerts.py): one row
+-- per (alert, new job) match. Nothing reads it yet; sent_at and the unsent
+-- index are for a sender that picks up each alert's unsent matches on its
+-- daily/weekly schedule and stamps them.
+CREATE TABLE IF NOT EXISTS job_alert_matches (
+  id bigserial PRIMARY KEY,
+  alert_id uuid NOT NULL REFERENCES job_alerts(id) ON DELETE CASCADE,
+  job_id uuid NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+  matched_at timestamptz NOT NULL DEFAULT now(),
+  sent_at timestamptz,
+  UNIQUE (alert_id, job_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_alert_matches_unsent ON job_alert_matches(alert_id, matched_at) WHERE sent_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_job_alert_matches_job ON job_alert_matches(job_id);
+
+ALTER TABLE job_alert_matches ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full job_alert_matches" ON job_alert_matches FOR ALL TO service_role USING (true);
@@ -0,0 +1,23 @@
+-- ============================================
+-- Near-duplicate signatures
+-- ============================================
+
+-- MinHash signatures from scripts/scraper/neardup.py: 64 uint32 values,
+-- little-endian and base64-encoded, over normalized title, company and
+-- description shingles. company_key is the company name without punctuation
+-- or legal suffixes and title_key the numbers and seniority words in the title;
+-- only jobs matching on both are compared. The scraper
+-- preloads recent rows so syndicated copies of a posting are caught across runs.
+CREATE TABLE IF NOT EXISTS job_signatures (
+  id bigserial PRIMARY KEY,
+  job_id uuid NOT NULL UNIQUE REFERENCES jobs(id) ON DELETE CASCADE,
+  company_key text NOT NULL,
+  title_key text NOT NULL DEFAULT '',
+  signature text NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_signatures_created_at ON job_signatures(created_at);
+
+ALTER TABLE job_signatures ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full job_signatures" ON job_signatures FOR ALL TO service_role USING (true);
@@ -0,0 +1,19 @@
+-- ============================================
+-- Incremental scrape watermarks
+-- ============================================
+
+-- One row per (query, site): the start of the last run that scraped the unit
+-- successfully, and of its last full-window sweep. The scraper asks JobSpy
+-- only for postings since scraped_through (plus a safety margin) and sweeps
+-- the full window again once full_sweep_at is a week old.
+CREATE TABLE IF NOT EXISTS scrape_watermarks (
+  id bigserial PRIMARY KEY,
+  query text NOT NULL,
+  site text NOT NULL,
+  scraped_through timestamptz NOT NULL,
+  full_sweep_at timestamptz,
+  UNIQUE (query, site)
+);
+
+ALTER TABLE scrape_watermarks ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full scrape_watermarks" ON scrape_watermarks FOR ALL TO service_role USING (true);
@@ -0,0 +1,26 @@
+-- ============================================
+-- Per-unit scrape yield statistics
+-- ============================================
+
+-- One row per (query, site) unit, or per (query, comma-joined sites) for
+-- sequential-mode fetches. Counters and fetch latency are exponentially
+-- weighted moving averages over runs, maintained by scripts/scraper/scheduler.py,
+-- which ranks units by expected new jobs per second and sizes results_wanted.
+CREATE TABLE IF NOT EXISTS scrape_query_stats (
+  id bigserial PRIMARY KEY,
+  query text NOT NULL,
+  site text NOT NULL,
+  runs integer NOT NULL DEFAULT 0,
+  fetched double precision,
+  new double precision,
+  skipped double precision,
+  cross_dupes double precision,
+  errors double precision,
+  seconds double precision,
+  results_wanted integer,
+  last_run_at timestamptz,
+  UNIQUE (query, site)
+);
+
+ALTER TABLE scrape_query_stats ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full scrape_query_stats" ON scrape_query_stats FOR ALL TO service_role USING (true);
@@ -0,0 +1,48 @@
+-- ============================================
+-- Atomic salary benchmark writes
+-- ============================================
+
+-- Upserts refreshed benchmark groups and deletes groups that no longer have
+-- enough data in one transaction, so a run that dies between the two can't
+-- leave stale groups published. p_rows is a JSON array of salary_benchmarks
+-- rows; p_stale a JSON array of {normalized_title, experience_level} keys.
+CREATE OR REPLACE FUNCTION write_salary_benchmarks(p_rows JSONB, p_stale JSONB)
+RETURNS TABLE (upserted INTEGER, removed INTEGER) AS $$
+DECLARE
+  n_upserted INTEGER;
+  n_removed INTEGER;
+BEGIN
+  INSERT INTO salary_benchmarks (
+    role_category, normalized_title, experience_level, sample_size,
+    p25_salary, p50_salary, p75_salary, avg_salary, min_salary, max_salary,
+    top_companies, top_tech, updated_at
+  )
+  SELECT
+    role_category, normalized_title, experience_level, sample_size,
+    p25_salary, p50_salary, p75_salary, avg_salary, min_salary, max_salary,
+    top_companies, top_tech, updated_at
+  FROM jsonb_populate_recordset(NULL::salary_benchmarks, p_rows)
+  ON CONFLICT (normalized_title, experience_level) DO UPDATE SET
+    role_category = EXCLUDED.role_category,
+    sample_size = EXCLUDED.sample_size,
+    p25_salary = EXCLUDED.p25_salary,
+    p50_salary = EXCLUDED.p50_salary,
+    p75_salary = EXCLUDED.p75_salary,
+    avg_salary = EXCLUDED.avg_salary,
+    min_salary = EXCLUDED.min_salary,
+    max_salary = EXCLUDED.max_salary,
+    top_companies = EXCLUDED.top_companies,
+    top_tech = EXCLUDED.top_tech,
+    updated_at = EXCLUDED.updated_at;
+  GET DIAGNOSTICS n_upserted = ROW_COUNT;
+
+  DELETE FROM salary_benchmarks b
+  USING jsonb_to_recordset(p_stale) AS s(normalized_title TEXT, experience_level TEXT)
+  WHERE b.normalized_title = s.normalized_title AND b.experience_level = s.experience_level;
+  GET DIAGNOSTICS n_removed = ROW_COUNT;
+
+  RETURN QUERY SELECT n_upserted, n_removed;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION write_salary_benchmarks(JSONB, JSONB) FROM PUBLIC, anon, authenticated;